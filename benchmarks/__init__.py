@@ -0,0 +1,19 @@
+"""
+Contains benchmarks for the hot paths of the collector, and a load
+generator for measuring it end to end.
+
+Run a benchmark from the root of the repo, for example:
+
+>>> python -m benchmarks.bench_parser
+
+Run every microbenchmark, save the results, and later check a change
+for regressions:
+
+>>> python -m benchmarks --output baseline.json
+>>> python -m benchmarks --baseline baseline.json
+
+Send messages to a collector on the loopback interface and measure
+the throughput, loss rate, and latency:
+
+>>> python -m benchmarks.load --rate 20000 --duration 10 --output load.json
+"""
@@ -0,0 +1,43 @@
+"""
+Runs every microbenchmark and optionally saves the results as JSON
+or compares them to a baseline.
+
+>>> python -m benchmarks --output baseline.json
+>>> python -m benchmarks --baseline baseline.json
+"""
+import argparse
+import sys
+from . import bench_parser, bench_validator, results
+
+
+def main():
+    arguments: argparse.ArgumentParser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                                                 description="Runs every microbenchmark.")
+    arguments.add_argument("--count", type=int, default=50000, help="messages per corpus")
+    arguments.add_argument("--output", help="write the results to this JSON file")
+    arguments.add_argument("--baseline", help="compare the results to this JSON file")
+    arguments.add_argument("--tolerance", type=float, default=0.1, help="allowed regression, e.g. 0.1 for 10%%")
+    args: argparse.Namespace = arguments.parse_args()
+
+    benchmarks: dict = {
+        "validator": ("Validator.validate_message()", bench_validator.run),
+        "parser": ("Parser.parse()", bench_parser.run),
+    }
+    micro: dict = {}
+    for name, (description, run) in benchmarks.items():
+        micro[name] = {"msgs_per_sec": run(args.count)}
+        for corpus, msgs_per_sec in micro[name]["msgs_per_sec"].items():
+            print(f"{description} ({corpus}): {msgs_per_sec:,.0f} msgs/sec")
+
+    if args.output:
+        results.save(args.output, micro)
+    if args.baseline:
+        regressions: list[str] = results.compare(results.load(args.baseline), micro, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Measures how many messages Parser.parse() handles per second.
+
+>>> python -m benchmarks.bench_parser
+"""
+import time
+from pysyslog_server.parser import Parser
+from .corpus import max_length_messages, rfc5424_messages, valid_messages
+
+
+def bench_parser(messages: list[str], repeat: int = 5) -> float:
+    """
+    Parses every message several times and keeps the best run.
+
+    Args:
+        messages (list[str]): The valid messages to parse.
+        repeat (int): The number of runs.
+
+    Returns:
+        float: The number of messages parsed per second in the best run.
+    """
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        for message in messages:
+            Parser(message).parse()
+        best = min(best, time.perf_counter() - start)
+    return len(messages) / best
+
+
+def run(count: int = 50000) -> dict:
+    """
+    Runs the benchmark for every corpus.
+
+    Args:
+        count (int): The number of messages per corpus.
+
+    Returns:
+        dict: The messages parsed per second, by corpus.
+    """
+    corpora: dict = {
+        "valid": valid_messages(count),
+        "max length": max_length_messages(count),
+        "RFC 5424": rfc5424_messages(count),
+    }
+    return {name: bench_parser(messages) for name, messages in corpora.items()}
+
+
+def main():
+    for name, msgs_per_sec in run().items():
+        print(f"Parser.parse() ({name}): {msgs_per_sec:,.0f} msgs/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Measures how many messages Validator.validate_message() handles per second.
+
+The messages that need to be corrected are the interesting case,
+because a TIMESTAMP has to be generated for every one of them.
+
+>>> python -m benchmarks.bench_validator
+"""
+import time
+from pysyslog_server.validator import Validator
+from .corpus import (max_length_messages, messages_with_bad_pri, messages_without_pri, messages_without_timestamp,
+                     rfc5424_messages, valid_messages)
+
+
+def bench_validator(messages: list[str], repeat: int = 5) -> float:
+    """
+    Validates every message several times and keeps the best run.
+
+    Args:
+        messages (list[str]): The messages to validate.
+        repeat (int): The number of runs.
+
+    Returns:
+        float: The number of messages validated per second in the best run.
+    """
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        for message in messages:
+            Validator(message, "192.168.0.10").validate_message()
+        best = min(best, time.perf_counter() - start)
+    return len(messages) / best
+
+
+def run(count: int = 50000) -> dict:
+    """
+    Runs the benchmark for every corpus.
+
+    Args:
+        count (int): The number of messages per corpus.
+
+    Returns:
+        dict: The messages validated per second, by corpus.
+    """
+    corpora: dict = {
+        "valid": valid_messages(count),
+        "missing timestamp": messages_without_timestamp(count),
+        "missing PRI": messages_without_pri(count),
+        "bad PRI": messages_with_bad_pri(count),
+        "max length": max_length_messages(count),
+        "RFC 5424": rfc5424_messages(count),
+    }
+    return {name: bench_validator(messages) for name, messages in corpora.items()}
+
+
+def main():
+    for name, msgs_per_sec in run().items():
+        print(f"Validator.validate_message() ({name}): {msgs_per_sec:,.0f} msgs/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Contains functions for generating realistic Syslog messages."""
+import random
+
+MONTHS: list[str] = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+HOSTNAMES: list[str] = ["core-sw1", "core-sw2", "edge-rtr1", "fw01", "192.168.0.10", "web01", "db01"]
+TAGS: list[str] = ["sshd[2412]:", "kernel:", "CRON[998]:", "su:", "%LINK-3-UPDOWN:", "dhcpd:", "systemd[1]:"]
+CONTENTS: list[str] = [
+    " Accepted publickey for admin from 10.0.0.5 port 52344 ssh2",
+    " Interface GigabitEthernet0/1, changed state to down",
+    " 'su root' failed for lonvickon /dev/pts/8",
+    " DHCPACK on 192.168.0.57 to 00:11:22:33:44:55 via eth0",
+    " (root) CMD (run-parts /etc/cron.hourly)",
+    " Started Session 42 of user admin.",
+]
+
+
+def timestamp(rng: random.Random) -> str:
+    """
+    Returns a random RFC 3164 TIMESTAMP.
+
+    Args:
+        rng (random.Random): The random number generator.
+
+    Returns:
+        str: The timestamp in the form 'Mmm dd hh:mm:ss'.
+    """
+    day: int = rng.randint(1, 28)
+    return f"{rng.choice(MONTHS)} {day:>2} {rng.randint(0, 23):02}:{rng.randint(0, 59):02}:{rng.randint(0, 59):02}"
+
+
+def valid_messages(count: int, seed: int = 0) -> list[str]:
+    """
+    Returns valid Syslog messages.
+
+    Args:
+        count (int): The number of messages.
+        seed (int): The seed of the random number generator.
+
+    Returns:
+        list[str]: The messages.
+    """
+    rng: random.Random = random.Random(seed)
+    return [
+        f"<{rng.randint(0, 191)}>{timestamp(rng)} {rng.choice(HOSTNAMES)} {rng.choice(TAGS)}{rng.choice(CONTENTS)}"
+        for _ in range(count)
+    ]
+
+
+def messages_without_timestamp(count: int, seed: int = 0) -> list[str]:
+    """
+    Returns messages with a valid PRI but no HEADER.
+
+    Many devices send messages like this, so a HEADER has to be
+    inserted for every one of them.
+
+    Args:
+        count (int): The number of messages.
+        seed (int): The seed of the random number generator.
+
+    Returns:
+        list[str]: The messages.
+    """
+    rng: random.Random = random.Random(seed)
+    return [f"<{rng.randint(0, 191)}>{rng.choice(TAGS)}{rng.choice(CONTENTS)}" for _ in range(count)]
+
+
+def messages_without_pri(count: int, seed: int = 0) -> list[str]:
+    """
+    Returns messages without a PRI or HEADER.
+
+    Args:
+        count (int): The number of messages.
+        seed (int): The seed of the random number generator.
+
+    Returns:
+        list[str]: The messages.
+    """
+    rng: random.Random = random.Random(seed)
+    return [f"{rng.choice(TAGS)}{rng.choice(CONTENTS)}" for _ in range(count)]
+
+
+def messages_with_bad_pri(count: int, seed: int = 0) -> list[str]:
+    """
+    Returns messages whose PRI is malformed or out of range.
+
+    A PRI and HEADER have to be prepended to every one of them.
+
+    Args:
+        count (int): The number of messages.
+        seed (int): The seed of the random number generator.
+
+    Returns:
+        list[str]: The messages.
+    """
+    rng: random.Random = random.Random(seed)
+    bad_pris: list[str] = ["<192>", "<999>", "<0>>", "<013>", "<>", "<-1>", "13>"]
+    return [
+        f"{rng.choice(bad_pris)}{timestamp(rng)} {rng.choice(HOSTNAMES)} {rng.choice(TAGS)}{rng.choice(CONTENTS)}"
+        for _ in range(count)
+    ]
+
+
+def max_length_messages(count: int, length: int = 1024, seed: int = 0) -> list[str]:
+    """
+    Returns valid Syslog messages of the maximum length.
+
+    Args:
+        count (int): The number of messages.
+        length (int): The length of every message in characters.
+        seed (int): The seed of the random number generator.
+
+    Returns:
+        list[str]: The messages.
+    """
+    rng: random.Random = random.Random(seed)
+    messages: list[str] = []
+    for _ in range(count):
+        message: str = f"<{rng.randint(0, 191)}>{timestamp(rng)} {rng.choice(HOSTNAMES)} {rng.choice(TAGS)}"
+        while len(message) < length:
+            message += rng.choice(CONTENTS)
+        messages.append(message[:length])
+    return messages
+
+
+def rfc5424_messages(count: int, seed: int = 0) -> list[str]:
+    """
+    Returns valid RFC 5424 messages, some with STRUCTURED-DATA.
+
+    Args:
+        count (int): The number of messages.
+        seed (int): The seed of the random number generator.
+
+    Returns:
+        list[str]: The messages.
+    """
+    rng: random.Random = random.Random(seed)
+    structured_data: list[str] = ["-", '[timeQuality tzKnown="1" isSynced="1"]', '[origin ip="10.0.0.5"][meta sequenceId="42"]']
+    messages: list[str] = []
+    for _ in range(count):
+        moment: str = f"2026-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}T{rng.randint(0, 23):02}:" \
+            + f"{rng.randint(0, 59):02}:{rng.randint(0, 59):02}.{rng.randint(0, 999999):06}Z"
+        app: str = rng.choice(TAGS).rstrip(":").split("[")[0]
+        messages.append(f"<{rng.randint(0, 191)}>1 {moment} {rng.choice(HOSTNAMES)} {app} {rng.randint(1, 65535)} - "
+                        f"{rng.choice(structured_data)}{rng.choice(CONTENTS)}")
+    return messages
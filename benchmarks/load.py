@@ -0,0 +1,352 @@
+"""
+Measures the collector end to end.
+
+A collector is started on the loopback interface, several processes
+send it messages over UDP at a fixed total rate, and the file it
+appends to is read back. Every message carries the number of its
+sender, a sequence number, and the time it was sent, so the loss rate
+and the latency from sending a message to it appearing in the file can
+be computed.
+
+The latency includes the time the collector waits before flushing the
+file, so SYSLOG_FILE_FLUSH_INTERVAL is lowered to 10 ms unless it is
+set. Any other SYSLOG_* variable set when the benchmark is started is
+passed on to the collector, e.g. to compare SYSLOG_USE_ASYNCIO=yes:
+
+>>> python -m benchmarks.load --rate 20000 --duration 10 --processes 4 --output load.json
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from . import results
+
+MESSAGE_PATTERN: re.Pattern = re.compile(rb"loadgen bench: (-?\d+) (\d+) (\d+)")
+
+COLLECTOR_DEFAULTS: dict = {
+    "SYSLOG_LISTEN_ADDRESS": "127.0.0.1",
+    "SYSLOG_USE_DB": "no",
+    "SYSLOG_FILE_FLUSH": "interval",
+    "SYSLOG_FILE_FLUSH_INTERVAL": "0.01",
+    "SYSLOG_LOG_LEVEL": "warning",
+}
+
+
+def message(sender: int, sequence: int, size: int) -> bytes:
+    """
+    Returns a valid Syslog message stamped with the time it is sent.
+
+    Args:
+        sender (int): The number of the sending process.
+        sequence (int): The number of the message within the sender.
+        size (int): The minimum length of the message in bytes.
+
+    Returns:
+        bytes: The ASCII-encoded message.
+    """
+    syslog: bytes = (time.strftime("<13>%b %d %H:%M:%S loadgen bench: ")
+                     + f"{sender} {sequence} {time.time_ns()} ").encode("ascii")
+    return syslog.ljust(size, b"x")
+
+
+def send(sender: int, address: tuple, rate: float, duration: float, size: int) -> int:
+    """
+    Sends messages at a fixed rate.
+
+    Messages are sent in bursts of up to a millisecond's worth, and
+    the sender catches up if it falls behind.
+
+    Args:
+        sender (int): The number of the sending process.
+        address (tuple): The address and port of the collector.
+        rate (float): The number of messages per second.
+        duration (float): How long to send for, in seconds.
+        size (int): The minimum length of every message in bytes.
+
+    Returns:
+        int: The number of messages sent.
+    """
+    client: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sent: int = 0
+    start: float = time.perf_counter()
+    try:
+        while True:
+            elapsed: float = time.perf_counter() - start
+            if elapsed >= duration:
+                break
+            due: int = int(elapsed * rate)
+            while sent < due:
+                try:
+                    client.sendto(message(sender, sent, size), address)
+                except BlockingIOError: # the socket buffer is full; retry later
+                    break
+                sent += 1
+            time.sleep(0.001)
+    finally:
+        client.close()
+    return sent
+
+
+class Tail:
+    """
+    Class for reading the messages of the benchmark from the collector's files.
+
+    The files are polled on a background thread; rotated files are not
+    followed.
+
+    Attributes:
+        pattern (str): The glob pattern of the files, so that every shard
+            written by SYSLOG_WORKERS processes is read.
+        latencies (list[int]): The latency of every message received, in nanoseconds.
+        duplicates (int): The number of messages received more than once.
+        last_arrival (int): The time the last message was read, in nanoseconds.
+    """
+
+    def __init__(self, pattern: str):
+        """
+        Inits Tail.
+
+        Args:
+            pattern (str): The glob pattern of the files.
+        """
+        self.pattern = pattern
+        self.latencies = []
+        self.duplicates = 0
+        self.last_arrival = 0
+        self._seen: set = set()
+        self._files: dict = {}
+        self._stop: threading.Event = threading.Event()
+        self._thread: threading.Thread = None
+
+
+    def start(self):
+        """Starts polling the files."""
+        self._thread = threading.Thread(target=self._run, name="tail", daemon=True)
+        self._thread.start()
+
+
+    def stop(self):
+        """Stops polling and reads whatever is left in the files."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.read()
+        for file, _ in self._files.values():
+            file.close()
+
+
+    def read(self) -> int:
+        """
+        Reads the lines appended since the last call.
+
+        Returns:
+            int: The number of new messages of the benchmark, including probes.
+        """
+        for path in glob.glob(self.pattern):
+            if path not in self._files:
+                self._files[path] = (open(path, "rb"), bytearray())
+
+        count: int = 0
+        for file, pending in self._files.values():
+            data: bytes = file.read()
+            if not data:
+                continue
+            now: int = time.time_ns()
+            pending += data
+            end: int = pending.rfind(b"\n") + 1
+            for line in bytes(pending[:end]).splitlines():
+                match: re.Match = MESSAGE_PATTERN.search(line)
+                if match is None:
+                    continue
+                key: tuple = (int(match.group(1)), int(match.group(2)))
+                if key in self._seen:
+                    self.duplicates += 1
+                    continue
+                self._seen.add(key)
+                count += 1
+                if key[0] < 0: # a probe sent by wait_until_ready()
+                    continue
+                self.latencies.append(now - int(match.group(3)))
+                self.last_arrival = now
+            del pending[:end]
+        return count
+
+
+    def _run(self):
+        """Polls the files until stopped."""
+        while not self._stop.is_set():
+            if not self.read():
+                time.sleep(0.001)
+
+
+def free_port() -> int:
+    """
+    Returns a UDP port that is currently free on the loopback interface.
+
+    Returns:
+        int: The port.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_collector(directory: str, port: int) -> subprocess.Popen:
+    """
+    Starts a collector in another process.
+
+    Args:
+        directory (str): The working directory of the collector.
+        port (int): The UDP port to listen on.
+
+    Returns:
+        subprocess.Popen: The collector process.
+    """
+    env: dict = dict(os.environ)
+    for name, value in COLLECTOR_DEFAULTS.items():
+        env.setdefault(name, value)
+    env["SYSLOG_LISTEN_PORT"] = str(port)
+    env["SYSLOG_FILE"] = "syslog.log" # in the 'syslog' directory
+    root: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, (root, env.get("PYTHONPATH"))))
+    return subprocess.Popen([sys.executable, "-c", "import pysyslog_server; pysyslog_server.start()"],
+                            cwd=directory, env=env)
+
+
+def wait_until_ready(tail: Tail, address: tuple, timeout: float = 10.0):
+    """
+    Sends probe messages until one of them appears in the collector's files.
+
+    Probes are sent by sender -1 and don't count towards the results.
+
+    Args:
+        tail (Tail): Reads the collector's files.
+        address (tuple): The address and port of the collector.
+        timeout (float): How long to wait, in seconds.
+
+    Raises:
+        TimeoutError: If no probe appeared in time.
+    """
+    deadline: float = time.monotonic() + timeout
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+        sequence: int = 0
+        while time.monotonic() < deadline:
+            client.sendto(message(-1, sequence, 0), address)
+            sequence += 1
+            time.sleep(0.05)
+            if tail.read():
+                return
+    raise TimeoutError(f"The collector didn't write a message within {timeout}s")
+
+
+def percentile(values: list, fraction: float) -> float:
+    """
+    Returns a percentile using the nearest-rank method.
+
+    Args:
+        values (list): The sorted values.
+        fraction (float): The percentile, e.g. 0.99.
+
+    Returns:
+        float: The value, or 0 if there are none.
+    """
+    if not values:
+        return 0
+    return values[min(len(values) - 1, max(0, int(len(values) * fraction + 0.5) - 1))]
+
+
+def run(rate: float, duration: float, processes: int, size: int, settle: float = 2.0) -> dict:
+    """
+    Runs the benchmark against a new collector.
+
+    Args:
+        rate (float): The total number of messages sent per second.
+        duration (float): How long to send for, in seconds.
+        processes (int): The number of sending processes.
+        size (int): The minimum length of every message in bytes.
+        settle (float): How long to wait for the last messages, in seconds.
+
+    Returns:
+        dict: The results.
+    """
+    with tempfile.TemporaryDirectory(prefix="pysyslog-load-") as directory:
+        port: int = free_port()
+        address: tuple = ("127.0.0.1", port)
+        collector: subprocess.Popen = start_collector(directory, port)
+        tail: Tail = Tail(os.path.join(directory, "syslog", "syslog*.log"))
+        try:
+            wait_until_ready(tail, address)
+            tail.start()
+
+            start: int = time.time_ns()
+            with multiprocessing.Pool(processes) as pool:
+                counts: list = pool.starmap(send, [(sender, address, rate / processes, duration, size)
+                                                   for sender in range(processes)])
+            sent: int = sum(counts)
+
+            deadline: float = time.monotonic() + settle
+            while len(tail.latencies) < sent and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            collector.send_signal(signal.SIGTERM)
+            collector.wait()
+            tail.stop()
+
+    latencies: list = sorted(latency / 1e6 for latency in tail.latencies)
+    received: int = len(latencies)
+    elapsed: float = (tail.last_arrival - start) / 1e9 if received else duration
+    return {
+        "rate": rate,
+        "duration": duration,
+        "processes": processes,
+        "size": size,
+        "sent": sent,
+        "received": received,
+        "duplicates": tail.duplicates,
+        "loss_rate": 1 - received / sent if sent else 0,
+        "msgs_per_sec": received / elapsed,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.5),
+            "p99": percentile(latencies, 0.99),
+            "max": latencies[-1] if latencies else 0,
+        },
+    }
+
+
+def main():
+    arguments: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arguments.add_argument("--rate", type=float, default=10000, help="messages per second, in total")
+    arguments.add_argument("--duration", type=float, default=10, help="seconds to send for")
+    arguments.add_argument("--processes", type=int, default=2, help="number of sending processes")
+    arguments.add_argument("--size", type=int, default=128, help="minimum message length in bytes")
+    arguments.add_argument("--output", help="write the results to this JSON file")
+    arguments.add_argument("--baseline", help="compare the results to this JSON file")
+    arguments.add_argument("--tolerance", type=float, default=0.1, help="allowed regression, e.g. 0.1 for 10%%")
+    args: argparse.Namespace = arguments.parse_args()
+
+    load: dict = run(args.rate, args.duration, args.processes, args.size)
+    print(f"Sent {load['sent']:,} messages at {load['rate']:,.0f} msgs/sec, received {load['received']:,} "
+          f"({load['loss_rate']:.2%} lost) at {load['msgs_per_sec']:,.0f} msgs/sec")
+    print(f"Latency: p50 {load['latency_ms']['p50']:.2f} ms, p99 {load['latency_ms']['p99']:.2f} ms, "
+          f"max {load['latency_ms']['max']:.2f} ms")
+
+    if args.output:
+        results.save(args.output, {"load": load})
+    if args.baseline:
+        regressions: list[str] = results.compare(results.load(args.baseline), {"load": load}, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
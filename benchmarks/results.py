@@ -0,0 +1,119 @@
+"""
+Contains functions for saving benchmark results as JSON and comparing
+them to a baseline, so that performance regressions are caught.
+
+A results file looks like this:
+
+    {
+        "environment": {"python": "3.10.13", "commit": "0240f46...", ...},
+        "results": {"validator": {"msgs_per_sec": {"valid": 512345.6, ...}}, ...}
+    }
+
+Metrics named 'msgs_per_sec', or nested under that name, are better
+when higher. Latencies and loss rates are better when lower. Any
+other metric is not compared.
+"""
+import datetime
+import json
+import os
+import platform
+import subprocess
+
+
+def environment() -> dict:
+    """
+    Describes where the benchmarks ran.
+
+    Returns:
+        dict: The Python version, the platform, the number of CPUs, the
+            current commit (if in a git repo), and the current time.
+    """
+    try:
+        commit: str = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                     check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "time": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def save(path: str, results: dict):
+    """
+    Writes results to a JSON file, together with the environment.
+
+    Args:
+        path (str): The file to write.
+        results (dict): The results, by benchmark.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"environment": environment(), "results": results}, file, indent=4)
+        file.write("\n")
+
+
+def load(path: str) -> dict:
+    """
+    Reads results written by save().
+
+    Args:
+        path (str): The file to read.
+
+    Returns:
+        dict: The results, by benchmark.
+    """
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)["results"]
+
+
+def _flatten(results: dict, prefix: str = "") -> dict:
+    """
+    Flattens nested results.
+
+    Args:
+        results (dict): The results.
+        prefix (str): The path of the results, e.g. 'load.'.
+
+    Returns:
+        dict: The numeric values, by path, e.g. {'load.latency_ms.p99': 1.5}.
+    """
+    flat: dict = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(baseline: dict, results: dict, tolerance: float = 0.1) -> list[str]:
+    """
+    Finds the metrics that got worse than the baseline.
+
+    Args:
+        baseline (dict): The results to compare to.
+        results (dict): The new results.
+        tolerance (float): How much worse a metric may get, relative to
+            the baseline, e.g. 0.1 for 10%.
+
+    Returns:
+        list[str]: A description of every regression.
+    """
+    regressions: list[str] = []
+    old: dict = _flatten(baseline)
+    for path, value in _flatten(results).items():
+        if path not in old:
+            continue
+        before: float = old[path]
+        if "msgs_per_sec" in path:
+            if value < before * (1 - tolerance):
+                regressions.append(f"{path}: {value:,.0f} msgs/sec, was {before:,.0f} ({value / before - 1:+.1%})")
+        elif "latency" in path or "loss_rate" in path:
+            # an absolute margin, so that e.g. a loss rate of 0 may become 0.0001
+            if value > before * (1 + tolerance) + (0.001 if "loss_rate" in path else 0.05):
+                regressions.append(f"{path}: {value:,.4g}, was {before:,.4g}")
+    return regressions
@@ -8,6 +8,60 @@ before using this package:
 - SYSLOG_LISTEN_PORT ('514' by default)
 - SYSLOG_FILE ('syslog.log' by default)
 - SYSLOG_USE_DB ('no' by default)
+- SYSLOG_TIMEZONE ('local' by default; or 'UTC', 'America/New_York', etc.)
+- SYSLOG_WORKER_THREADS ('4' by default)
+- SYSLOG_QUEUE_SIZE ('10000' by default)
+- SYSLOG_OVERLOAD_POLICY ('block' by default; or 'drop-newest', 'drop-oldest')
+- SYSLOG_RCVBUF ('0' by default, i.e. the OS default)
+- SYSLOG_BATCH_RECEIVE ('no' by default)
+- SYSLOG_RECEIVE_BATCH_SIZE ('64' by default)
+- SYSLOG_TCP ('no' by default)
+- SYSLOG_TCP_LISTEN_PORT (SYSLOG_LISTEN_PORT by default)
+- SYSLOG_TCP_MAX_MESSAGE_LENGTH ('8192' by default)
+- SYSLOG_SOURCE_RATE ('0' by default, i.e. no limit; in messages per second)
+- SYSLOG_SOURCE_BURST (SYSLOG_SOURCE_RATE by default)
+- SYSLOG_SOURCE_MAX_TRACKED ('100000' by default)
+- SYSLOG_SOURCE_SUMMARY_INTERVAL ('10' by default, in seconds)
+- SYSLOG_DEDUP ('no' by default)
+- SYSLOG_DEDUP_WINDOW ('30' by default, in seconds)
+- SYSLOG_DEDUP_MAX_ENTRIES ('10000' by default)
+- SYSLOG_RULES (unset by default; the path of a JSON rules file)
+- SYSLOG_STORE ('no' by default)
+- SYSLOG_STORE_DIR ('./syslog/store' by default)
+- SYSLOG_STORE_PARTITION ('hour' by default; or 'day')
+- SYSLOG_EXPORT ('no' by default; requires 'pyarrow')
+- SYSLOG_EXPORT_DIR ('./syslog/export' by default)
+- SYSLOG_EXPORT_WINDOW ('hour' by default; or 'day')
+- SYSLOG_EXPORT_COMPRESSION ('zstd' by default; or 'snappy', 'gzip', 'none')
+- SYSLOG_EXPORT_BATCH_SIZE ('10000' by default)
+- SYSLOG_NON_ASCII ('escape' by default; or 'replace', 'passthrough')
+- SYSLOG_FORWARD ('no' by default)
+- SYSLOG_FORWARD_TARGETS (unset by default; e.g. 'central1:514,central2:514')
+- SYSLOG_FORWARD_PROTOCOL ('tcp' by default; or 'udp')
+- SYSLOG_FORWARD_MODE ('failover' by default; or 'balance')
+- SYSLOG_FORWARD_BATCH_SIZE ('500' by default)
+- SYSLOG_FORWARD_BUFFER_SIZE ('100000' by default)
+- SYSLOG_FORWARD_SPOOL ('no' by default)
+- SYSLOG_FORWARD_SPOOL_DIR ('./syslog/forward' by default)
+- SYSLOG_FORWARD_SPOOL_MAX_BYTES ('1073741824' by default)
+- SYSLOG_WORKERS ('1' by default)
+- SYSLOG_LOG_LEVEL ('info' by default; or 'debug', 'warning', 'error')
+- SYSLOG_LOG_RATE_LIMIT ('100' by default; '0' for no limit)
+- SYSLOG_LOG_RATE_INTERVAL ('10' by default, in seconds)
+- SYSLOG_LOG_QUEUE_SIZE ('10000' by default)
+- SYSLOG_METRICS_ADDRESS ('127.0.0.1' by default)
+- SYSLOG_METRICS_PORT ('0' by default, i.e. no metrics endpoint)
+- SYSLOG_USE_ASYNCIO ('no' by default)
+- SYSLOG_USE_UVLOOP ('yes' by default; only used if uvloop is installed)
+- SYSLOG_FILE_FLUSH ('interval' by default; or 'line', 'size')
+- SYSLOG_FILE_FLUSH_BYTES ('65536' by default)
+- SYSLOG_FILE_FLUSH_INTERVAL ('1.0' by default, in seconds)
+- SYSLOG_FILE_FSYNC ('none' by default; or 'periodic', 'batch')
+- SYSLOG_FILE_FSYNC_INTERVAL ('1.0' by default, in seconds)
+- SYSLOG_ROTATE_BYTES ('0' by default, i.e. never rotate by size)
+- SYSLOG_ROTATE_INTERVAL ('none' by default; or 'hour', 'day')
+- SYSLOG_ROTATE_BACKUPS ('7' by default)
+- SYSLOG_ROTATE_COMPRESSION ('gzip' by default; or 'zstd', 'none')
 
 If SYSLOG_USE_DB == "yes", then these additional 
 environment variables need to be set (no defaults 
@@ -16,6 +70,16 @@ assigned):
 - MONGODB_DBNAME
 - MONGODB_COLLECTION
 
+These optional environment variables tune how parsed messages
+are inserted in batches:
+- MONGODB_BATCH_SIZE ('500' by default)
+- MONGODB_BATCH_INTERVAL_MS ('100' by default)
+- MONGODB_BUFFER_SIZE ('100000' by default)
+- MONGODB_SERVER_SELECTION_TIMEOUT_MS ('5000' by default)
+- SYSLOG_SPOOL ('no' by default)
+- SYSLOG_SPOOL_DIR ('./syslog/spool' by default)
+- SYSLOG_SPOOL_SEGMENT_BYTES ('67108864' by default)
+
 See the 'python-dotenv' module for more information.
 
 For convenience, you can begin the collector by
@@ -25,6 +89,16 @@ calling 'pysyslog_server.start()'. No need to import
 >>> import pysyslog_server
 >>> pysyslog_server.start() # Listens for and handles Syslog messages
 
+If SYSLOG_STORE is 'yes', stored messages can be searched
+from the command line, e.g.:
+
+>>> python -m pysyslog_server query --host localhost --since 2h
+
+Files written by the collector can be loaded into MongoDB
+(or the store, or the export) in bulk, e.g.:
+
+>>> python -m pysyslog_server import syslog/syslog.log --to db
+
 If you only want to validate individual messages, you can 
 do so like this:
 
@@ -38,5 +112,11 @@ you can do so like this:
 >>> from pysyslog_server.parser import Parser
 >>> parser = Parser(valid_syslog_message)
 >>> parsed_syslog = parser.parse()
+
+The result is a SyslogRecord, not a dict. Its fields are read like
+the keys of a dict, and to_dict() copies them into one:
+
+>>> parsed_syslog["hostname"]
+>>> parsed_syslog.to_dict()
 """
 from .collector import start
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""
+Command-line tools of the collector.
+
+>>> python -m pysyslog_server query --host core-sw1 --since 2h --severity "<=3"
+>>> python -m pysyslog_server import syslog/syslog.log --to db
+
+See 'python -m pysyslog_server <command> --help' for the options of every command.
+"""
+import argparse
+import os
+import sys
+import time
+import dotenv
+from . import collector, config, importer, store
+from .columnar import ParquetSink
+from .clock import get_timezone
+from .log import ConsoleLogging
+from .mongo import MongoSink
+from .store import SegmentStore
+from .validator import NON_ASCII_ESCAPE, NON_ASCII_POLICIES
+
+
+def _query(args: argparse.Namespace) -> int:
+    """
+    Prints the stored messages matching the arguments.
+
+    Args:
+        args (argparse.Namespace): The arguments of the 'query' command.
+
+    Returns:
+        int: The exit status.
+    """
+    try:
+        severity: tuple = store.parse_severity(args.severity) if args.severity else None
+        facilities: list = [store.parse_facility(facility) for facility in args.facility] or None
+        since: float = store.parse_time(args.since) if args.since else None
+        until: float = store.parse_time(args.until) if args.until else None
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        for syslog_message in store.query(args.dir, args.host or None, args.tag or None, facilities, severity,
+                                          since, until, args.limit):
+            print(syslog_message)
+    except BrokenPipeError: # e.g. piped into 'head'
+        sys.stderr.close()
+    return 0
+
+
+def _import(args: argparse.Namespace) -> int:
+    """
+    Imports files into the sinks given by the arguments.
+
+    Args:
+        args (argparse.Namespace): The arguments of the 'import' command.
+
+    Returns:
+        int: The exit status.
+    """
+    targets: set = set(args.to) or {target for target, variable in (("db", "SYSLOG_USE_DB"), ("store", "SYSLOG_STORE"),
+                                                                    ("export", "SYSLOG_EXPORT"))
+                                    if config.get_bool(variable, False)}
+    if not targets:
+        print("error: nothing to import into. Use --to, or set SYSLOG_USE_DB, SYSLOG_STORE, or SYSLOG_EXPORT",
+              file=sys.stderr)
+        return 2
+    timezone_name: str = config.get_str("SYSLOG_TIMEZONE", "local")
+    non_ascii: str = config.get_str("SYSLOG_NON_ASCII", NON_ASCII_ESCAPE).lower()
+    if non_ascii not in NON_ASCII_POLICIES:
+        print(f"error: Unknown SYSLOG_NON_ASCII '{non_ascii}'. Use one of {NON_ASCII_POLICIES}", file=sys.stderr)
+        return 2
+    state: importer.ImportState = importer.ImportState(args.state)
+    if args.restart:
+        for path in args.files:
+            state.offsets.pop(os.path.abspath(path), None)
+
+    console: ConsoleLogging = collector._create_console_logging()
+    console.start()
+    db_sink: MongoSink = None
+    segment_store: SegmentStore = None
+    exporter: ParquetSink = None
+    pool = None
+
+    def write(results: list):
+        for syslog_message, fields, received in results:
+            if segment_store is not None:
+                segment_store.write(syslog_message, fields, received)
+            if exporter is not None:
+                exporter.write(syslog_message, fields, received)
+        if db_sink is not None:
+            # one bulk write per chunk; pymongo splits it into batches the server accepts
+            documents: list = [fields.to_dict() for _, fields, _ in results if fields is not None]
+            if documents:
+                db_sink.insert(documents)
+        # the offset after the chunk is saved once this returns
+        if segment_store is not None:
+            segment_store.flush()
+        if exporter is not None:
+            exporter.flush()
+
+    status: int = 0
+    try:
+        if "store" in targets:
+            segment_store = SegmentStore(config.get_str("SYSLOG_STORE_DIR", "./syslog/store"),
+                                         config.get_str("SYSLOG_STORE_PARTITION", "hour").lower())
+            segment_store.start()
+        if "export" in targets:
+            exporter = ParquetSink(
+                config.get_str("SYSLOG_EXPORT_DIR", "./syslog/export"),
+                window=config.get_str("SYSLOG_EXPORT_WINDOW", "hour").lower(),
+                compression=config.get_str("SYSLOG_EXPORT_COMPRESSION", "zstd").lower(),
+                batch_size=config.get_int("SYSLOG_EXPORT_BATCH_SIZE", 10000),
+                timezone=get_timezone(timezone_name)
+            )
+            exporter.start()
+        if "db" in targets:
+            db_sink = collector._create_db_sink()
+
+        pool = importer.create_pool(args.processes, timezone_name, non_ascii)
+        for path in args.files:
+            start: float = time.monotonic()
+            try:
+                imported: int = importer.import_file(
+                    path, write, state, pool, args.chunk_size * 2**20, 2 * args.processes,
+                    lambda *progress: print(f"\r{importer.format_progress(*progress, start)}", end="",
+                                            file=sys.stderr, flush=True))
+            except (OSError, ValueError) as e:
+                print(f"error: {e}", file=sys.stderr)
+                status = 1
+                continue
+            print("" if imported else f"{path}: nothing to import", file=sys.stderr)
+    except ValueError as e: # e.g. SYSLOG_EXPORT without pyarrow
+        print(f"error: {e}", file=sys.stderr)
+        status = 2
+    except KeyboardInterrupt:
+        print("\nInterrupted; run the same command again to resume", file=sys.stderr)
+        status = 130
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if segment_store is not None:
+            segment_store.close()
+        if exporter is not None:
+            exporter.close()
+        if db_sink is not None:
+            db_sink.collection.database.client.close()
+        console.stop()
+    return status
+
+
+def main(argv: list = None) -> int:
+    """
+    Runs a command.
+
+    Args:
+        argv (list): The command-line arguments, or None for sys.argv.
+
+    Returns:
+        int: The exit status.
+    """
+    dotenv.load_dotenv()
+    arguments: argparse.ArgumentParser = argparse.ArgumentParser(prog="python -m pysyslog_server",
+                                                                 description="Tools for the Syslog collector.")
+    commands = arguments.add_subparsers(dest="command", required=True)
+
+    query: argparse.ArgumentParser = commands.add_parser(
+        "query", help="search the store (SYSLOG_STORE=yes)",
+        description="Prints the stored messages matching every given filter, oldest first. "
+                    "Only the segments in the time range are read.")
+    query.add_argument("--dir", default=config.get_str("SYSLOG_STORE_DIR", "./syslog/store"),
+                       help="the directory of the store (SYSLOG_STORE_DIR by default)")
+    query.add_argument("--host", action="append", default=[], help="HOSTNAME; may be repeated")
+    query.add_argument("--tag", action="append", default=[], help="TAG without its ':' or '[', e.g. 'sshd'; may be repeated")
+    query.add_argument("--facility", action="append", default=[], help="facility name or number; may be repeated")
+    query.add_argument("--severity", help="severity name or number, optionally compared, e.g. '<=3' or '<=err'")
+    query.add_argument("--since", help="e.g. '30m', '2h', '7d', or '2026-10-17T08:00' (local time)")
+    query.add_argument("--until", help="same formats as --since")
+    query.add_argument("--limit", type=int, help="print at most this many messages")
+    query.set_defaults(run=_query)
+
+    bulk_import: argparse.ArgumentParser = commands.add_parser(
+        "import", help="load files written by the collector into MongoDB, the store, or the export",
+        description="Validates and parses files written by the collector (e.g. syslog.log) in parallel and "
+                    "saves the messages in bulk. An interrupted import resumes where it left off.")
+    bulk_import.add_argument("files", nargs="+", help="uncompressed files, one message per line")
+    bulk_import.add_argument("--to", action="append", default=[], choices=("db", "store", "export"),
+                             help="where to save the messages; may be repeated. By default, wherever "
+                                  "SYSLOG_USE_DB, SYSLOG_STORE, and SYSLOG_EXPORT are 'yes'")
+    bulk_import.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="parsing processes (one per CPU by default)")
+    bulk_import.add_argument("--chunk-size", type=int, default=8, help="MiB of a file parsed at once (8 by default)")
+    bulk_import.add_argument("--state", default="./syslog/import.json", help="where the offsets to resume from are kept")
+    bulk_import.add_argument("--restart", action="store_true", help="import the files from the start")
+    bulk_import.set_defaults(run=_import)
+
+    args: argparse.Namespace = arguments.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,632 @@
+"""
+Contains an asyncio-based engine for receiving Syslog messages,
+as an alternative to the blocking receive loop and worker threads.
+
+The engine uses uvloop if it is installed, and can save to MongoDB
+with motor if it is installed.
+"""
+import asyncio
+import collections
+import signal
+import socket
+import time
+from typing import Callable, Tuple
+
+try:
+    import uvloop
+except ImportError: # uvloop is optional
+    uvloop = None
+
+try:
+    import motor.motor_asyncio as motor_asyncio
+except ImportError: # motor is optional
+    motor_asyncio = None
+
+from pymongo.errors import BulkWriteError
+
+from .dedup import DuplicateFilter
+from .listener import StreamFramer
+from .log import logger
+from .mongo import (BATCH_DOCUMENTS, DROPPED_DOCUMENTS, DUPLICATE_KEY_ERROR, INSERT_DURATION, INSERT_RETRIES,
+                    INSERTED_DOCUMENTS)
+from .pipeline import BLOCK, DROP_OLDEST, HANDLE_DURATION, OVERLOAD_POLICIES
+from .ratelimit import SourceRateLimiter
+from .record import SyslogRecord
+from .validator import Validator
+
+_STOP = object()
+
+
+class MessageQueue(asyncio.Queue):
+    """
+    Class for queueing received messages with an overload policy.
+
+    Attributes:
+        overload_policy (str): One of 'block', 'drop-newest', or 'drop-oldest'.
+        received (int): The number of messages offered.
+        dropped (int): The number of messages discarded because the queue was full.
+    """
+
+    def __init__(self, maxsize: int, overload_policy: str = BLOCK):
+        """
+        Inits MessageQueue.
+
+        Args:
+            maxsize (int): The maximum number of queued messages.
+            overload_policy (str): One of 'block', 'drop-newest', or 'drop-oldest'.
+        """
+        super().__init__(maxsize)
+        self.overload_policy = overload_policy
+        self.received = 0
+        self.dropped = 0
+
+
+    def offer(self, item: tuple) -> bool:
+        """
+        Queues a message without waiting.
+
+        Args:
+            item (tuple): The message and the IP address of the client.
+
+        Returns:
+            bool: False if the queue is full and the overload policy is
+                'block'. The caller must then wait for room or drop the message.
+        """
+        self.received += 1
+        if self.full():
+            if self.overload_policy == BLOCK:
+                return False
+            self.dropped += 1
+            if self.overload_policy != DROP_OLDEST:
+                return True
+            self.get_nowait()
+            self.task_done()
+        self.put_nowait(item)
+        return True
+
+
+class SyslogProtocol(asyncio.DatagramProtocol):
+    """
+    Class for queueing datagrams received by the event loop.
+
+    A datagram callback can't wait for the queue to have room, so the
+    'block' overload policy behaves like 'drop-newest'; the kernel's
+    receive buffer is what absorbs bursts in that case.
+
+    Attributes:
+        queue (MessageQueue): The queue of (datagram, client address) tuples.
+        limiter (SourceRateLimiter): Drops datagrams from clients exceeding
+            their rate before they are queued, or None.
+    """
+
+    def __init__(self, queue: MessageQueue, limiter: SourceRateLimiter = None):
+        """
+        Inits SyslogProtocol.
+
+        Args:
+            queue (MessageQueue): The queue of (datagram, client address) tuples.
+            limiter (SourceRateLimiter): Drops datagrams from clients exceeding
+                their rate before they are queued, or None.
+        """
+        self.queue = queue
+        self.limiter = limiter
+
+
+    def datagram_received(self, data: bytes, addr: Tuple[str, int]):
+        """
+        Queues a datagram.
+
+        Args:
+            data (bytes): The ASCII-encoded message.
+            addr (Tuple[str, int]): The IP address and port of the client.
+        """
+        if self.limiter is not None and not self.limiter.allow(addr[0]):
+            return
+        if not self.queue.offer((data, addr[0])):
+            self.queue.dropped += 1
+
+
+    def error_received(self, exc: Exception):
+        """
+        Reports errors of the socket (e.g. ICMP port unreachable).
+
+        Args:
+            exc (Exception): The error.
+        """
+        logger.error("[ERROR] %s: %s", type(exc).__name__, exc)
+
+
+class SyslogStreamProtocol(asyncio.BufferedProtocol):
+    """
+    Class for queueing messages received over a TCP connection.
+
+    Data is received directly into the buffer of a StreamFramer. If the
+    queue is full and the overload policy is 'block', reading from the
+    connection is paused until the queue has room, so TCP flow control
+    slows down the client instead of dropping messages.
+
+    Attributes:
+        queue (MessageQueue): The queue of (message, client address) tuples.
+        framer (StreamFramer): Splits the stream into messages.
+        limiter (SourceRateLimiter): Drops messages from clients exceeding
+            their rate before they are queued, or None.
+        flushing (asyncio.Task): Waits for room in the queue while reading
+            is paused, or None.
+    """
+
+    def __init__(self, queue: MessageQueue, max_message_length: int, connections: set,
+                 limiter: SourceRateLimiter = None):
+        """
+        Inits SyslogStreamProtocol.
+
+        Args:
+            queue (MessageQueue): The queue of (message, client address) tuples.
+            max_message_length (int): The maximum length of a message in bytes.
+            connections (set): The protocols of the open connections. The
+                protocol adds itself while connected or flushing.
+            limiter (SourceRateLimiter): Drops messages from clients exceeding
+                their rate before they are queued, or None.
+        """
+        self.queue = queue
+        self.framer = StreamFramer(max_message_length)
+        self.limiter = limiter
+        self.flushing: asyncio.Task = None
+        self.transport: asyncio.Transport = None
+        self._connections = connections
+        self._source_addr: str = None
+        self._backlog: collections.deque = collections.deque()
+
+
+    def connection_made(self, transport: asyncio.Transport):
+        """
+        Registers the connection.
+
+        Args:
+            transport (asyncio.Transport): The connection.
+        """
+        self.transport = transport
+        self._source_addr = transport.get_extra_info("peername")[0]
+        self._connections.add(self)
+
+
+    def connection_lost(self, exc: Exception):
+        """
+        Unregisters the connection once its queued messages are flushed.
+
+        Args:
+            exc (Exception): The error, or None if the client closed the connection.
+        """
+        if self.flushing is None:
+            self._connections.discard(self)
+
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        """
+        Returns the buffer to receive data into.
+
+        Args:
+            sizehint (int): Ignored.
+
+        Returns:
+            memoryview: The free part of the framer's buffer.
+        """
+        return self.framer.get_buffer()
+
+
+    def buffer_updated(self, nbytes: int):
+        """
+        Queues the messages completed by the received data.
+
+        Args:
+            nbytes (int): The number of bytes received.
+        """
+        self.framer.advance(nbytes)
+        for frame in self.framer.frames():
+            if self.limiter is not None and not self.limiter.allow(self._source_addr):
+                continue
+            item: tuple = (bytes(frame), self._source_addr)
+            if self._backlog:
+                self.queue.received += 1
+                self._backlog.append(item)
+            elif not self.queue.offer(item):
+                self._backlog.append(item)
+
+        if self._backlog and self.flushing is None:
+            self.transport.pause_reading()
+            self.flushing = asyncio.get_running_loop().create_task(self._flush())
+
+
+    async def _flush(self):
+        """Waits for room in the queue for the backlog, then resumes reading."""
+        try:
+            while self._backlog:
+                await self.queue.put(self._backlog.popleft())
+        finally:
+            self.flushing = None
+            if self.transport.is_closing():
+                self._connections.discard(self)
+            else:
+                self.transport.resume_reading()
+
+
+class CallbackSink:
+    """
+    Class for using a synchronous, non-blocking function as an async sink.
+
+    Useful for the FileWriter, the Spool, and the MongoSink, which only
+    queue the message and do the slow work on their own threads.
+
+    Attributes:
+        callback (Callable): Called with the valid message and its fields.
+    """
+
+    def __init__(self, callback: Callable):
+        """
+        Inits CallbackSink.
+
+        Args:
+            callback (Callable): Called with the valid message and its fields.
+        """
+        self.callback = callback
+
+
+    async def write(self, syslog_message: str, fields: SyslogRecord):
+        """
+        Passes a message to the callback.
+
+        Args:
+            syslog_message (str): The valid Syslog message.
+            fields (SyslogRecord): The parsed message, or None if not parsed.
+        """
+        self.callback(syslog_message, fields)
+
+
+    async def close(self):
+        """Does nothing; the owner of the callback closes it."""
+
+
+class AsyncMongoSink:
+    """
+    Class for inserting parsed Syslog messages with an async MongoDB driver.
+
+    The collection must be a motor collection (or any object whose
+    insert_many() returns an awaitable). Documents are inserted in
+    batches of up to 'batch_size', or after 'batch_interval' seconds.
+    write() waits while 'max_buffer' documents are buffered, which
+    slows down the engine instead of using unbounded memory.
+
+    Attributes:
+        collection: The collection the documents are inserted into.
+        batch_size (int): The maximum number of documents per insert_many().
+        batch_interval (float): The maximum number of seconds a document is buffered.
+        inserted (int): The number of documents inserted.
+        dropped (int): The number of documents that couldn't be inserted before closing.
+    """
+
+    def __init__(self, collection, batch_size: int = 500, batch_interval: float = 0.1, max_buffer: int = 100000,
+                 retry_backoff: float = 0.5, max_retry_backoff: float = 30.0):
+        """
+        Inits AsyncMongoSink.
+
+        Args:
+            collection: The collection the documents are inserted into.
+            batch_size (int): The maximum number of documents per insert_many().
+            batch_interval (float): The maximum number of seconds a document is buffered.
+            max_buffer (int): The maximum number of buffered documents.
+            retry_backoff (float): The number of seconds to wait before the first retry.
+            max_retry_backoff (float): The maximum number of seconds between retries.
+        """
+        self.collection = collection
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.inserted = 0
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(max_buffer)
+        self._closing = False
+        self._task: asyncio.Task = None
+
+
+    @property
+    def buffered(self) -> int:
+        """int: The number of documents waiting to be inserted."""
+        return self._queue.qsize()
+
+
+    def start(self):
+        """Starts the flusher task. Must be called from the event loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+
+    async def write(self, syslog_message: str, fields: SyslogRecord):
+        """
+        Buffers the fields of a message to be inserted.
+
+        Args:
+            syslog_message (str): The valid Syslog message.
+            fields (SyslogRecord): The parsed message. Ignored if None.
+        """
+        if fields is not None:
+            await self._queue.put(fields.to_dict())
+
+
+    async def close(self):
+        """Inserts the buffered documents and stops the flusher task."""
+        self._closing = True
+        await self._queue.put(_STOP)
+        await self._task
+
+
+    async def _run(self):
+        """Inserts batches of buffered documents until close() is called."""
+        loop = asyncio.get_running_loop()
+        stopping: bool = False
+        while not stopping:
+            batch: list = [await self._queue.get()]
+            deadline: float = loop.time() + self.batch_interval
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), max(0, deadline - loop.time())))
+                except asyncio.TimeoutError:
+                    break
+            if batch[-1] is _STOP:
+                batch.pop()
+                stopping = True
+            if batch:
+                await self._insert(batch)
+
+
+    async def _insert(self, batch: list):
+        """
+        Inserts a batch, retrying with exponential backoff on failure.
+
+        Args:
+            batch (list): The documents to insert.
+        """
+        backoff: float = self.retry_backoff
+        BATCH_DOCUMENTS.observe(len(batch))
+        while True:
+            start: float = time.perf_counter()
+            try:
+                await self.collection.insert_many(batch, ordered=False)
+                INSERT_DURATION.observe(time.perf_counter() - start)
+                self._inserted(len(batch))
+                return
+            except BulkWriteError as e:
+                # documents that were inserted by an earlier attempt are not errors
+                errors: list = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY_ERROR]
+                self._inserted(len(batch) - len(errors))
+                if errors:
+                    self.dropped += len(errors)
+                    DROPPED_DOCUMENTS.inc(len(errors))
+                    logger.error("[ERROR] MongoDB rejected %d logs: %s", len(errors), errors[0].get("errmsg"))
+                return
+            except Exception as e:
+                if self._closing:
+                    self.dropped += len(batch)
+                    DROPPED_DOCUMENTS.inc(len(batch))
+                    logger.error("[ERROR] Dropped %d logs while shutting down: %s", len(batch), e)
+                    return
+                INSERT_RETRIES.inc()
+                logger.warning("[ERROR] Failed to insert %d logs, retrying in %.1fs: %s", len(batch), backoff, e)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_retry_backoff)
+
+
+    def _inserted(self, count: int):
+        """
+        Records a successful insert.
+
+        Args:
+            count (int): The number of documents inserted.
+        """
+        self.inserted += count
+        INSERTED_DOCUMENTS.inc(count)
+        logger.debug("[INSERTED] Created %d logs", count)
+
+
+class AsyncEngine:
+    """
+    Class for receiving Syslog messages on an asyncio event loop.
+
+    Datagrams, and messages received over TCP if a TCP socket is given,
+    are queued by SyslogProtocol and SyslogStreamProtocol and handled by
+    a single consumer task, which calls the process function and passes
+    the result to every sink. On SIGTERM or SIGINT, the engine stops
+    receiving, handles the queued messages, and closes the sinks.
+
+    Sinks are objects with two coroutine methods:
+        write(syslog_message: str, fields: SyslogRecord)
+        close()
+
+    Attributes:
+        server (socket.socket): The bound UDP socket.
+        process (Callable): Called with the message and the client address.
+            Returns the valid message and its fields (or None).
+        sinks (list): The sinks every message is written to.
+        max_queue_size (int): The maximum number of queued messages.
+        overload_policy (str): One of 'block', 'drop-newest', or 'drop-oldest'.
+        tcp_server (socket.socket): The listening TCP socket, or None.
+        max_message_length (int): The maximum length of a message received over TCP.
+        limiter (SourceRateLimiter): Drops messages from clients exceeding
+            their rate before they are queued, or None.
+        dedup (DuplicateFilter): Collapses copies of recent messages, or None.
+        parse (bool): Indicates whether or not process() parses the messages.
+            Repeat records are parsed likewise.
+        failed (int): The number of messages that couldn't be handled.
+    """
+
+    def __init__(self, server: socket.socket, process: Callable, sinks: list, max_queue_size: int = 10000,
+                 overload_policy: str = BLOCK, tcp_server: socket.socket = None, max_message_length: int = 8192,
+                 limiter: SourceRateLimiter = None, dedup: DuplicateFilter = None, parse: bool = False):
+        """
+        Inits AsyncEngine.
+
+        Args:
+            server (socket.socket): The bound UDP socket.
+            process (Callable): Called with the message and the client address.
+                Returns the valid message and its fields (or None).
+            sinks (list): The sinks every message is written to.
+            max_queue_size (int): The maximum number of queued messages.
+            overload_policy (str): One of 'block', 'drop-newest', or 'drop-oldest'.
+            tcp_server (socket.socket): The listening TCP socket, or None.
+            max_message_length (int): The maximum length of a message received over TCP.
+            limiter (SourceRateLimiter): Drops messages from clients exceeding
+                their rate before they are queued, or None.
+            dedup (DuplicateFilter): Collapses copies of recent messages, or None.
+            parse (bool): Indicates whether or not process() parses the messages.
+                Repeat records are parsed likewise.
+
+        Raises:
+            ValueError: If the overload policy is unknown.
+        """
+        if overload_policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy '{overload_policy}'. Use one of {OVERLOAD_POLICIES}")
+
+        self.server = server
+        self.process = process
+        self.sinks = sinks
+        self.max_queue_size = max_queue_size
+        self.overload_policy = overload_policy
+        self.tcp_server = tcp_server
+        self.max_message_length = max_message_length
+        self.limiter = limiter
+        self.dedup = dedup
+        self.parse = parse
+        self.failed = 0
+        self._queue: MessageQueue = None
+        self._connections: set = set()
+        self._stopping: asyncio.Event = None
+
+
+    def stats(self) -> dict:
+        """
+        Returns the engine's counters.
+
+        Returns:
+            dict: The keys are 'received', 'dropped', 'failed', and 'queue_depth'.
+        """
+        if self._queue is None:
+            return {"received": 0, "dropped": 0, "failed": 0, "queue_depth": 0}
+        return {
+            "received": self._queue.received,
+            "dropped": self._queue.dropped,
+            "failed": self.failed,
+            "queue_depth": self._queue.qsize()
+        }
+
+
+    def stop(self):
+        """Stops serve(). Must be called from the event loop."""
+        self._stopping.set()
+
+
+    async def serve(self):
+        """Receives and handles messages until stop() is called or a signal is received."""
+        loop = asyncio.get_running_loop()
+        self._queue = MessageQueue(self.max_queue_size, self.overload_policy)
+        self._stopping = asyncio.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, self.stop)
+            except (NotImplementedError, RuntimeError): # not supported on Windows or outside the main thread
+                pass
+
+        for sink in self.sinks:
+            if hasattr(sink, "start"):
+                sink.start()
+        transport, _ = await loop.create_datagram_endpoint(lambda: SyslogProtocol(self._queue, self.limiter), sock=self.server)
+        tcp_server: asyncio.Server = None
+        if self.tcp_server is not None:
+            tcp_server = await loop.create_server(
+                lambda: SyslogStreamProtocol(self._queue, self.max_message_length, self._connections, self.limiter),
+                sock=self.tcp_server)
+        consumer: asyncio.Task = loop.create_task(self._consume())
+        expiring: asyncio.Task = None
+        if self.dedup is not None:
+            expiring = loop.create_task(self._expire_repeated())
+
+        await self._stopping.wait()
+        # stop receiving, then drain the queued messages
+        transport.close()
+        if tcp_server is not None:
+            tcp_server.close()
+            connections: list = list(self._connections)
+            for connection in connections:
+                connection.transport.close()
+            await asyncio.gather(*[connection.flushing for connection in connections if connection.flushing])
+        await self._queue.join()
+        consumer.cancel()
+        if expiring is not None:
+            expiring.cancel()
+        if self.dedup is not None:
+            await self._write_repeated(self.dedup.flush())
+        for sink in self.sinks:
+            await sink.close()
+
+
+    async def _consume(self):
+        """Handles queued messages."""
+        while True:
+            data, source_addr = await self._queue.get()
+            try:
+                start: float = time.perf_counter()
+                syslog_message, fields = self.process(data, source_addr)
+                is_new: bool = True
+                if self.dedup is not None:
+                    is_new, repeated = self.dedup.check(syslog_message, source_addr)
+                    await self._write_repeated(repeated)
+                if is_new:
+                    for sink in self.sinks:
+                        await sink.write(syslog_message, fields)
+                HANDLE_DURATION.observe(time.perf_counter() - start)
+            except Exception as e:
+                self.failed += 1
+                logger.error("[ERROR] %s: %s", type(e).__name__, e)
+            finally:
+                self._queue.task_done()
+
+
+    async def _write_repeated(self, repeated: list):
+        """
+        Processes the repeat records of messages whose copies were suppressed
+        and writes them to every sink.
+
+        Args:
+            repeated (list): (repeat record, source address) tuples returned
+                by DuplicateFilter.
+        """
+        for repeat_message, source_addr in repeated:
+            # validated like a received message, but not counted as one, since it never arrived
+            validator: Validator = Validator(repeat_message, source_addr, self.dedup.clock)
+            if self.parse:
+                syslog_message, fields, _, _ = validator.validate_and_parse()
+            else:
+                syslog_message, fields = validator.validate_message(), None
+            for sink in self.sinks:
+                await sink.write(syslog_message, fields)
+
+
+    async def _expire_repeated(self):
+        """Writes the repeat records of messages whose window ended, also while no messages arrive."""
+        while True:
+            await asyncio.sleep(min(self.dedup.window, 1.0))
+            try:
+                await self._write_repeated(self.dedup.expire())
+            except Exception as e:
+                self.failed += 1
+                logger.error("[ERROR] %s: %s", type(e).__name__, e)
+
+
+def run(engine: AsyncEngine, use_uvloop: bool = True):
+    """
+    Runs the engine until it is stopped.
+
+    Args:
+        engine (AsyncEngine): The engine to run.
+        use_uvloop (bool): Indicates whether or not to use uvloop if it is installed.
+    """
+    if use_uvloop and uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(engine.serve())
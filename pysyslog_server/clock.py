@@ -0,0 +1,92 @@
+"""
+Contains a class for generating RFC 3164 TIMESTAMPs for corrected
+Syslog messages.
+"""
+import datetime
+import time
+import zoneinfo
+
+MONTHS: tuple = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def get_timezone(name: str) -> datetime.tzinfo:
+    """
+    Looks up a timezone by name.
+
+    Args:
+        name (str): 'local' for the timezone of the system (i.e. the TZ
+            environment variable), 'UTC', or an IANA timezone name such
+            as 'America/New_York'.
+
+    Returns:
+        datetime.tzinfo: The timezone, or None for the local timezone.
+
+    Raises:
+        ValueError: If the timezone is unknown.
+    """
+    if name.lower() == "local":
+        return None
+    if name.upper() == "UTC":
+        return datetime.timezone.utc
+    try:
+        return zoneinfo.ZoneInfo(name)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone '{name}'. Install the 'tzdata' package if the system has no timezone database")
+
+
+class SyslogClock:
+    """
+    Class for formatting the current time as an RFC 3164 TIMESTAMP.
+
+    Because a TIMESTAMP only has a resolution of one second, it is
+    formatted once per second and reused for every message corrected
+    during that second.
+
+    Attributes:
+        timezone (datetime.tzinfo): The timezone of the TIMESTAMPs, or
+            None for the local timezone.
+    """
+
+    def __init__(self, timezone: datetime.tzinfo = None):
+        """
+        Inits SyslogClock.
+
+        Args:
+            timezone (datetime.tzinfo): The timezone of the TIMESTAMPs, or
+                None for the local timezone.
+        """
+        self.timezone = timezone
+        # (second, TIMESTAMP) is replaced as a whole, so threads never see a mismatched pair
+        self._cached: tuple = (None, "")
+
+
+    def timestamp(self) -> str:
+        """
+        Returns the current time as an RFC 3164 TIMESTAMP.
+
+        Returns:
+            str: The timestamp in the form 'Mmm dd hh:mm:ss'. If dd < 10,
+                the leading 0 is replaced with a space.
+        """
+        second: int = int(time.time())
+        cached_second, cached_timestamp = self._cached
+        if second == cached_second:
+            return cached_timestamp
+
+        timestamp: str = self.format(second)
+        self._cached = (second, timestamp)
+        return timestamp
+
+
+    def format(self, seconds: float) -> str:
+        """
+        Formats a point in time as an RFC 3164 TIMESTAMP.
+
+        Args:
+            seconds (float): The number of seconds since the epoch.
+
+        Returns:
+            str: The timestamp in the form 'Mmm dd hh:mm:ss'.
+        """
+        now: datetime.datetime = datetime.datetime.fromtimestamp(seconds, self.timezone)
+        return f"{MONTHS[now.month - 1]} {now.day:>2} {now.hour:02}:{now.minute:02}:{now.second:02}"
@@ -4,75 +4,621 @@ Syslog messages.
 """
 import sys
 import os
-import socket
+import functools
+import logging
+import signal
 import threading
+import time
+from typing import Callable, Tuple
 import dotenv
 import pymongo
-from .validator import Validator
+from . import aio, config, metrics
+from .clock import SyslogClock, get_timezone
+from .columnar import ParquetSink
+from .dedup import DuplicateFilter
+from .forward import Forwarder, parse_targets
+from .log import ConsoleLogging, get_level, logger
+from .listener import BatchedUDPListener, BufferPool, TCPListener, create_tcp_socket, create_udp_socket
+from .pipeline import WorkerPool
+from .ratelimit import SourceRateLimiter
+from .rules import Route, RuleSet
+from . import rules
+from .supervisor import Supervisor, publish_stats
+from .mongo import MongoSink
+from .rotation import Rotator
+from .spool import Spool, SpoolDrainer
+from .store import SegmentStore
+from .writer import FileWriter
+from .validator import NON_ASCII_ESCAPE, NON_ASCII_POLICIES, Validator, decode_non_ascii
 from .parser import Parser
+from .record import SyslogRecord
+
+# generates the TIMESTAMP of corrected messages; configured by _serve()
+_clock: SyslogClock = SyslogClock()
+# how bytes that aren't ASCII are decoded (SYSLOG_NON_ASCII); configured by _serve()
+_non_ascii: str = NON_ASCII_ESCAPE
+# appends messages to the file in './syslog/'; created by _serve()
+_file_writer: FileWriter = None
+# buffers parsed messages for MongoDB; None if SYSLOG_USE_DB != 'yes'
+_db_sink: MongoSink = None
+# spools valid messages to disk before they are saved to MongoDB; None if SYSLOG_SPOOL != 'yes'
+_spool: Spool = None
+# collapses repeated messages; None if SYSLOG_DEDUP != 'yes'
+_dedup: DuplicateFilter = None
+# appends messages to indexed segments for querying; None if SYSLOG_STORE != 'yes'
+_segment_store: SegmentStore = None
+# writes parsed messages to Parquet files; None if SYSLOG_EXPORT != 'yes'
+_exporter: ParquetSink = None
+# sends valid messages to downstream collectors; None if SYSLOG_FORWARD != 'yes'
+_forwarder: Forwarder = None
+# filters and routes messages; None if SYSLOG_RULES isn't set. Replaced as a whole on SIGHUP
+_rules: RuleSet = None
+# the writers of the files routed to by the rules, by file name, including SYSLOG_FILE
+_file_writers: dict = {}
+# the sinks of the collections routed to by the rules, by collection name, except MONGODB_COLLECTION
+_db_sinks: dict = {}
+
+_RECEIVED_BYTES: metrics.Counter = metrics.counter("syslog_received_bytes_total", "Bytes of the messages validated.")
+_CORRECTED: metrics.Counter = metrics.counter(
+    "syslog_messages_corrected_total", "Messages that needed a PRI or HEADER inserted.")
+_NON_ASCII: metrics.Counter = metrics.counter(
+    "syslog_messages_non_ascii_total", "Messages with bytes that aren't ASCII, decoded according to SYSLOG_NON_ASCII.")
+_STAGE: str = "syslog_stage_duration_seconds"
+_STAGE_HELP: str = "Time spent in each stage of handling a message."
+_VALIDATE_DURATION: metrics.Histogram = metrics.histogram(_STAGE, _STAGE_HELP, {"stage": "validate"})
+_VALIDATE_AND_PARSE_DURATION: metrics.Histogram = metrics.histogram(_STAGE, _STAGE_HELP, {"stage": "validate_and_parse"})
+_PARSE_DURATION: metrics.Histogram = metrics.histogram(_STAGE, _STAGE_HELP, {"stage": "parse"})
+_FILE_DURATION: metrics.Histogram = metrics.histogram(_STAGE, _STAGE_HELP, {"stage": "file"})
+_DB_DURATION: metrics.Histogram = metrics.histogram(_STAGE, _STAGE_HELP, {"stage": "db"})
+_RULES_DURATION: metrics.Histogram = metrics.histogram(_STAGE, _STAGE_HELP, {"stage": "rules"})
+_STORE_DURATION: metrics.Histogram = metrics.histogram(_STAGE, _STAGE_HELP, {"stage": "store"})
+_EXPORT_DURATION: metrics.Histogram = metrics.histogram(_STAGE, _STAGE_HELP, {"stage": "export"})
+_FORWARD_DURATION: metrics.Histogram = metrics.histogram(_STAGE, _STAGE_HELP, {"stage": "forward"})
+# read from the worker pool or the asyncio engine; see _serve()
+_RECEIVED: metrics.Counter = metrics.counter("syslog_messages_received_total", "Messages received.")
+_DROPPED: metrics.Counter = metrics.counter(
+    "syslog_messages_dropped_total", "Messages discarded by the overload policy because the queue was full.")
+_FAILED: metrics.Counter = metrics.counter("syslog_messages_failed_total", "Messages that couldn't be handled.")
+_QUEUE_DEPTH: metrics.Gauge = metrics.gauge("syslog_queue_depth", "Messages waiting to be handled.")
+_DB_BUFFERED: metrics.Gauge = metrics.gauge("syslog_mongodb_buffered", "Parsed messages waiting to be inserted.")
+_FORWARD_BUFFERED: metrics.Gauge = metrics.gauge(
+    "syslog_forward_buffered", "Messages waiting in memory to be sent to a downstream collector.")
+_FILTERED: metrics.Counter = metrics.counter("syslog_messages_filtered_total", "Messages dropped by a rule.")
+_DEDUPLICATED: metrics.Counter = metrics.counter(
+    "syslog_messages_deduplicated_total", "Copies of a message suppressed by SYSLOG_DEDUP.")
+_RATE_LIMITED: metrics.Counter = metrics.counter(
+    "syslog_messages_rate_limited_total", "Messages suppressed because their client exceeded SYSLOG_SOURCE_RATE.")
+_RATE_LIMITED_SOURCES: metrics.Gauge = metrics.gauge(
+    "syslog_rate_limited_sources", "Clients tracked by the per-client rate limiter.")
+
+
+def _validate(encoded_message: bytes, source_addr: str, parse: bool = False) -> Tuple[str, SyslogRecord]:
+    """
+    Performs validation/correction of the Syslog device's incoming message.
+
+    Bytes that aren't ASCII are decoded according to SYSLOG_NON_ASCII.
+
+    Args:
+        encoded_message (bytes): The ASCII-encoded message. Any object
+            supporting the buffer protocol (e.g. a memoryview) is accepted.
+        source_addr (str): The IP address of the client.
+        parse (bool): Indicates whether or not to also parse the message.
+
+    Returns:
+        Tuple[str, SyslogRecord]: The valid message, and the parsed message (or
+            None if it wasn't parsed).
+    """
+    start: float = time.perf_counter()
+    try:
+        # a single copy in C; the common case by far
+        message: str = str(encoded_message, "ascii").strip()
+    except UnicodeDecodeError:
+        message = decode_non_ascii(encoded_message, _non_ascii).strip()
+        _NON_ASCII.inc()
+    validator: Validator = Validator(message, source_addr, _clock)
+    parsed_syslog: SyslogRecord = None
+    if parse:
+        # validate and parse in a single scan
+        syslog_message, parsed_syslog, _, _ = validator.validate_and_parse()
+        _VALIDATE_AND_PARSE_DURATION.observe(time.perf_counter() - start)
+    else:
+        syslog_message: str = validator.validate_message()
+        _VALIDATE_DURATION.observe(time.perf_counter() - start)
+    _RECEIVED_BYTES.inc(len(encoded_message))
+
+    corrected: bool = syslog_message != message
+    if corrected:
+        _CORRECTED.inc()
+    if logger.isEnabledFor(logging.DEBUG):
+        # formatted by the logging thread; limited per client
+        if corrected:
+            logger.debug("[RECEIVED, CORRECTED] %s:\n\tBefore: %s\n\tAfter: %s", source_addr, message, syslog_message,
+                         extra={"source": source_addr})
+        else:
+            logger.debug("[RECEIVED] %s: %s", source_addr, syslog_message, extra={"source": source_addr})
+
+    return syslog_message, parsed_syslog
 
 
 def _handle_client(encoded_message: bytes, source_addr: str):
     """
     Handles the Syslog device's incoming message.
 
-    Performs validation/correction of the message.
+    Performs validation/correction of the message. If SYSLOG_DEDUP is
+    'yes', copies of a recent message are only counted.
 
     Args:
-        encoded_message (bytes): The ASCII-encoded message.
+        encoded_message (bytes): The ASCII-encoded message. Any object
+            supporting the buffer protocol (e.g. a memoryview) is accepted.
         source_addr (str): The IP address of the client.
     """
-    message: str = encoded_message.decode("ascii").strip() 
-    validator: Validator = Validator(message, source_addr)
-    syslog_message: str = validator.validate_message()
+    syslog_message, parsed_syslog = _validate(encoded_message, source_addr, _parse_on_receive())
+
+    if _dedup is not None:
+        is_new, repeated = _dedup.check(syslog_message, source_addr)
+        _store_repeated(repeated)
+        if not is_new:
+            return
 
-    if syslog_message == message:
-        print(f"[RECEIVED] {source_addr}: {syslog_message}")
+    _store(syslog_message, parsed_syslog)
+
+
+def _parse_on_receive() -> bool:
+    """
+    Decides whether received messages are parsed while they are validated.
+
+    Returns:
+        bool: True if the rules, the store, the export, or MongoDB need
+            the fields. Spooled messages are parsed when they are replayed
+            instead.
+    """
+    return (_rules is not None or _segment_store is not None or _exporter is not None
+            or (_db_sink is not None and _spool is None))
+
+
+def _store(syslog_message: str, parsed_syslog: SyslogRecord = None):
+    """
+    Appends the valid message to the file and saves it to MongoDB,
+    or wherever the rules route it. Unless the message is dropped, it
+    is also added to the store if SYSLOG_STORE is 'yes', exported if
+    SYSLOG_EXPORT is 'yes', and forwarded if SYSLOG_FORWARD is 'yes'.
+
+    Args:
+        syslog_message (str): The valid Syslog message.
+        parsed_syslog (SyslogRecord): The parsed message, or None if it wasn't parsed.
+    """
+    route: Route = None
+    if _rules is not None:
+        start: float = time.perf_counter()
+        route = _rules.route(parsed_syslog)
+        _RULES_DURATION.observe(time.perf_counter() - start)
+
+    if route is None:
+        _write_to_file(syslog_message)
+        if _db_sink is not None:
+            _save_to_db(syslog_message, parsed_syslog)
     else:
-        print(f"[RECEIVED, CORRECTED] {source_addr}:")
-        print(f"\tBefore: {message}")
-        print(f"\tAfter: {syslog_message}")
+        _route(syslog_message, parsed_syslog, route)
+    if route is None or route.files or route.collections:
+        if _segment_store is not None:
+            _write_to_store(syslog_message, parsed_syslog)
+        if _exporter is not None:
+            _export(syslog_message, parsed_syslog)
+        if _forwarder is not None:
+            _forward(syslog_message, parsed_syslog)
+
+
+def _route(syslog_message: str, parsed_syslog: SyslogRecord, route: Route):
+    """
+    Appends the valid message to the files and saves it to the collections of the matching rules.
+
+    Args:
+        syslog_message (str): The valid Syslog message.
+        parsed_syslog (SyslogRecord): The parsed message.
+        route (Route): Where the message goes. If it has no files and
+            no collections, the message is dropped.
+    """
+    if not route.files and not route.collections:
+        _FILTERED.inc()
+        return
+
+    for file in route.files:
+        start: float = time.perf_counter()
+        _file_writers[file].write(syslog_message)
+        _FILE_DURATION.observe(time.perf_counter() - start)
+    for collection in route.collections:
+        db_sink: MongoSink = _db_sinks.get(collection)
+        if db_sink is None: # MONGODB_COLLECTION
+            _save_to_db(syslog_message, parsed_syslog)
+        else:
+            start = time.perf_counter()
+            # insert_many() adds an '_id' to every document, so every collection gets its own dict
+            db_sink.save(parsed_syslog.to_dict())
+            _DB_DURATION.observe(time.perf_counter() - start)
+
+
+def _load_rules(path: str, worker_index: int = None):
+    """
+    Reads and compiles the rules, and replaces the current ones.
+
+    Files and collections that the rules route to for the first time
+    are opened; those no longer routed to stay open until shutdown, as
+    a message may still be on its way to them.
+
+    Args:
+        path (str): The path of the JSON rules file.
+        worker_index (int): The index of the worker process if the
+            files are sharded, or None.
+
+    Raises:
+        OSError: If the file can't be read.
+        ValueError: If the rules are malformed, or route to a collection
+            while SYSLOG_USE_DB isn't 'yes'.
+    """
+    global _rules
+    rule_set: RuleSet = rules.load(path)
+    if rule_set.collections and _db_sink is None:
+        raise ValueError("Rules can only route to collections if SYSLOG_USE_DB is 'yes'")
+
+    for file in rule_set.files - _file_writers.keys():
+        shard: str = file if worker_index is None else _shard_file_name(file, worker_index)
+        file_writer: FileWriter = _create_file_writer(shard)
+        file_writer.start()
+        _file_writers[file] = file_writer
+    for collection in rule_set.collections - _db_sinks.keys():
+        if collection != _db_sink.collection.name:
+            db_sink: MongoSink = _create_db_sink(collection)
+            db_sink.start()
+            _db_sinks[collection] = db_sink
+
+    _rules = rule_set
+    logger.info("[RULES] Loaded %d rules from %s", len(rule_set.rules), path)
+
+
+def _reload_rules(path: str, worker_index: int = None):
+    """
+    Reloads the rules on SIGHUP, keeping the current ones if the new ones are invalid.
+
+    Args:
+        path (str): The path of the JSON rules file, or None if SYSLOG_RULES isn't set.
+        worker_index (int): The index of the worker process if the
+            files are sharded, or None.
+    """
+    if path is None:
+        logger.info("[RULES] SIGHUP received, but SYSLOG_RULES isn't set")
+        return
+    try:
+        _load_rules(path, worker_index)
+    except (OSError, ValueError) as e:
+        logger.error("[RULES] Keeping the current rules, failed to load %s: %s", path, e)
+
+
+def _store_repeated(repeated: list):
+    """
+    Stores the repeat records of messages whose copies were suppressed.
+
+    Args:
+        repeated (list): (repeat record, source address) tuples returned
+            by DuplicateFilter.
+    """
+    parse: bool = _parse_on_receive()
+    for repeat_message, source_addr in repeated:
+        # validated like a received message, but not counted as one, since it never arrived
+        validator: Validator = Validator(repeat_message, source_addr, _clock)
+        if parse:
+            syslog_message, parsed_syslog, _, _ = validator.validate_and_parse()
+            _store(syslog_message, parsed_syslog)
+        else:
+            _store(validator.validate_message())
+
+
+def _expire_repeated(stopping: threading.Event):
+    """
+    Stores the repeat records of messages whose window ended, until
+    stopping is set, so the record of a client that went quiet isn't
+    held back until its next message.
+
+    Args:
+        stopping (threading.Event): Set when the collector shuts down.
+    """
+    while not stopping.wait(min(_dedup.window, 1.0)):
+        try:
+            _store_repeated(_dedup.expire())
+        except Exception as e:
+            logger.error("[ERROR] %s: %s", type(e).__name__, e)
+
+
+def _handle_buffer(buffers: BufferPool, buffer: bytearray, length: int, source_addr: str):
+    """
+    Handles a message received into a pooled buffer.
+
+    The buffer is given back to the pool once the message has been
+    handled.
+
+    Args:
+        buffers (BufferPool): The pool the buffer was taken from, or None
+            if the buffer isn't pooled (e.g. a datagram from recvfrom()).
+        buffer (bytearray): The buffer holding the ASCII-encoded message.
+        length (int): The number of bytes received into the buffer.
+        source_addr (str): The IP address of the client.
+    """
+    try:
+        if length == len(buffer):
+            _handle_client(buffer, source_addr)
+        else:
+            with memoryview(buffer) as view:
+                _handle_client(view[:length], source_addr)
+    finally:
+        if buffers is not None:
+            buffers.release(buffer)
+
+
+def _release_buffer(buffers: BufferPool, buffer: bytearray, length: int, source_addr: str):
+    """
+    Gives the buffer of a dropped message back to its pool.
+
+    Args:
+        buffers (BufferPool): The pool the buffer was taken from, or None
+            if the buffer isn't pooled.
+        buffer (bytearray): The buffer holding the message.
+        length (int): Ignored.
+        source_addr (str): Ignored.
+    """
+    if buffers is not None:
+        buffers.release(buffer)
+
+
+def _rate_limited(limiter: SourceRateLimiter, submit: Callable) -> Callable:
+    """
+    Wraps a function that submits received messages, so that messages
+    from clients exceeding their rate are dropped first.
+
+    Args:
+        limiter (SourceRateLimiter): The per-client rate limiter.
+        submit (Callable): Called like _handle_buffer() with the accepted messages.
+
+    Returns:
+        Callable: Called like _handle_buffer() with every received message.
+    """
+    def submit_allowed(buffers: BufferPool, buffer: bytearray, length: int, source_addr: str):
+        if limiter.allow(source_addr):
+            submit(buffers, buffer, length, source_addr)
+        else:
+            _release_buffer(buffers, buffer, length, source_addr)
+    return submit_allowed
+
+
+def _write_to_file(syslog: str, parsed_syslog: SyslogRecord = None):
+    """
+    Queues the syslog message to be appended to the file.
+
+    Args:
+        syslog (str): The valid Syslog message.
+        parsed_syslog (SyslogRecord): Ignored.
+    """
+    start: float = time.perf_counter()
+    _file_writer.write(syslog)
+    _FILE_DURATION.observe(time.perf_counter() - start)
 
-    file: str = os.getenv("SYSLOG_FILE") or "syslog.log"
-    with open("./syslog/" + file, "a") as f:
-        f.write(f"{syslog_message}\n")
 
-    use_db: str = os.getenv("SYSLOG_USE_DB") or "no"
-    if(use_db.lower() == "yes"):
-        _save_to_db(syslog_message)
+def _write_to_store(syslog: str, parsed_syslog: SyslogRecord = None):
+    """
+    Queues the syslog message to be appended to the store and indexed.
+
+    Args:
+        syslog (str): The valid Syslog message.
+        parsed_syslog (SyslogRecord): The parsed message, or None if it couldn't
+            be parsed.
+    """
+    start: float = time.perf_counter()
+    _segment_store.write(syslog, parsed_syslog)
+    _STORE_DURATION.observe(time.perf_counter() - start)
+
+
+def _export(syslog: str, parsed_syslog: SyslogRecord = None):
+    """
+    Queues the parsed message to be written to a Parquet file.
+
+    Args:
+        syslog (str): The valid Syslog message.
+        parsed_syslog (SyslogRecord): The parsed message, or None if it couldn't
+            be parsed.
+    """
+    start: float = time.perf_counter()
+    _exporter.write(syslog, parsed_syslog)
+    _EXPORT_DURATION.observe(time.perf_counter() - start)
 
 
-def _save_to_db(syslog: str):
+def _forward(syslog: str, parsed_syslog: SyslogRecord = None):
+    """
+    Queues the syslog message to be sent to the downstream collectors.
+
+    Args:
+        syslog (str): The valid Syslog message.
+        parsed_syslog (SyslogRecord): Ignored.
+    """
+    start: float = time.perf_counter()
+    _forwarder.forward(syslog)
+    _FORWARD_DURATION.observe(time.perf_counter() - start)
+
+
+def _save_to_db(syslog: str, parsed_syslog: SyslogRecord = None):
     """
     Saves the syslog message to a MongoDB database.
 
     Performs parsing to split the message into facility, severity,
-    etc.
+    etc. unless the message was already parsed. If the spool is enabled,
+    the message is appended to the spool instead and parsed once it is
+    replayed.
 
     Args:
         syslog (str): The valid Syslog message.
+        parsed_syslog (SyslogRecord): The parsed message, or None to parse it here.
     """
-    parser: Parser = Parser(syslog)
-    parsed_syslog: dict = parser.parse()
+    start: float = time.perf_counter()
+    if _spool is not None:
+        _spool.append(syslog)
+    else:
+        if parsed_syslog is None:
+            parser: Parser = Parser(syslog)
+            parsed_syslog = parser.parse()
+            _PARSE_DURATION.observe(time.perf_counter() - start)
+        _db_sink.save(parsed_syslog.to_dict())
+    _DB_DURATION.observe(time.perf_counter() - start)
 
-    mongo_uri: str = os.getenv("MONGODB_URI") 
-    mongo_db_name: str = os.getenv("MONGODB_DBNAME") 
-    mongo_collection_name: str = os.getenv("MONGODB_COLLECTION") 
 
-    with pymongo.MongoClient(mongo_uri) as conn:
-        db = conn[mongo_db_name]
-        logs = db[mongo_collection_name]
+def _insert_spooled(syslogs: list[str]) -> bool:
+    """
+    Parses spooled messages and inserts them into MongoDB.
 
-        new_log = logs.insert_one(parsed_syslog)
-        print(f"[INSERTED] Created log ID: {new_log.inserted_id}")
+    Args:
+        syslogs (list[str]): The valid Syslog messages read from the spool.
 
+    Returns:
+        bool: False if MongoDB couldn't be reached before shutting down.
+    """
+    parsed_syslogs: list[dict] = []
+    for syslog in syslogs:
+        try:
+            start: float = time.perf_counter()
+            parsed_syslogs.append(Parser(syslog).parse().to_dict())
+            _PARSE_DURATION.observe(time.perf_counter() - start)
+        except (IndexError, ValueError) as e:
+            logger.error("[ERROR] Failed to parse spooled message '%s': %s", syslog, e)
 
-def start():
-    """Begins listening for Syslog messages."""
-    dotenv.load_dotenv()
-    syslog_dir: str = "./syslog/"
-    if not os.path.isdir(syslog_dir):
-        os.makedirs(syslog_dir)
+    return _db_sink.insert(parsed_syslogs) if parsed_syslogs else True
+
+
+def _create_db_sink(collection_name: str = None) -> MongoSink:
+    """
+    Creates the MongoDB sink.
+
+    The sink shares a single MongoClient (and its connection pool)
+    between all batches.
+
+    Args:
+        collection_name (str): The collection of a rule, or None for
+            MONGODB_COLLECTION. A rule's sink shares the MongoClient of
+            the MONGODB_COLLECTION sink.
+
+    Returns:
+        MongoSink: The configured (but not started) sink.
+    """
+    if collection_name is not None:
+        logs = _db_sink.collection.database[collection_name]
+    else:
+        mongo_uri: str = os.getenv("MONGODB_URI") 
+        mongo_db_name: str = os.getenv("MONGODB_DBNAME") 
+        mongo_collection_name: str = os.getenv("MONGODB_COLLECTION") 
+
+        # bounds how long an insert waits for an unreachable server, e.g. while shutting down
+        conn = pymongo.MongoClient(mongo_uri, serverSelectionTimeoutMS=config.get_int(
+            "MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000))
+        logs = conn[mongo_db_name][mongo_collection_name]
+
+    return MongoSink(
+        logs,
+        batch_size=config.get_int("MONGODB_BATCH_SIZE", 500),
+        batch_interval=config.get_int("MONGODB_BATCH_INTERVAL_MS", 100) / 1000,
+        max_buffer=config.get_int("MONGODB_BUFFER_SIZE", 100000)
+    )
+
+
+def _create_async_db_sink() -> aio.AsyncMongoSink:
+    """
+    Creates the MongoDB sink of the asyncio engine.
+
+    Requires motor. Uses the same settings as _create_db_sink().
+
+    Returns:
+        aio.AsyncMongoSink: The configured (but not started) sink.
+    """
+    conn = aio.motor_asyncio.AsyncIOMotorClient(os.getenv("MONGODB_URI"), serverSelectionTimeoutMS=config.get_int(
+        "MONGODB_SERVER_SELECTION_TIMEOUT_MS", 5000))
+    logs = conn[os.getenv("MONGODB_DBNAME")][os.getenv("MONGODB_COLLECTION")]
+
+    return aio.AsyncMongoSink(
+        logs,
+        batch_size=config.get_int("MONGODB_BATCH_SIZE", 500),
+        batch_interval=config.get_int("MONGODB_BATCH_INTERVAL_MS", 100) / 1000,
+        max_buffer=config.get_int("MONGODB_BUFFER_SIZE", 100000)
+    )
+
+
+def _create_console_logging() -> ConsoleLogging:
+    """
+    Creates the console output of this process.
+
+    Returns:
+        ConsoleLogging: The configured (but not started) console output.
+    """
+    return ConsoleLogging(
+        level=get_level(config.get_str("SYSLOG_LOG_LEVEL", "info")),
+        rate_limit=config.get_int("SYSLOG_LOG_RATE_LIMIT", 100),
+        rate_interval=config.get_float("SYSLOG_LOG_RATE_INTERVAL", 10.0),
+        max_queue_size=config.get_int("SYSLOG_LOG_QUEUE_SIZE", 10000)
+    )
+
+
+def _shard_file_name(file: str, worker_index: int) -> str:
+    """
+    Returns the name of the file that a worker process appends to.
+
+    For example, worker 2 appends 'syslog.log' messages to 'syslog.2.log'.
+
+    Args:
+        file (str): The configured file name.
+        worker_index (int): The index of the worker process.
+
+    Returns:
+        str: The name of the worker's shard.
+    """
+    root, extension = os.path.splitext(file)
+    return f"{root}.{worker_index}{extension}"
+
+
+def _create_file_writer(file: str) -> FileWriter:
+    """
+    Creates the writer for the file in './syslog/'.
+
+    Args:
+        file (str): The name of the file.
+
+    Returns:
+        FileWriter: The configured (but not started) writer.
+    """
+    rotator = Rotator(
+        max_bytes=config.get_int("SYSLOG_ROTATE_BYTES", 0),
+        interval=config.get_str("SYSLOG_ROTATE_INTERVAL", "none").lower(),
+        backups=config.get_int("SYSLOG_ROTATE_BACKUPS", 7),
+        compression=config.get_str("SYSLOG_ROTATE_COMPRESSION", "gzip").lower()
+    )
+    return FileWriter(
+        "./syslog/" + file,
+        flush_policy=config.get_str("SYSLOG_FILE_FLUSH", "interval").lower(),
+        flush_bytes=config.get_int("SYSLOG_FILE_FLUSH_BYTES", 65536),
+        flush_interval=config.get_float("SYSLOG_FILE_FLUSH_INTERVAL", 1.0),
+        fsync_policy=config.get_str("SYSLOG_FILE_FSYNC", "none").lower(),
+        fsync_interval=config.get_float("SYSLOG_FILE_FSYNC_INTERVAL", 1.0),
+        rotator=rotator if rotator.enabled else None
+    )
+
+
+def _serve(worker_index: int = 0, stats = None):
+    """
+    Listens for Syslog messages and hands them to a worker pool, or
+    to the asyncio engine if SYSLOG_USE_ASYNCIO is 'yes'.
+
+    On SIGTERM or SIGINT, the queued messages are handled and the
+    file is flushed before returning.
+
+    Args:
+        worker_index (int): The index of the worker process.
+        stats: The shared stats array of the Supervisor. If given, the
+            process is one of several workers sharing the listening port
+            via SO_REUSEPORT, and messages are saved to a separate shard.
+    """
+    global _clock, _non_ascii, _file_writer, _db_sink, _spool, _dedup, _segment_store, _exporter, _forwarder
     MAX_MESSAGE_LENGTH: int = 1024 # 1024 bytes
     LISTEN_ADDRESS: str = os.getenv("SYSLOG_LISTEN_ADDRESS") or "127.0.0.1"
     if(os.getenv("SYSLOG_LISTEN_PORT")):
@@ -80,14 +626,263 @@ def start():
     else:
         LISTEN_PORT = 514
 
-    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    server.bind((LISTEN_ADDRESS, LISTEN_PORT))
-    print(f"Listening on {LISTEN_ADDRESS} UDP/{LISTEN_PORT}\n\n")
+    RCVBUF: int = config.get_int("SYSLOG_RCVBUF", 0)
+    WORKER_THREADS: int = config.get_int("SYSLOG_WORKER_THREADS", 4)
+    QUEUE_SIZE: int = config.get_int("SYSLOG_QUEUE_SIZE", 10000)
+    OVERLOAD_POLICY: str = config.get_str("SYSLOG_OVERLOAD_POLICY", "block").lower()
+    BATCH_RECEIVE: bool = config.get_bool("SYSLOG_BATCH_RECEIVE", False)
+    BATCH_SIZE: int = config.get_int("SYSLOG_RECEIVE_BATCH_SIZE", 64)
+    TCP: bool = config.get_bool("SYSLOG_TCP", False)
+    TCP_LISTEN_PORT: int = config.get_int("SYSLOG_TCP_LISTEN_PORT", LISTEN_PORT)
+    TCP_MAX_MESSAGE_LENGTH: int = config.get_int("SYSLOG_TCP_MAX_MESSAGE_LENGTH", 8192)
+    USE_ASYNCIO: bool = config.get_bool("SYSLOG_USE_ASYNCIO", False)
+    SOURCE_RATE: float = config.get_float("SYSLOG_SOURCE_RATE", 0)
+    DEDUP: bool = config.get_bool("SYSLOG_DEDUP", False)
+    METRICS_ADDRESS: str = config.get_str("SYSLOG_METRICS_ADDRESS", "127.0.0.1")
+    METRICS_PORT: int = config.get_int("SYSLOG_METRICS_PORT", 0)
+    USE_DB: bool = config.get_bool("SYSLOG_USE_DB", False)
+    SPOOL: bool = config.get_bool("SYSLOG_SPOOL", False)
+    RULES: str = config.get_str("SYSLOG_RULES", "") or None
+    STORE: bool = config.get_bool("SYSLOG_STORE", False)
+    EXPORT: bool = config.get_bool("SYSLOG_EXPORT", False)
+    FORWARD: bool = config.get_bool("SYSLOG_FORWARD", False)
+    REUSE_PORT: bool = stats is not None
+
+    console: ConsoleLogging = None
+    if REUSE_PORT:
+        # the supervisor's logging thread doesn't exist in the worker process
+        console = _create_console_logging()
+        console.start()
+
+    _clock = SyslogClock(get_timezone(config.get_str("SYSLOG_TIMEZONE", "local")))
+    _non_ascii = config.get_str("SYSLOG_NON_ASCII", NON_ASCII_ESCAPE).lower()
+    if _non_ascii not in NON_ASCII_POLICIES:
+        raise ValueError(f"Unknown SYSLOG_NON_ASCII '{_non_ascii}'. Use one of {NON_ASCII_POLICIES}")
+    file: str = config.get_str("SYSLOG_FILE", "syslog.log")
+    _file_writer = _create_file_writer(_shard_file_name(file, worker_index) if REUSE_PORT else file)
+    _file_writer.start()
+    _file_writers[file] = _file_writer
+    if STORE:
+        store_dir: str = config.get_str("SYSLOG_STORE_DIR", "./syslog/store")
+        if REUSE_PORT:
+            store_dir = _shard_file_name(store_dir, worker_index)
+        _segment_store = SegmentStore(store_dir, config.get_str("SYSLOG_STORE_PARTITION", "hour").lower())
+        _segment_store.start()
+    if EXPORT:
+        export_dir: str = config.get_str("SYSLOG_EXPORT_DIR", "./syslog/export")
+        if REUSE_PORT:
+            export_dir = _shard_file_name(export_dir, worker_index)
+        _exporter = ParquetSink(
+            export_dir,
+            window=config.get_str("SYSLOG_EXPORT_WINDOW", "hour").lower(),
+            compression=config.get_str("SYSLOG_EXPORT_COMPRESSION", "zstd").lower(),
+            batch_size=config.get_int("SYSLOG_EXPORT_BATCH_SIZE", 10000),
+            timezone=_clock.timezone
+        )
+        _exporter.start()
+    if FORWARD:
+        forward_spool: Spool = None
+        if config.get_bool("SYSLOG_FORWARD_SPOOL", False):
+            forward_spool_dir: str = config.get_str("SYSLOG_FORWARD_SPOOL_DIR", "./syslog/forward")
+            if REUSE_PORT:
+                forward_spool_dir = _shard_file_name(forward_spool_dir, worker_index)
+            forward_spool = Spool(forward_spool_dir, config.get_int("SYSLOG_SPOOL_SEGMENT_BYTES", 64 * 1024 * 1024),
+                                  config.get_int("SYSLOG_FORWARD_SPOOL_MAX_BYTES", 1024 * 1024 * 1024))
+        _forwarder = Forwarder(
+            parse_targets(config.get_str("SYSLOG_FORWARD_TARGETS", "")),
+            protocol=config.get_str("SYSLOG_FORWARD_PROTOCOL", "tcp").lower(),
+            mode=config.get_str("SYSLOG_FORWARD_MODE", "failover").lower(),
+            batch_size=config.get_int("SYSLOG_FORWARD_BATCH_SIZE", 500),
+            max_buffer=config.get_int("SYSLOG_FORWARD_BUFFER_SIZE", 100000),
+            spool=forward_spool
+        )
+        _forwarder.start()
+        _FORWARD_BUFFERED.set_function(lambda: _forwarder.buffered)
+    if DEDUP:
+        _dedup = DuplicateFilter(
+            window=config.get_float("SYSLOG_DEDUP_WINDOW", 30.0),
+            max_entries=config.get_int("SYSLOG_DEDUP_MAX_ENTRIES", 10000),
+            clock=_clock
+        )
+        _DEDUPLICATED.set_function(lambda: _dedup.suppressed)
+    drainer: SpoolDrainer = None
+    async_db_sink: aio.AsyncMongoSink = None
+    if USE_DB and USE_ASYNCIO and not SPOOL and not RULES and aio.motor_asyncio is not None:
+        async_db_sink = _create_async_db_sink() # started by the engine
+        _DB_BUFFERED.set_function(lambda: async_db_sink.buffered)
+    elif USE_DB:
+        _db_sink = _create_db_sink()
+        _DB_BUFFERED.set_function(lambda: _db_sink.buffered)
+        if SPOOL:
+            spool_dir: str = config.get_str("SYSLOG_SPOOL_DIR", "./syslog/spool")
+            if REUSE_PORT:
+                spool_dir = _shard_file_name(spool_dir, worker_index)
+            _spool = Spool(spool_dir, config.get_int("SYSLOG_SPOOL_SEGMENT_BYTES", 64 * 1024 * 1024))
+            _spool.open()
+            drainer = SpoolDrainer(_spool, _insert_spooled, _db_sink.batch_size, _db_sink.batch_interval)
+            drainer.start()
+        else:
+            _db_sink.start()
+    if RULES:
+        _load_rules(RULES, worker_index if REUSE_PORT else None)
+
+    limiter: SourceRateLimiter = None
+    if SOURCE_RATE:
+        limiter = SourceRateLimiter(
+            SOURCE_RATE,
+            burst=config.get_float("SYSLOG_SOURCE_BURST", 0),
+            max_sources=config.get_int("SYSLOG_SOURCE_MAX_TRACKED", 100000),
+            summary_interval=config.get_float("SYSLOG_SOURCE_SUMMARY_INTERVAL", 10.0)
+        )
+        _RATE_LIMITED.set_function(lambda: limiter.suppressed)
+        _RATE_LIMITED_SOURCES.set_function(lambda: limiter.sources)
+
+    pool: WorkerPool = None
+    tcp_listener: TCPListener = None
+    tcp_thread: threading.Thread = None
+    expiring: threading.Event = None
+    expire_thread: threading.Thread = None
+    if USE_ASYNCIO:
+        server = create_udp_socket(LISTEN_ADDRESS, LISTEN_PORT, RCVBUF, reuse_port=REUSE_PORT)
+        tcp_server = create_tcp_socket(LISTEN_ADDRESS, TCP_LISTEN_PORT, REUSE_PORT) if TCP else None
+        # the threaded sinks only queue the message, so they don't block the event loop
+        if async_db_sink is not None:
+            sinks: list = [aio.CallbackSink(_write_to_file), async_db_sink]
+            if _segment_store is not None:
+                sinks.append(aio.CallbackSink(_write_to_store))
+            if _exporter is not None:
+                sinks.append(aio.CallbackSink(_export))
+            if _forwarder is not None:
+                sinks.append(aio.CallbackSink(_forward))
+        else:
+            sinks = [aio.CallbackSink(_store)]
+        parse: bool = async_db_sink is not None or _parse_on_receive()
+        engine = aio.AsyncEngine(server, functools.partial(_validate, parse=parse), sinks,
+                                 QUEUE_SIZE, OVERLOAD_POLICY, tcp_server, TCP_MAX_MESSAGE_LENGTH, limiter, _dedup, parse)
+        get_stats = engine.stats
+    else:
+        if BATCH_RECEIVE:
+            # every queued message and every message being handled holds a buffer
+            listener = BatchedUDPListener(LISTEN_ADDRESS, LISTEN_PORT, BATCH_SIZE, MAX_MESSAGE_LENGTH, RCVBUF,
+                                          buffer_count=QUEUE_SIZE + WORKER_THREADS + BATCH_SIZE, reuse_port=REUSE_PORT)
+        else:
+            server = create_udp_socket(LISTEN_ADDRESS, LISTEN_PORT, RCVBUF, reuse_port=REUSE_PORT)
+        # the buffers of messages dropped due to overload go back to their pools
+        pool = WorkerPool(_handle_buffer, WORKER_THREADS, QUEUE_SIZE, OVERLOAD_POLICY, _release_buffer)
+        pool.start()
+        get_stats = pool.stats
+        if _dedup is not None:
+            expiring = threading.Event()
+            expire_thread = threading.Thread(target=_expire_repeated, args=(expiring,), name="pysyslog-dedup", daemon=True)
+            expire_thread.start()
+        # limited before anything is decoded or queued
+        submit: Callable = pool.submit if limiter is None else _rate_limited(limiter, pool.submit)
+        if TCP:
+            # if the pool blocks, no more data is read and TCP flow control slows down the clients
+            tcp_listener = TCPListener(LISTEN_ADDRESS, TCP_LISTEN_PORT, TCP_MAX_MESSAGE_LENGTH, reuse_port=REUSE_PORT)
+            tcp_thread = threading.Thread(target=tcp_listener.serve_forever, name="tcp-listener", daemon=True,
+                                          args=(functools.partial(submit, tcp_listener.buffers),))
+            tcp_thread.start()
+    if REUSE_PORT:
+        publish_stats(stats, worker_index, get_stats)
+    _RECEIVED.set_function(lambda: get_stats()["received"])
+    _DROPPED.set_function(lambda: get_stats()["dropped"])
+    _FAILED.set_function(lambda: get_stats()["failed"])
+    _QUEUE_DEPTH.set_function(lambda: get_stats()["queue_depth"])
+    metrics_server: metrics.MetricsServer = None
+    if METRICS_PORT:
+        # worker processes can't share the port
+        metrics_server = metrics.MetricsServer(METRICS_ADDRESS, METRICS_PORT + worker_index)
+        metrics_server.start()
+        logger.info("[WORKER %d] Serving metrics on http://%s:%d/metrics", worker_index, METRICS_ADDRESS, metrics_server.port)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    if hasattr(signal, "SIGHUP"):
+        # the rules are swapped while messages keep being handled
+        signal.signal(signal.SIGHUP, lambda signum, frame: _reload_rules(RULES, worker_index if REUSE_PORT else None))
+    mode: str = " (asyncio)" if USE_ASYNCIO else " (batched)" if BATCH_RECEIVE else ""
+    tcp: str = f" and TCP/{TCP_LISTEN_PORT}" if TCP else ""
+    logger.info("[WORKER %d] Listening on %s UDP/%d%s%s", worker_index, LISTEN_ADDRESS, LISTEN_PORT, tcp, mode)
+
+    try:
+        if USE_ASYNCIO:
+            # the engine handles SIGTERM and SIGINT itself and returns once the queue is drained
+            aio.run(engine, config.get_bool("SYSLOG_USE_UVLOOP", True))
+        elif BATCH_RECEIVE:
+            listener.serve_forever(functools.partial(submit, listener.buffers))
+        else:
+            while True:
+                encoded_message, source_address = server.recvfrom(MAX_MESSAGE_LENGTH)
+                submit(None, encoded_message, len(encoded_message), source_address[0])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        if tcp_listener is not None:
+            tcp_listener.stop()
+            tcp_thread.join()
+            tcp_listener.close()
+        if pool is not None:
+            if expiring is not None:
+                expiring.set()
+                expire_thread.join()
+            pool.stop()
+            if _dedup is not None:
+                _store_repeated(_dedup.flush())
+        for file_writer in _file_writers.values():
+            file_writer.close()
+        if _segment_store is not None:
+            _segment_store.close()
+        if _exporter is not None:
+            _exporter.close()
+        if _forwarder is not None:
+            _forwarder.close()
+        if async_db_sink is not None:
+            async_db_sink.collection.database.client.close()
+        if _db_sink is not None:
+            if drainer is not None:
+                # the backlog isn't replayed now; it stays in the spool for the next start
+                drainer.stop()
+            for db_sink in _db_sinks.values():
+                db_sink.close()
+            # once closing, the sink stops retrying, so the drainer can't hang on an outage
+            _db_sink.close()
+            if drainer is not None:
+                drainer.close()
+                _spool.close()
+            _db_sink.collection.database.client.close()
+        if limiter is not None:
+            limiter.flush()
+        if console is not None:
+            console.stop()
+
+
+def start():
+    """
+    Begins listening for Syslog messages.
+
+    If SYSLOG_WORKERS is greater than 1, that many worker processes
+    are started and supervised. Otherwise, the messages are handled
+    in this process.
+    """
+    dotenv.load_dotenv()
+    syslog_dir: str = "./syslog/"
+    if not os.path.isdir(syslog_dir):
+        os.makedirs(syslog_dir)
 
-    while True:
-        encoded_message, source_address = server.recvfrom(MAX_MESSAGE_LENGTH)
-        thread = threading.Thread(target=_handle_client, args=(encoded_message, source_address[0]))
-        thread.start()
+    WORKERS: int = config.get_int("SYSLOG_WORKERS", 1)
+    console: ConsoleLogging = _create_console_logging()
+    console.start()
+    try:
+        if WORKERS > 1:
+            logger.info("Starting %d worker processes", WORKERS)
+            supervisor = Supervisor(_serve, WORKERS)
+            supervisor.run()
+        else:
+            _serve()
+    finally:
+        console.stop()
 
 
 if __name__ == "__main__":
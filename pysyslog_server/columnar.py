@@ -0,0 +1,344 @@
+"""
+Contains a sink that writes parsed messages to Parquet files for bulk
+analytics.
+
+Rather than one line or one document per message, messages are
+buffered and written as columns, one row group per batch, with the
+low-cardinality columns (facility, severity, HOSTNAME, and TAG)
+dictionary-encoded. A new file is started every hour (or day), so jobs
+can pick the files of a time range and aggregate whole columns with
+pandas, Polars, DuckDB, Spark, etc. instead of parsing text.
+
+Requires the optional 'pyarrow' package.
+"""
+import datetime
+import os
+import queue
+import threading
+import time
+from .clock import MONTHS
+from . import metrics
+from .log import logger
+from .record import RFC5424, SyslogRecord, rfc5424_seconds
+from .store import PARTITIONS, PARTITION_HOUR, segment_name, segment_range
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError: # Parquet export is optional
+    pyarrow = None
+
+COMPRESSIONS: tuple = ("zstd", "snappy", "gzip", "none")
+
+_STOP = object()
+
+_WRITE_DURATION: metrics.Histogram = metrics.histogram(
+    "syslog_export_write_duration_seconds", "Time spent writing a row group to a Parquet file.")
+_EXPORTED: metrics.Counter = metrics.counter("syslog_export_rows_total", "Messages written to Parquet files.")
+
+
+def normalize_timestamp(date: str, time_of_day: str, received: float, timezone: datetime.tzinfo = None) -> float:
+    """
+    Converts an RFC 3164 TIMESTAMP into a point in time.
+
+    A TIMESTAMP has neither a year nor a timezone. The year is taken
+    from the time the message was received (the year before, if that
+    would put the TIMESTAMP more than a day in the future, e.g. for a
+    message from Dec 31 received on Jan 1), and the timezone is assumed
+    to be the collector's.
+
+    Args:
+        date (str): The date of the TIMESTAMP, e.g. 'Oct 17' or 'Oct  7'.
+        time_of_day (str): The time of the TIMESTAMP, e.g. '23:09:19'.
+        received (float): The time the message was received in seconds since the epoch.
+        timezone (datetime.tzinfo): The timezone of the TIMESTAMP, or None
+            for the local timezone.
+
+    Returns:
+        float: The point in time in seconds since the epoch, or None if
+            the TIMESTAMP is invalid (e.g. Feb 29 in a common year).
+    """
+    try:
+        month: int = MONTHS.index(date[:3]) + 1
+        day: int = int(date[4:])
+        hour, minute, second = (int(part) for part in time_of_day.split(":"))
+        received_at: datetime.datetime = datetime.datetime.fromtimestamp(received, timezone)
+        moment: datetime.datetime = datetime.datetime(received_at.year, month, day, hour, minute, second, tzinfo=timezone)
+        if moment - received_at > datetime.timedelta(days=1):
+            moment = moment.replace(year=moment.year - 1)
+    except ValueError:
+        return None
+    return moment.timestamp()
+
+
+def message_timestamp(fields: SyslogRecord, received: float, timezone: datetime.tzinfo = None) -> float:
+    """
+    Converts the TIMESTAMP of a parsed message into a point in time.
+
+    Args:
+        fields (SyslogRecord): The parsed message.
+        received (float): The time the message was received in seconds since the epoch.
+        timezone (datetime.tzinfo): The timezone of RFC 3164 TIMESTAMPs, or
+            None for the local timezone. RFC 5424 TIMESTAMPs have their own.
+
+    Returns:
+        float: The point in time in seconds since the epoch, or None if
+            the TIMESTAMP is invalid or NILVALUE.
+    """
+    if fields.format == RFC5424:
+        return rfc5424_seconds(fields["timestamp"])
+    return normalize_timestamp(fields["date"], fields["time"], received, timezone)
+
+
+def _schema():
+    """
+    Returns the schema of the Parquet files.
+
+    Returns:
+        pyarrow.Schema: The schema.
+    """
+    return pyarrow.schema([
+        ("received", pyarrow.timestamp("us", tz="UTC")),
+        ("timestamp", pyarrow.timestamp("us", tz="UTC")),
+        ("facility", pyarrow.dictionary(pyarrow.int32(), pyarrow.int8())),
+        ("severity", pyarrow.dictionary(pyarrow.int32(), pyarrow.int8())),
+        ("hostname", pyarrow.dictionary(pyarrow.int32(), pyarrow.string())),
+        ("tag", pyarrow.dictionary(pyarrow.int32(), pyarrow.string())),
+        ("content", pyarrow.string()),
+    ])
+
+
+class ParquetSink:
+    """
+    Class for writing parsed messages to a Parquet file per time window.
+
+    Any thread may call write(). Messages are queued and written in
+    batches by the sink's thread, one row group per batch. Until its
+    window ends (or the sink is closed), a file is written with the
+    extension '.parquet.part', because Parquet files can only be read
+    once they are complete.
+
+    Every row has these columns:
+    - received: when the message was received, in UTC
+    - timestamp: the TIMESTAMP of the message, in UTC (see message_timestamp())
+    - facility, severity, hostname, tag: dictionary-encoded (the tag of an
+      RFC 5424 message is its APP-NAME)
+    - content: the CONTENT, or the whole message if it couldn't be parsed
+
+    Attributes:
+        directory (str): The directory of the files.
+        window (str): 'hour' or 'day'.
+        compression (str): The compression codec of the files.
+        batch_size (int): The maximum number of messages per row group.
+        batch_interval (float): The maximum number of seconds a message waits.
+        timezone (datetime.tzinfo): The timezone of the TIMESTAMPs, or None
+            for the local timezone.
+        exported (int): The number of messages written.
+    """
+
+    def __init__(self, directory: str, window: str = PARTITION_HOUR, compression: str = "zstd",
+                 batch_size: int = 10000, batch_interval: float = 5.0, timezone: datetime.tzinfo = None,
+                 max_queue_size: int = 100000):
+        """
+        Inits ParquetSink.
+
+        Args:
+            directory (str): The directory of the files. It is created if needed.
+            window (str): 'hour' or 'day'.
+            compression (str): 'zstd', 'snappy', 'gzip', or 'none'.
+            batch_size (int): The maximum number of messages per row group.
+            batch_interval (float): The maximum number of seconds a message waits.
+            timezone (datetime.tzinfo): The timezone of the TIMESTAMPs, or None
+                for the local timezone.
+            max_queue_size (int): The maximum number of messages waiting for the
+                sink's thread. write() blocks while the queue is full.
+
+        Raises:
+            ValueError: If the window or compression is unknown, or if the
+                'pyarrow' package isn't installed.
+        """
+        if window not in PARTITIONS:
+            raise ValueError(f"Unknown window '{window}'. Use one of {PARTITIONS}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}'. Use one of {COMPRESSIONS}")
+        if pyarrow is None:
+            raise ValueError("Parquet export requires the 'pyarrow' package")
+
+        self.directory = directory
+        self.window = window
+        self.compression = compression
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.timezone = timezone
+        self.exported = 0
+        self._schema = _schema()
+        self._queue: queue.Queue = queue.Queue(max_queue_size)
+        self._thread: threading.Thread = None
+        self._current: str = None
+        self._current_end: float = None
+        self._path: str = None
+        self._writer = None
+
+
+    def start(self):
+        """Starts the sink's thread."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="pysyslog-export", daemon=True)
+        self._thread.start()
+
+
+    def write(self, syslog_message: str, fields: SyslogRecord = None, received: float = None):
+        """
+        Queues a message to be written.
+
+        Args:
+            syslog_message (str): The valid Syslog message.
+            fields (SyslogRecord): The parsed message, or None if it couldn't be parsed.
+            received (float): The time the message arrived in seconds since
+                the epoch. If None, the current time is used.
+        """
+        self._queue.put((time.time() if received is None else received, syslog_message, fields))
+
+
+    def flush(self):
+        """
+        Writes every queued message, and returns once they have been written.
+
+        The file of the current window stays incomplete until its window ends.
+        """
+        if self._thread is None:
+            return
+        flushed: threading.Event = threading.Event()
+        self._queue.put(flushed)
+        flushed.wait()
+
+
+    def close(self):
+        """Writes every queued message, then stops the thread and completes the file."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        self._close_file()
+
+
+    def _run(self):
+        """
+        Writes queued messages in batches until close() is called.
+
+        The file of a window is completed once the window ends, even if
+        no more messages arrive.
+        """
+        while True:
+            batch: list = []
+            deadline: float = None
+            flushed: threading.Event = None
+            while len(batch) < self.batch_size:
+                try:
+                    if deadline is not None:
+                        timeout: float = max(0.0, deadline - time.monotonic())
+                    elif self._current is not None:
+                        timeout = max(0.0, self._current_end - time.time())
+                    else:
+                        timeout = None
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._write_batch(batch)
+                    return
+                if isinstance(item, threading.Event): # flush() is waiting
+                    flushed = item
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.batch_interval
+            try:
+                self._write_batch(batch)
+                if not batch and self._current is not None and time.time() >= self._current_end:
+                    self._close_file()
+            except (OSError, ValueError) as e: # e.g. pyarrow.ArrowInvalid
+                logger.error("[EXPORT] Failed to write %d messages: %s", len(batch), e)
+            if flushed is not None:
+                flushed.set()
+
+
+    def _write_batch(self, batch: list):
+        """
+        Writes a batch to the files of their windows.
+
+        Args:
+            batch (list): (arrival time, message, fields) tuples, in order.
+        """
+        i: int = 0
+        while i < len(batch):
+            window: str = segment_name(batch[i][0], self.window)
+            columns: tuple = ([], [], [], [], [], [], [])
+            received_column, timestamps, facilities, severities, hostnames, tags, contents = columns
+            while i < len(batch) and segment_name(batch[i][0], self.window) == window:
+                received, syslog_message, fields = batch[i]
+                received_column.append(int(received * 1e6))
+                if fields is None:
+                    timestamps.append(None)
+                    facilities.append(None)
+                    severities.append(None)
+                    hostnames.append(None)
+                    tags.append(None)
+                    contents.append(syslog_message)
+                else:
+                    timestamp: float = message_timestamp(fields, received, self.timezone)
+                    timestamps.append(None if timestamp is None else int(timestamp * 1e6))
+                    facilities.append(fields["facility"])
+                    severities.append(fields["severity"])
+                    hostnames.append(fields["hostname"])
+                    tags.append(fields["tag"])
+                    contents.append(fields["content"])
+                i += 1
+
+            start: float = time.perf_counter()
+            arrays: list = [pyarrow.array(column, field.type.value_type).dictionary_encode()
+                            if pyarrow.types.is_dictionary(field.type) else pyarrow.array(column, field.type)
+                            for column, field in zip(columns, self._schema)]
+            self._open_file(window).write_table(pyarrow.Table.from_arrays(arrays, schema=self._schema))
+            _WRITE_DURATION.observe(time.perf_counter() - start)
+            self.exported += len(received_column)
+            _EXPORTED.inc(len(received_column))
+
+
+    def _open_file(self, window: str):
+        """
+        Makes the file of a window the one being written.
+
+        A restarted collector doesn't overwrite the file of the current
+        window, but starts another one, e.g. '2026-10-17T23.1.parquet'.
+
+        Args:
+            window (str): The name of the window, e.g. '2026-10-17T23'.
+
+        Returns:
+            pyarrow.parquet.ParquetWriter: The writer of the file.
+        """
+        if window != self._current:
+            self._close_file()
+            path: str = os.path.join(self.directory, f"{window}.parquet")
+            number: int = 0
+            while os.path.exists(path) or os.path.exists(path + ".part"):
+                number += 1
+                path = os.path.join(self.directory, f"{window}.{number}.parquet")
+            self._writer = pyarrow.parquet.ParquetWriter(path + ".part", self._schema, compression=self.compression)
+            self._path = path
+            self._current = window
+            self._current_end = segment_range(f"{window}.log")[1]
+        return self._writer
+
+
+    def _close_file(self):
+        """Completes the file being written, if any."""
+        if self._current is None:
+            return
+        self._writer.close()
+        os.replace(self._path + ".part", self._path)
+        self._writer = None
+        self._path = None
+        self._current = None
@@ -0,0 +1,70 @@
+"""
+Contains helper functions for reading the collector's
+configuration from environment variables.
+
+Every setting has a default so that the collector can be started
+without a '.env' file. Boolean settings follow the same convention
+as 'SYSLOG_USE_DB', i.e. they are enabled only if set to 'yes'.
+"""
+import os
+
+
+def get_str(name: str, default: str) -> str:
+    """
+    Reads a string setting.
+
+    Args:
+        name (str): The name of the environment variable.
+        default (str): The value used if the variable is unset or empty.
+
+    Returns:
+        str: The value of the setting.
+    """
+    return os.getenv(name) or default
+
+
+def get_int(name: str, default: int) -> int:
+    """
+    Reads an integer setting.
+
+    Args:
+        name (str): The name of the environment variable.
+        default (int): The value used if the variable is unset or empty.
+
+    Returns:
+        int: The value of the setting.
+    """
+    value: str = os.getenv(name)
+    return int(value) if value else default
+
+
+def get_float(name: str, default: float) -> float:
+    """
+    Reads a floating point setting.
+
+    Args:
+        name (str): The name of the environment variable.
+        default (float): The value used if the variable is unset or empty.
+
+    Returns:
+        float: The value of the setting.
+    """
+    value: str = os.getenv(name)
+    return float(value) if value else default
+
+
+def get_bool(name: str, default: bool) -> bool:
+    """
+    Reads a 'yes'/'no' setting.
+
+    Args:
+        name (str): The name of the environment variable.
+        default (bool): The value used if the variable is unset or empty.
+
+    Returns:
+        bool: True if the variable is set to 'yes' (case insensitive).
+    """
+    value: str = os.getenv(name)
+    if not value:
+        return default
+    return value.lower() == "yes"
@@ -0,0 +1,166 @@
+"""
+Contains a filter that collapses repeated messages, like the
+"last message repeated N times" records of classic syslogd.
+
+Flapping interfaces and chatty daemons often send the same message
+thousands of times a minute. Only the first copy within a time window
+is stored; the number of copies that followed is stored as a single
+record once the window ends.
+"""
+import collections
+import threading
+import time
+from typing import Tuple
+from .clock import SyslogClock
+
+_TIMESTAMP_LENGTH: int = len("Mmm dd hh:mm:ss ")
+
+
+class DuplicateFilter:
+    """
+    Class for suppressing copies of a message seen within a time window.
+
+    Two valid messages are copies if they come from the same client and
+    have the same PRI, HOSTNAME, TAG, and CONTENT; their TIMESTAMPs may
+    differ. Only a hash of these is kept for every message, in insertion
+    order, so checking a message is O(1) and memory is bounded by
+    max_entries. (Two different messages with the same hash would be
+    treated as copies, but with 64-bit hashes that is vanishingly rare.)
+
+    When the window of a message ends, or it is evicted to make room,
+    a record like '<13>Oct 17 12:00:00 host last message repeated 41 times'
+    is returned by the next call to check() or expire(), or by flush(),
+    if any copies were suppressed. expire() should be called
+    periodically, so the record of a client that went quiet isn't held
+    back until its next message.
+
+    Attributes:
+        window (float): How long copies of a message are suppressed, in seconds.
+        max_entries (int): The maximum number of messages remembered.
+        clock (SyslogClock): Generates the TIMESTAMP of repeat records.
+        suppressed (int): The number of copies suppressed so far.
+    """
+
+    def __init__(self, window: float = 30.0, max_entries: int = 10000, clock: SyslogClock = None):
+        """
+        Inits DuplicateFilter.
+
+        Args:
+            window (float): How long copies of a message are suppressed, in seconds.
+            max_entries (int): The maximum number of messages remembered.
+            clock (SyslogClock): Generates the TIMESTAMP of repeat records.
+                If None, the local timezone is used.
+
+        Raises:
+            ValueError: If max_entries is less than 1.
+        """
+        if max_entries < 1:
+            raise ValueError(f"At least 1 message must be remembered, not {max_entries}")
+
+        self.window = window
+        self.max_entries = max_entries
+        self.clock = clock or SyslogClock()
+        self.suppressed = 0
+        # hash -> [expiry, copies, source address, PRI, HOSTNAME], oldest first
+        self._entries: collections.OrderedDict = collections.OrderedDict()
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def check(self, syslog_message: str, source_addr: str) -> Tuple[bool, list]:
+        """
+        Remembers a message, unless it is a copy of a remembered one.
+
+        Args:
+            syslog_message (str): The valid Syslog message.
+            source_addr (str): The IP address of the client.
+
+        Returns:
+            Tuple[bool, list]: Whether or not the message should be stored,
+                and the repeat records of messages whose window ended, as
+                (repeat record, source address) tuples. The repeat records
+                should be stored first.
+        """
+        pri_end: int = syslog_message.find(">") + 1
+        if syslog_message.startswith("1 ", pri_end): # RFC 5424; skip the VERSION and TIMESTAMP
+            rest: str = syslog_message[syslog_message.find(" ", pri_end + 2) + 1:]
+        else:
+            rest = syslog_message[pri_end + _TIMESTAMP_LENGTH:]
+        key: int = hash((source_addr, syslog_message[:pri_end], rest))
+        now: float = time.monotonic()
+        with self._lock:
+            repeated: list = self._expire(now)
+            entry: list = self._entries.get(key)
+            if entry is not None:
+                entry[1] += 1
+                self.suppressed += 1
+                return False, repeated
+
+            if len(self._entries) >= self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                if evicted[1]:
+                    repeated.append(self._repeat_record(evicted))
+            self._entries[key] = [now + self.window, 0, source_addr, syslog_message[:pri_end], rest.split(" ", 1)[0]]
+        return True, repeated
+
+
+    def expire(self) -> list:
+        """
+        Forgets the messages whose window ended.
+
+        Returns:
+            list: The repeat records of the forgotten messages with
+                suppressed copies, as (repeat record, source address) tuples.
+        """
+        with self._lock:
+            return self._expire(time.monotonic())
+
+
+    def flush(self) -> list:
+        """
+        Forgets every message, e.g. before shutting down.
+
+        Returns:
+            list: The repeat records of the messages with suppressed copies,
+                as (repeat record, source address) tuples.
+        """
+        with self._lock:
+            entries: list = list(self._entries.values())
+            self._entries.clear()
+        return [self._repeat_record(entry) for entry in entries if entry[1]]
+
+
+    def _expire(self, now: float) -> list:
+        """
+        Forgets the messages whose window ended. Must hold the lock.
+
+        Args:
+            now (float): The current time, as returned by time.monotonic().
+
+        Returns:
+            list: The repeat records of the forgotten messages with
+                suppressed copies, as (repeat record, source address) tuples.
+        """
+        repeated: list = []
+        # every entry has the same window, so the oldest expires first
+        while self._entries:
+            entry: list = next(iter(self._entries.values()))
+            if entry[0] > now:
+                break
+            self._entries.popitem(last=False)
+            if entry[1]:
+                repeated.append(self._repeat_record(entry))
+        return repeated
+
+
+    def _repeat_record(self, entry: list) -> Tuple[str, str]:
+        """
+        Builds the record of a message's suppressed copies.
+
+        Args:
+            entry (list): The entry of the message.
+
+        Returns:
+            Tuple[str, str]: The valid Syslog message, and the source address.
+        """
+        _, copies, source_addr, pri, hostname = entry
+        return f"{pri}{self.clock.timestamp()} {hostname} last message repeated {copies} times", source_addr
@@ -0,0 +1,471 @@
+"""
+Contains a sink that forwards valid messages to downstream collectors,
+so the collector can act as a relay (RFC 3164 section 4.3) in front of
+a central collector.
+
+Messages are buffered and sent in batches by a background thread:
+- over TCP, on a persistent connection per target, framed by octet
+  counting (RFC 6587), with a whole batch handed to the kernel by one
+  sendmsg() call (a writev) per 1024 buffers
+- over UDP, one datagram per message, sent back to back on a
+  connected socket per target
+
+In 'failover' mode, every batch goes to the first target that is up.
+In 'balance' mode, batches take turns among the targets that are up.
+A target that fails is skipped until its backoff ends. Delivery is at
+least once: a batch that fails halfway is sent again in full.
+"""
+import collections
+import select
+import socket
+import threading
+import time
+from typing import Tuple
+from . import metrics
+from .log import logger
+from .spool import Spool, SpoolDrainer
+
+PROTOCOL_TCP: str = "tcp"
+PROTOCOL_UDP: str = "udp"
+PROTOCOLS: tuple = (PROTOCOL_TCP, PROTOCOL_UDP)
+MODE_FAILOVER: str = "failover"
+MODE_BALANCE: str = "balance"
+MODES: tuple = (MODE_FAILOVER, MODE_BALANCE)
+DEFAULT_PORT: int = 514
+
+# the number of buffers passed to a single sendmsg(); IOV_MAX on Linux
+_MAX_BUFFERS: int = 1024
+
+SEND_DURATION: metrics.Histogram = metrics.histogram(
+    "syslog_forward_send_duration_seconds", "Time spent sending a batch to a downstream collector.")
+FORWARDED: metrics.Counter = metrics.counter("syslog_forward_messages_total", "Messages sent to a downstream collector.")
+DROPPED: metrics.Counter = metrics.counter(
+    "syslog_forward_dropped_total", "Messages dropped because the buffer or spool was full, or because no downstream collector could be reached while shutting down.")
+FAILURES: metrics.Counter = metrics.counter(
+    "syslog_forward_failures_total", "Failed connections or sends to a downstream collector.")
+
+
+def parse_targets(text: str) -> list[Tuple[str, int]]:
+    """
+    Parses a list of downstream collectors.
+
+    Args:
+        text (str): Comma-separated 'host:port' targets, e.g.
+            'central1:514,10.0.0.2,[fd00::2]:6514'. The port is 514 if omitted.
+
+    Returns:
+        list[Tuple[str, int]]: The (host, port) of every target, in order.
+
+    Raises:
+        ValueError: If there is no target, or a port is invalid.
+    """
+    targets: list = []
+    for target in (part.strip() for part in text.split(",")):
+        if not target:
+            continue
+        host, port = target, str(DEFAULT_PORT)
+        if target.startswith("["): # an IPv6 address
+            host, _, rest = target[1:].partition("]")
+            if rest:
+                port = rest.lstrip(":")
+        elif target.count(":") == 1:
+            host, port = target.split(":")
+        if not host or not port.isdigit() or not 0 < int(port) < 65536:
+            raise ValueError(f"Invalid forwarding target '{target}'. Use 'host:port'")
+        targets.append((host, int(port)))
+    if not targets:
+        raise ValueError("No forwarding targets given")
+    return targets
+
+
+def _send_buffers(sock: socket.socket, buffers: list):
+    """
+    Sends buffers in order, with as few system calls as possible.
+
+    Args:
+        sock (socket.socket): A connected stream socket.
+        buffers (list): The bytes to send.
+    """
+    if not hasattr(sock, "sendmsg"): # e.g. on Windows
+        sock.sendall(b"".join(buffers))
+        return
+    for start in range(0, len(buffers), _MAX_BUFFERS):
+        chunk: list = buffers[start:start + _MAX_BUFFERS]
+        sent: int = sock.sendmsg(chunk)
+        if sent < sum(map(len, chunk)): # the socket buffer filled up
+            sock.sendall(b"".join(chunk)[sent:])
+
+
+def _closed_by_peer(sock: socket.socket) -> bool:
+    """
+    Checks whether a downstream collector closed an idle connection.
+
+    Collectors never send anything, so a readable socket means the
+    connection was closed or reset. Without this check, the first batch
+    sent after the collector restarted would be lost.
+
+    Args:
+        sock (socket.socket): A connected stream socket.
+
+    Returns:
+        bool: True if the connection can't be used anymore.
+    """
+    # poll() instead of select(), which can't watch descriptors above FD_SETSIZE (1024)
+    poller = select.poll()
+    poller.register(sock, select.POLLIN)
+    if not poller.poll(0):
+        return False
+    try:
+        return not sock.recv(65536)
+    except OSError:
+        return True
+
+
+class Forwarder:
+    """
+    Class for sending valid messages to downstream collectors.
+
+    Any thread may call forward(). The messages are buffered and sent
+    by the sender thread once 'batch_size' messages are buffered, or
+    once the oldest buffered message has waited 'batch_interval' seconds.
+
+    While no target can be reached, the batch is retried and new
+    messages keep being buffered. If the buffer reaches 'max_buffer'
+    messages, the oldest messages are dropped. If a spool is given,
+    messages are appended to it instead and sent from there, so they
+    survive longer outages and restarts (up to the spool's max_bytes).
+
+    Attributes:
+        targets (list): The (host, port) of every downstream collector.
+        protocol (str): 'tcp' or 'udp'.
+        mode (str): 'failover' or 'balance'.
+        batch_size (int): The maximum number of messages per batch.
+        batch_interval (float): The maximum number of seconds a message is buffered.
+        max_buffer (int): The maximum number of buffered messages.
+        timeout (float): The number of seconds to wait for a connection or a send.
+        retry_backoff (float): The number of seconds a target is skipped after its first failure.
+        max_retry_backoff (float): The maximum number of seconds a target is skipped.
+        spool (Spool): The spool messages are sent from, or None.
+        forwarded (int): The number of messages sent.
+        batches (int): The number of batches sent.
+        failures (int): The number of failed connections or sends.
+        dropped (int): The number of messages dropped.
+    """
+
+    def __init__(self, targets: list, protocol: str = PROTOCOL_TCP, mode: str = MODE_FAILOVER, batch_size: int = 500,
+                 batch_interval: float = 0.05, max_buffer: int = 100000, timeout: float = 5.0,
+                 retry_backoff: float = 0.5, max_retry_backoff: float = 30.0, spool: Spool = None):
+        """
+        Inits Forwarder.
+
+        Args:
+            targets (list): The (host, port) of every downstream collector,
+                in order of preference (see parse_targets()).
+            protocol (str): 'tcp' or 'udp'.
+            mode (str): 'failover' or 'balance'.
+            batch_size (int): The maximum number of messages per batch.
+            batch_interval (float): The maximum number of seconds a message is buffered.
+            max_buffer (int): The maximum number of buffered messages.
+            timeout (float): The number of seconds to wait for a connection or a send.
+            retry_backoff (float): The number of seconds a target is skipped after its first failure.
+            max_retry_backoff (float): The maximum number of seconds a target is skipped.
+            spool (Spool): If given, messages are spooled to disk and sent
+                from there. It is opened by start() and closed by close().
+
+        Raises:
+            ValueError: If there is no target, or the protocol or mode is unknown.
+        """
+        if not targets:
+            raise ValueError("No forwarding targets given")
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unknown protocol '{protocol}'. Use one of {PROTOCOLS}")
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}'. Use one of {MODES}")
+
+        self.targets = list(targets)
+        self.protocol = protocol
+        self.mode = mode
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_buffer = max_buffer
+        self.timeout = timeout
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.spool = spool
+        self.forwarded = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self._buffer: collections.deque = collections.deque()
+        self._condition: threading.Condition = threading.Condition()
+        self._oldest = 0.0
+        self._stopping: threading.Event = threading.Event()
+        self._thread: threading.Thread = None
+        self._drainer: SpoolDrainer = None
+        # only used by the thread that sends
+        self._connections: dict = {}
+        self._consecutive_failures: dict = {target: 0 for target in self.targets}
+        self._retry_at: dict = {target: 0.0 for target in self.targets}
+        self._turn = 0
+
+
+    @property
+    def buffered(self) -> int:
+        """int: The number of messages waiting to be sent, not counting the spool."""
+        return len(self._buffer)
+
+
+    def start(self):
+        """Starts the sender thread."""
+        self._stopping.clear()
+        if self.spool is not None:
+            self.spool.open()
+            self._drainer = SpoolDrainer(self.spool, self.send, self.batch_size, self.batch_interval)
+            self._drainer.start()
+            return
+        self._thread = threading.Thread(target=self._run, name="pysyslog-forward", daemon=True)
+        self._thread.start()
+
+
+    def forward(self, syslog_message: str):
+        """
+        Buffers a message to be sent.
+
+        Args:
+            syslog_message (str): The valid Syslog message.
+        """
+        if self.spool is not None:
+            if not self.spool.append(syslog_message):
+                self.dropped += 1
+                DROPPED.inc()
+            return
+        with self._condition:
+            if len(self._buffer) >= self.max_buffer:
+                self._buffer.popleft()
+                self.dropped += 1
+                DROPPED.inc()
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(syslog_message)
+            # wake the sender to start the batch interval or send a full batch
+            if len(self._buffer) == 1 or len(self._buffer) >= self.batch_size:
+                self._condition.notify()
+
+
+    def close(self):
+        """
+        Sends the buffered messages, stops the sender thread, and closes
+        the connections.
+
+        While closing, every batch is attempted once more on the targets
+        that aren't backing off. Messages that still can't be sent are
+        dropped, or stay in the spool.
+        """
+        with self._condition:
+            self._stopping.set()
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._drainer is not None:
+            self._drainer.close()
+            self._drainer = None
+            self.spool.close()
+        for sock in self._connections.values():
+            sock.close()
+        self._connections.clear()
+
+
+    def send(self, batch: list) -> bool:
+        """
+        Sends a batch to a target, trying the others if it fails, and
+        retrying once a target's backoff ends.
+
+        Blocks until the batch is sent or the forwarder is closing. The
+        sender thread calls this for buffered messages; with a spool, it
+        is called by a SpoolDrainer.
+
+        Args:
+            batch (list): The valid Syslog messages.
+
+        Returns:
+            bool: False if the batch was given up on because the forwarder is closing.
+        """
+        buffers: list = self._encode(batch)
+        while True:
+            for target in self._candidates():
+                start: float = time.perf_counter()
+                try:
+                    self._send_to(target, buffers)
+                except OSError as e:
+                    self._failed(target, e)
+                    continue
+                SEND_DURATION.observe(time.perf_counter() - start)
+                self._consecutive_failures[target] = 0
+                self.forwarded += len(batch)
+                self.batches += 1
+                FORWARDED.inc(len(batch))
+                return True
+
+            if self._stopping.is_set():
+                logger.error("[ERROR] Failed to forward %d logs while shutting down", len(batch))
+                return False
+            # every target is backing off
+            self._stopping.wait(max(0.0, min(self._retry_at.values()) - time.monotonic()))
+
+
+    def _run(self):
+        """Sends batches of buffered messages until close() is called."""
+        while True:
+            batch: list = self._next_batch()
+            if batch:
+                if not self.send(batch):
+                    self.dropped += len(batch)
+                    DROPPED.inc(len(batch))
+            elif self._stopping.is_set():
+                return
+
+
+    def _next_batch(self) -> list:
+        """
+        Waits until a batch is due and takes it off the buffer.
+
+        Returns:
+            list: The messages to send. Empty if the forwarder is closing
+                and nothing is buffered.
+        """
+        with self._condition:
+            while not self._stopping.is_set() and len(self._buffer) < self.batch_size:
+                if self._buffer:
+                    remaining: float = self._oldest + self.batch_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                else:
+                    self._condition.wait()
+
+            count: int = min(len(self._buffer), self.batch_size)
+            batch: list = [self._buffer.popleft() for _ in range(count)]
+            self._oldest = time.monotonic()
+            return batch
+
+
+    def _encode(self, batch: list) -> list:
+        """
+        Encodes a batch for the protocol.
+
+        Args:
+            batch (list): The valid Syslog messages.
+
+        Returns:
+            list: For TCP, an octet count and a message for every message,
+                to be sent as one stream. For UDP, a datagram per message.
+        """
+        payloads: list = [syslog_message.encode("utf-8") for syslog_message in batch]
+        if self.protocol == PROTOCOL_UDP:
+            return payloads
+        buffers: list = []
+        for payload in payloads:
+            buffers.append(b"%d " % len(payload))
+            buffers.append(payload)
+        return buffers
+
+
+    def _candidates(self) -> list:
+        """
+        Returns the targets to try for the next batch, in order.
+
+        Returns:
+            list: The targets that aren't backing off. In 'balance' mode,
+                the first one is a different target for every batch.
+        """
+        now: float = time.monotonic()
+        ready: list = [target for target in self.targets if self._retry_at[target] <= now]
+        if self.mode == MODE_BALANCE and ready:
+            turn: int = self._turn % len(ready)
+            self._turn += 1
+            return ready[turn:] + ready[:turn]
+        return ready
+
+
+    def _send_to(self, target: Tuple[str, int], buffers: list):
+        """
+        Sends encoded messages to a target, connecting first if needed.
+
+        Args:
+            target (Tuple[str, int]): The (host, port) of the target.
+            buffers (list): The encoded batch.
+
+        Raises:
+            OSError: If the target can't be reached.
+        """
+        sock: socket.socket = self._connections.get(target)
+        if sock is not None and self.protocol == PROTOCOL_TCP and _closed_by_peer(sock):
+            self._disconnect(target)
+            sock = None
+        if sock is None:
+            sock = self._connect(target)
+        if self.protocol == PROTOCOL_TCP:
+            _send_buffers(sock, buffers)
+        else:
+            for datagram in buffers:
+                sock.send(datagram)
+
+
+    def _connect(self, target: Tuple[str, int]) -> socket.socket:
+        """
+        Opens the connection to a target, which is kept for later batches.
+
+        A UDP socket is connected too, so an unreachable target is
+        reported by a later send.
+
+        Args:
+            target (Tuple[str, int]): The (host, port) of the target.
+
+        Returns:
+            socket.socket: The connected socket.
+        """
+        if self.protocol == PROTOCOL_TCP:
+            sock: socket.socket = socket.create_connection(target, self.timeout)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        else:
+            family, kind, proto, _, address = socket.getaddrinfo(*target, type=socket.SOCK_DGRAM)[0]
+            sock = socket.socket(family, kind, proto)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(address)
+            except OSError:
+                sock.close()
+                raise
+        self._connections[target] = sock
+        logger.info("[FORWARD] Connected to %s:%d over %s", target[0], target[1], self.protocol.upper())
+        return sock
+
+
+    def _disconnect(self, target: Tuple[str, int]):
+        """
+        Closes the connection to a target, if any.
+
+        Args:
+            target (Tuple[str, int]): The (host, port) of the target.
+        """
+        sock: socket.socket = self._connections.pop(target, None)
+        if sock is not None:
+            sock.close()
+
+
+    def _failed(self, target: Tuple[str, int], error: OSError):
+        """
+        Closes the connection to a target that failed and backs it off.
+
+        Args:
+            target (Tuple[str, int]): The (host, port) of the target.
+            error (OSError): Why it failed.
+        """
+        self._disconnect(target)
+        self._consecutive_failures[target] += 1
+        backoff: float = min(self.retry_backoff * 2 ** (self._consecutive_failures[target] - 1), self.max_retry_backoff)
+        self._retry_at[target] = time.monotonic() + backoff
+        self.failures += 1
+        FAILURES.inc()
+        logger.warning("[ERROR] Failed to forward to %s:%d, retrying in %.1fs: %s", target[0], target[1], backoff, error)
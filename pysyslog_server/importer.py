@@ -0,0 +1,241 @@
+"""
+Contains the functions for importing files written by the collector,
+e.g. to load months of 'syslog.log' into MongoDB after the fact.
+
+A file is memory-mapped and split into chunks ending at line breaks.
+The chunks are validated and parsed by a pool of processes, and the
+results are handed to the sinks in file order, one chunk at a time.
+After every chunk, the offset of the next one is saved, so an
+interrupted import resumes where it left off.
+"""
+import collections
+import json
+import mmap
+import multiprocessing
+import multiprocessing.pool
+import os
+import signal
+import time
+from typing import Callable, Iterator, Tuple
+from .clock import SyslogClock, get_timezone
+from .columnar import message_timestamp
+from .validator import NON_ASCII_ESCAPE, Validator, decode_non_ascii
+
+# the source address of imported messages; corrected messages get it as their HOSTNAME
+SOURCE_ADDR: str = "127.0.0.1"
+COMPRESSED_EXTENSIONS: tuple = (".gz", ".zst")
+
+# set in every process of the pool by _init_worker()
+_clock: SyslogClock = None
+_non_ascii: str = NON_ASCII_ESCAPE
+
+
+def chunks(path: str, chunk_size: int, offset: int = 0) -> Iterator[Tuple[int, int]]:
+    """
+    Splits a file into chunks of whole lines.
+
+    Args:
+        path (str): The path of the file.
+        chunk_size (int): The approximate size of a chunk in bytes.
+        offset (int): Where the first chunk starts. Must be the start of a line.
+
+    Returns:
+        Iterator[Tuple[int, int]]: The start and end offsets of the chunks.
+            A chunk ends after a line feed, or at the end of the file.
+    """
+    with open(path, "rb") as file:
+        size: int = os.fstat(file.fileno()).st_size
+        if offset >= size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start: int = offset
+            while start < size:
+                end: int = data.find(b"\n", min(start + chunk_size, size) - 1) + 1 or size
+                yield start, end
+                start = end
+
+
+def _init_worker(timezone_name: str, non_ascii: str):
+    """
+    Configures a process of the pool.
+
+    Args:
+        timezone_name (str): The timezone of inserted TIMESTAMPs, as in SYSLOG_TIMEZONE.
+        non_ascii (str): How bytes that aren't ASCII are decoded, as in SYSLOG_NON_ASCII.
+    """
+    global _clock, _non_ascii
+    _clock = SyslogClock(get_timezone(timezone_name))
+    _non_ascii = non_ascii
+    # Ctrl+C is handled by the importing process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def parse_chunk(path: str, start: int, end: int, modified: float) -> Tuple[int, list]:
+    """
+    Validates and parses the lines of a chunk.
+
+    Like received messages, lines that aren't ASCII are decoded
+    according to SYSLOG_NON_ASCII.
+
+    Args:
+        path (str): The path of the file.
+        start (int): The offset of the chunk.
+        end (int): The offset after the chunk.
+        modified (float): When the file was last modified, in seconds since
+            the epoch. It is used to complete the year of the TIMESTAMPs.
+
+    Returns:
+        Tuple[int, list]: The end of the chunk, and a (message, fields,
+            received) tuple for every line. fields is None if the message
+            couldn't be parsed; received is the TIMESTAMP in seconds since
+            the epoch, or modified if the TIMESTAMP is invalid.
+    """
+    clock: SyslogClock = _clock or SyslogClock()
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        chunk: bytes = data[start:end]
+    try:
+        lines: list = str(chunk, "ascii").splitlines()
+    except UnicodeDecodeError:
+        lines = decode_non_ascii(chunk, _non_ascii).splitlines()
+
+    results: list = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        syslog_message, fields, _, _ = Validator(line, SOURCE_ADDR, clock).validate_and_parse()
+        received: float = None
+        if fields is not None:
+            received = message_timestamp(fields, modified, clock.timezone)
+        results.append((syslog_message, fields, modified if received is None else received))
+    return end, results
+
+
+class ImportState:
+    """
+    Class for remembering how far every file has been imported.
+
+    The offsets are kept in a JSON file, which is replaced atomically
+    on every save().
+
+    Attributes:
+        path (str): The path of the JSON file.
+        offsets (dict): The offset to resume from, by absolute file path.
+    """
+
+    def __init__(self, path: str):
+        """
+        Inits ImportState, reading the JSON file if it exists.
+
+        Args:
+            path (str): The path of the JSON file.
+        """
+        self.path = path
+        self.offsets = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                self.offsets = json.load(file)
+
+
+    def save(self):
+        """Writes the offsets to the JSON file."""
+        temporary: str = self.path + ".tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(self.offsets, file, indent=2)
+        os.replace(temporary, self.path)
+
+
+def import_file(path: str, write: Callable, state: ImportState, pool: multiprocessing.pool.Pool,
+                chunk_size: int = 8 * 1024 * 1024, max_pending: int = 8, progress: Callable = None) -> int:
+    """
+    Imports a file, resuming from the offset in the state.
+
+    At most max_pending chunks are parsed ahead of the sinks, so memory
+    stays bounded however slow the sinks are.
+
+    Args:
+        path (str): The path of the file.
+        write (Callable): Called with the (message, fields, received)
+            tuples of every chunk, in file order. It must return once
+            the chunk is saved (e.g. flush queued sinks), because the
+            offset after the chunk is saved next.
+        state (ImportState): The offsets to resume from. Updated after every chunk.
+        pool (multiprocessing.pool.Pool): The processes that parse the chunks.
+        chunk_size (int): The approximate size of a chunk in bytes.
+        max_pending (int): The maximum number of chunks parsed ahead,
+            e.g. twice the number of processes.
+        progress (Callable): Called with the path, the offset reached, the
+            size of the file, and the number of messages imported after
+            every chunk, or None.
+
+    Returns:
+        int: The number of messages imported.
+
+    Raises:
+        ValueError: If the file is compressed.
+    """
+    if path.endswith(COMPRESSED_EXTENSIONS):
+        raise ValueError(f"{path} is compressed. Decompress it first, e.g. with 'gunzip -k'")
+
+    key: str = os.path.abspath(path)
+    stat: os.stat_result = os.stat(path)
+    offset: int = state.offsets.get(key, 0)
+    if offset > stat.st_size: # e.g. the file was rotated and started over
+        offset = 0
+
+    imported: int = 0
+    pending: collections.deque = collections.deque()
+    remaining: Iterator = chunks(path, chunk_size, offset)
+    while True:
+        while len(pending) < max_pending:
+            chunk: tuple = next(remaining, None)
+            if chunk is None:
+                break
+            pending.append(pool.apply_async(parse_chunk, (path, *chunk, stat.st_mtime)))
+        if not pending:
+            break
+        end, results = pending.popleft().get()
+        write(results)
+        imported += len(results)
+        state.offsets[key] = end
+        state.save()
+        if progress is not None:
+            progress(path, end, stat.st_size, imported)
+    return imported
+
+
+def create_pool(processes: int = None, timezone_name: str = "local",
+                non_ascii: str = NON_ASCII_ESCAPE) -> multiprocessing.pool.Pool:
+    """
+    Creates the processes that parse the chunks.
+
+    Args:
+        processes (int): The number of processes, or None for one per CPU.
+        timezone_name (str): The timezone of inserted TIMESTAMPs, as in SYSLOG_TIMEZONE.
+        non_ascii (str): How bytes that aren't ASCII are decoded, as in SYSLOG_NON_ASCII.
+
+    Returns:
+        multiprocessing.pool.Pool: The pool.
+    """
+    return multiprocessing.Pool(processes, _init_worker, (timezone_name, non_ascii))
+
+
+def format_progress(path: str, offset: int, size: int, imported: int, start: float) -> str:
+    """
+    Formats the progress of an import.
+
+    Args:
+        path (str): The path of the file.
+        offset (int): The offset reached.
+        size (int): The size of the file.
+        imported (int): The number of messages imported from the file so far.
+        start (float): When the import of the file started, as returned by time.monotonic().
+
+    Returns:
+        str: For example 'syslog.log: 512.0/2048.0 MiB (25%), 3,100,000 messages, 410,000 msgs/sec'.
+    """
+    elapsed: float = max(time.monotonic() - start, 1e-9)
+    percent: float = offset / size * 100 if size else 100
+    return (f"{path}: {offset / 2**20:.1f}/{size / 2**20:.1f} MiB ({percent:.0f}%), "
+            f"{imported:,} messages, {imported / elapsed:,.0f} msgs/sec")
@@ -0,0 +1,516 @@
+"""
+Contains classes for receiving Syslog messages in batches
+without allocating a new buffer for every datagram, and for
+receiving Syslog messages over TCP (RFC 6587).
+"""
+import collections
+import selectors
+import socket
+from typing import Callable, Iterator
+from .log import logger
+
+# the longest MSG-LEN accepted in octet-counted framing, plus the SP
+_MAX_OCTET_COUNT_DIGITS: int = 10
+
+
+def create_udp_socket(address: str, port: int, rcvbuf: int = 0, reuse_port: bool = False) -> socket.socket:
+    """
+    Creates and binds the UDP socket of the collector.
+
+    Args:
+        address (str): The address to listen on.
+        port (int): The port to listen on.
+        rcvbuf (int): The requested size of the kernel receive buffer
+            in bytes. If 0, the operating system's default is kept.
+        reuse_port (bool): Indicates whether or not other sockets may bind
+            the same address and port (SO_REUSEPORT).
+
+    Returns:
+        socket.socket: The bound socket.
+
+    Raises:
+        OSError: If reuse_port is set but the platform lacks SO_REUSEPORT.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if reuse_port:
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise OSError("SO_REUSEPORT is not supported on this platform")
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    if rcvbuf > 0:
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        # Linux doubles the requested value and caps it at net.core.rmem_max
+        effective: int = server.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        logger.info("Requested SO_RCVBUF of %d bytes, got %d bytes", rcvbuf, effective)
+    server.bind((address, port))
+    return server
+
+
+def create_tcp_socket(address: str, port: int, reuse_port: bool = False) -> socket.socket:
+    """
+    Creates, binds, and listens on the TCP socket of the collector.
+
+    Args:
+        address (str): The address to listen on.
+        port (int): The port to listen on.
+        reuse_port (bool): Indicates whether or not other sockets may bind
+            the same address and port (SO_REUSEPORT).
+
+    Returns:
+        socket.socket: The listening socket.
+
+    Raises:
+        OSError: If reuse_port is set but the platform lacks SO_REUSEPORT.
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    # allows restarting while old connections are in TIME_WAIT
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise OSError("SO_REUSEPORT is not supported on this platform")
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server.bind((address, port))
+    server.listen(socket.SOMAXCONN)
+    return server
+
+
+class BufferPool:
+    """
+    Class for reusing preallocated receive buffers.
+
+    Buffers are handed out by the receive loop and given back by the
+    worker once the message has been handled. If every buffer is in
+    use, a new buffer is allocated instead of blocking the receive loop.
+    Buffers are only kept if the pool is below its capacity, so the
+    memory used by the pool stays bounded.
+
+    Attributes:
+        buffer_size (int): The size of every buffer in bytes.
+        capacity (int): The maximum number of idle buffers kept.
+        allocated (int): The number of buffers allocated because the
+            pool was empty.
+    """
+
+    def __init__(self, capacity: int, buffer_size: int):
+        """
+        Inits BufferPool.
+
+        Args:
+            capacity (int): The number of buffers to preallocate.
+            buffer_size (int): The size of every buffer in bytes.
+        """
+        self.buffer_size = buffer_size
+        self.capacity = capacity
+        self.allocated = 0
+        # deque.append() and deque.pop() are thread-safe
+        self._idle: collections.deque = collections.deque(bytearray(buffer_size) for _ in range(capacity))
+
+
+    def acquire(self) -> bytearray:
+        """
+        Takes a buffer from the pool.
+
+        Returns:
+            bytearray: An idle buffer, or a new one if the pool is empty.
+        """
+        try:
+            return self._idle.pop()
+        except IndexError:
+            self.allocated += 1
+            return bytearray(self.buffer_size)
+
+
+    def release(self, buffer: bytearray):
+        """
+        Returns a buffer to the pool.
+
+        Args:
+            buffer (bytearray): A buffer previously returned by acquire().
+        """
+        if len(self._idle) < self.capacity:
+            self._idle.append(buffer)
+
+
+class BatchedUDPListener:
+    """
+    Class for draining many datagrams per wakeup of the receive loop.
+
+    The socket is non-blocking and registered with the best selector
+    available on the platform (epoll on Linux). Whenever the socket is
+    readable, up to 'batch_size' datagrams are read with recvfrom_into()
+    into buffers from a BufferPool, so the loop makes no allocations
+    while the pool has idle buffers.
+
+    For every datagram, the submit function is called with the buffer,
+    the number of bytes received, and the IP address of the client. The
+    receiver of the buffer must give it back with 'buffers.release()'.
+
+    Attributes:
+        server (socket.socket): The bound, non-blocking UDP socket.
+        buffers (BufferPool): The pool of receive buffers.
+        batch_size (int): The maximum number of datagrams read per wakeup.
+        max_message_length (int): The maximum number of bytes read per datagram.
+    """
+
+    def __init__(self, address: str, port: int, batch_size: int = 64, max_message_length: int = 1024,
+                 rcvbuf: int = 0, buffer_count: int = 1024, reuse_port: bool = False):
+        """
+        Inits BatchedUDPListener.
+
+        Args:
+            address (str): The address to listen on.
+            port (int): The port to listen on.
+            batch_size (int): The maximum number of datagrams read per wakeup.
+            max_message_length (int): The maximum number of bytes read per datagram.
+            rcvbuf (int): The requested size of the kernel receive buffer in bytes.
+            buffer_count (int): The number of receive buffers to preallocate.
+            reuse_port (bool): Indicates whether or not other sockets may bind
+                the same address and port (SO_REUSEPORT).
+        """
+        self.server = create_udp_socket(address, port, rcvbuf, reuse_port)
+        self.server.setblocking(False)
+        self.buffers = BufferPool(buffer_count, max_message_length)
+        self.batch_size = batch_size
+        self.max_message_length = max_message_length
+        self._running = False
+
+
+    def serve_forever(self, submit: Callable, poll_interval: float = 0.5):
+        """
+        Receives datagrams until stop() is called.
+
+        Args:
+            submit (Callable): Called with the buffer, the number of bytes
+                received, and the IP address of the client.
+            poll_interval (float): The maximum number of seconds to wait
+                for the socket to become readable before checking if
+                stop() was called.
+        """
+        self._running = True
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.server, selectors.EVENT_READ)
+            while self._running:
+                if selector.select(poll_interval):
+                    self.drain(submit)
+
+
+    def drain(self, submit: Callable) -> int:
+        """
+        Reads datagrams until the socket would block or a batch is full.
+
+        Args:
+            submit (Callable): Called with the buffer, the number of bytes
+                received, and the IP address of the client.
+
+        Returns:
+            int: The number of datagrams read.
+        """
+        recvfrom_into = self.server.recvfrom_into
+        acquire = self.buffers.acquire
+        length: int = self.max_message_length
+        count: int = 0
+
+        while count < self.batch_size:
+            buffer: bytearray = acquire()
+            try:
+                nbytes, source_address = recvfrom_into(buffer, length)
+            except (BlockingIOError, InterruptedError):
+                self.buffers.release(buffer)
+                break
+            submit(buffer, nbytes, source_address[0])
+            count += 1
+
+        return count
+
+
+    def stop(self):
+        """Stops serve_forever() after the current wakeup."""
+        self._running = False
+
+
+    def close(self):
+        """Closes the socket."""
+        self.server.close()
+
+
+class StreamFramer:
+    """
+    Class for splitting a TCP stream into Syslog messages (RFC 6587).
+
+    Both framing methods are detected per message: a message starting
+    with a digit is octet-counted ('MSG-LEN SP SYSLOG-MSG'), any other
+    message is terminated by a line feed (non-transparent framing).
+
+    Data is received directly into the framer's buffer (see
+    get_buffer() and advance()), and complete messages are returned as
+    memoryviews of that buffer, so framing copies nothing but the
+    occasional incomplete message at the end of the buffer. A message
+    must be used before get_buffer() is called again.
+
+    Messages longer than 'max_message_length' are truncated, like
+    datagrams longer than the UDP receive length.
+
+    Attributes:
+        max_message_length (int): The maximum length of a message in bytes.
+        truncated (int): The number of messages that were truncated.
+    """
+
+    def __init__(self, max_message_length: int = 8192, buffer_size: int = 16384):
+        """
+        Inits StreamFramer.
+
+        Args:
+            max_message_length (int): The maximum length of a message in bytes.
+            buffer_size (int): The size of the receive buffer in bytes. It is
+                increased if it can't hold a message of the maximum length.
+        """
+        self.max_message_length = max_message_length
+        self.truncated = 0
+        self._buffer: bytearray = bytearray(max(buffer_size, max_message_length + _MAX_OCTET_COUNT_DIGITS + 1))
+        self._view: memoryview = memoryview(self._buffer)
+        self._start = 0 # the first byte not yet framed
+        self._end = 0 # the end of the received data
+        self._skip = 0 # the number of bytes left of a truncated octet-counted message
+        self._skip_line = False # indicates whether or not the rest of a truncated line is discarded
+
+
+    def get_buffer(self) -> memoryview:
+        """
+        Returns the free part of the buffer to receive data into.
+
+        Returns:
+            memoryview: The free part of the buffer. Never empty.
+        """
+        if self._start == self._end:
+            self._start = self._end = 0
+        elif len(self._buffer) - self._end < len(self._buffer) // 4:
+            # move the incomplete message to the front
+            pending: int = self._end - self._start
+            self._buffer[:pending] = self._buffer[self._start:self._end]
+            self._start, self._end = 0, pending
+        return self._view[self._end:]
+
+
+    def advance(self, nbytes: int):
+        """
+        Marks data received into the buffer returned by get_buffer().
+
+        Args:
+            nbytes (int): The number of bytes received.
+        """
+        self._end += nbytes
+
+
+    def frames(self) -> Iterator[memoryview]:
+        """
+        Returns the complete messages received so far.
+
+        Yields:
+            memoryview: A message without its framing.
+        """
+        buffer: bytearray = self._buffer
+        view: memoryview = self._view
+        max_length: int = self.max_message_length
+
+        while self._start < self._end:
+            start: int = self._start
+            end: int = self._end
+
+            if self._skip:
+                skipped: int = min(self._skip, end - start)
+                self._skip -= skipped
+                self._start += skipped
+                continue
+
+            if self._skip_line:
+                line_feed: int = buffer.find(b"\n", start, end)
+                self._start = end if line_feed == -1 else line_feed + 1
+                self._skip_line = line_feed == -1
+                continue
+
+            if 0x30 <= buffer[start] <= 0x39: # octet counting
+                space: int = buffer.find(b" ", start, min(end, start + _MAX_OCTET_COUNT_DIGITS + 1))
+                if space == -1:
+                    if end - start > _MAX_OCTET_COUNT_DIGITS:
+                        self._skip_line = True # not a MSG-LEN; resynchronize at the next line feed
+                        continue
+                    return
+                if not buffer[start:space].isdigit():
+                    self._skip_line = True
+                    continue
+                length: int = int(buffer[start:space])
+                message_start: int = space + 1
+                if length > max_length:
+                    if end - message_start < max_length:
+                        return
+                    self.truncated += 1
+                    self._skip = length - max_length
+                    length = max_length
+                elif end - message_start < length:
+                    return
+                self._start = message_start + length
+                if length:
+                    yield view[message_start:self._start]
+                continue
+
+            # non-transparent framing
+            line_feed: int = buffer.find(b"\n", start, min(end, start + max_length + 1))
+            if line_feed == -1:
+                if end - start <= max_length:
+                    return
+                self.truncated += 1
+                self._skip_line = True
+                self._start = start + max_length
+                yield view[start:self._start]
+                continue
+            self._start = line_feed + 1
+            if line_feed > start:
+                yield view[start:line_feed]
+
+
+class TCPListener:
+    """
+    Class for receiving Syslog messages over many TCP connections.
+
+    The listening socket and every connection are non-blocking and
+    registered with the best selector available on the platform (epoll
+    on Linux), so a single thread serves thousands of persistent
+    connections. Every connection has its own StreamFramer.
+
+    For every message, the submit function is called with a buffer from
+    a BufferPool, the length of the message, and the IP address of the
+    client, like BatchedUDPListener. If submit() blocks (e.g. because the
+    worker pool is full), no data is read, and TCP flow control slows
+    down the clients instead of dropping messages.
+
+    Attributes:
+        server (socket.socket): The listening, non-blocking TCP socket.
+        buffers (BufferPool): The pool of message buffers.
+        max_message_length (int): The maximum length of a message in bytes.
+        connections (int): The number of open connections.
+        truncated (int): The number of messages that were truncated.
+    """
+
+    def __init__(self, address: str, port: int, max_message_length: int = 8192, buffer_count: int = 1024,
+                 reuse_port: bool = False):
+        """
+        Inits TCPListener.
+
+        Args:
+            address (str): The address to listen on.
+            port (int): The port to listen on.
+            max_message_length (int): The maximum length of a message in bytes.
+            buffer_count (int): The number of message buffers to preallocate.
+            reuse_port (bool): Indicates whether or not other sockets may bind
+                the same address and port (SO_REUSEPORT).
+        """
+        self.server = create_tcp_socket(address, port, reuse_port)
+        self.server.setblocking(False)
+        self.buffers = BufferPool(buffer_count, max_message_length)
+        self.max_message_length = max_message_length
+        self.connections = 0
+        self.truncated = 0
+        self._running = False
+
+
+    def serve_forever(self, submit: Callable, poll_interval: float = 0.5):
+        """
+        Accepts connections and receives messages until stop() is called.
+
+        Open connections are closed before returning.
+
+        Args:
+            submit (Callable): Called with the buffer, the length of the
+                message, and the IP address of the client.
+            poll_interval (float): The maximum number of seconds to wait
+                for a socket to become readable before checking if
+                stop() was called.
+        """
+        self._running = True
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.server, selectors.EVENT_READ)
+            try:
+                while self._running:
+                    for key, _ in selector.select(poll_interval):
+                        if key.fileobj is self.server:
+                            self._accept(selector)
+                        else:
+                            self._receive(selector, key.fileobj, key.data, submit)
+            finally:
+                for key in list(selector.get_map().values()):
+                    if key.fileobj is not self.server:
+                        self._disconnect(selector, key.fileobj, key.data[0])
+
+
+    def stop(self):
+        """Stops serve_forever() after the current wakeup."""
+        self._running = False
+
+
+    def close(self):
+        """Closes the listening socket."""
+        self.server.close()
+
+
+    def _accept(self, selector: selectors.BaseSelector):
+        """
+        Accepts the pending connections.
+
+        Args:
+            selector (selectors.BaseSelector): The selector to register them with.
+        """
+        while True:
+            try:
+                conn, client_address = self.server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            conn.setblocking(False)
+            selector.register(conn, selectors.EVENT_READ, (StreamFramer(self.max_message_length), client_address[0]))
+            self.connections += 1
+
+
+    def _receive(self, selector: selectors.BaseSelector, conn: socket.socket, data: tuple, submit: Callable):
+        """
+        Receives data from a readable connection and submits its messages.
+
+        Args:
+            selector (selectors.BaseSelector): The selector the connection is registered with.
+            conn (socket.socket): The connection.
+            data (tuple): The connection's StreamFramer and the IP address of the client.
+            submit (Callable): Called with the buffer, the length of the
+                message, and the IP address of the client.
+        """
+        framer, source_addr = data
+        try:
+            nbytes: int = conn.recv_into(framer.get_buffer())
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError: # e.g. reset by the client
+            nbytes = 0
+        if nbytes == 0:
+            self._disconnect(selector, conn, framer)
+            return
+
+        framer.advance(nbytes)
+        acquire = self.buffers.acquire
+        for frame in framer.frames():
+            length: int = len(frame)
+            buffer: bytearray = acquire()
+            buffer[:length] = frame
+            submit(buffer, length, source_addr)
+
+
+    def _disconnect(self, selector: selectors.BaseSelector, conn: socket.socket, framer: StreamFramer):
+        """
+        Closes a connection.
+
+        An incomplete message at the end of the stream is discarded.
+
+        Args:
+            selector (selectors.BaseSelector): The selector the connection is registered with.
+            conn (socket.socket): The connection.
+            framer (StreamFramer): The connection's framer.
+        """
+        selector.unregister(conn)
+        conn.close()
+        self.connections -= 1
+        self.truncated += framer.truncated
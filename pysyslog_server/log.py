@@ -0,0 +1,248 @@
+"""
+Contains the logger of the collector and the configuration of its
+console output.
+
+Records are put on a bounded queue and written to stdout by a
+background thread, so a slow stdout (e.g. journald or a docker log
+driver under load) never blocks receiving messages. Records about
+individual messages are rate-limited per client.
+"""
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+logger: logging.Logger = logging.getLogger("pysyslog_server")
+
+LEVELS: dict = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR
+}
+
+
+def get_level(name: str) -> int:
+    """
+    Looks up a log level by name.
+
+    Args:
+        name (str): 'debug', 'info', 'warning', or 'error' (case insensitive).
+
+    Returns:
+        int: The level, e.g. logging.INFO.
+
+    Raises:
+        ValueError: If the level is unknown.
+    """
+    try:
+        return LEVELS[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown log level '{name}'. Use one of {tuple(LEVELS)}")
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Class for limiting the number of records logged per client.
+
+    Only records with a 'source' attribute (passed with
+    extra={"source": source_addr}) are limited. At most 'limit' of them
+    are logged per source and interval. When an interval ends, a
+    summary of the suppressed records is logged for every source that
+    exceeded the limit.
+
+    Attributes:
+        limit (int): The number of records logged per source and interval.
+            If 0, records are not limited.
+        interval (float): The length of an interval in seconds.
+        suppressed (int): The number of records suppressed so far.
+    """
+
+    def __init__(self, limit: int = 100, interval: float = 10.0):
+        """
+        Inits RateLimitFilter.
+
+        Args:
+            limit (int): The number of records logged per source and interval.
+                If 0, records are not limited.
+            interval (float): The length of an interval in seconds.
+        """
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        self.suppressed = 0
+        self._counts: dict = {}
+        self._window_start: float = time.monotonic()
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Decides whether or not a record is logged.
+
+        Args:
+            record (logging.LogRecord): The record.
+
+        Returns:
+            bool: False if the record's source exceeded the limit.
+        """
+        source: str = getattr(record, "source", None)
+        if source is None or not self.limit:
+            return True
+
+        now: float = time.monotonic()
+        with self._lock:
+            if now - self._window_start >= self.interval:
+                summaries: list = self._end_window(now)
+            else:
+                summaries = []
+            count: int = self._counts.get(source, 0) + 1
+            self._counts[source] = count
+            allowed: bool = count <= self.limit
+            if not allowed:
+                self.suppressed += 1
+
+        for summary in summaries:
+            logger.warning(summary)
+        return allowed
+
+
+    def flush(self):
+        """Logs the summaries of the current interval and starts a new one."""
+        with self._lock:
+            summaries: list = self._end_window(time.monotonic())
+        for summary in summaries:
+            logger.warning(summary)
+
+
+    def _end_window(self, now: float) -> list:
+        """
+        Resets the counts. Must be called with the lock held.
+
+        Args:
+            now (float): The start of the new interval.
+
+        Returns:
+            list: The summaries of the sources that exceeded the limit.
+        """
+        elapsed: float = now - self._window_start
+        summaries: list = [f"[SUPPRESSED] {source}: {count - self.limit} of {count} messages not logged in the last {elapsed:.0f}s"
+                           for source, count in self._counts.items() if count > self.limit]
+        self._counts = {}
+        self._window_start = now
+        return summaries
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Class for handing records to a QueueListener without ever blocking.
+
+    If the queue is full, the record is dropped and counted, and the
+    number of dropped records is logged once the queue has room again.
+    Records are formatted by the listener's thread, not by the thread
+    that logs them.
+
+    Attributes:
+        dropped (int): The number of records dropped because the queue was full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        """
+        Inits NonBlockingQueueHandler.
+
+        Args:
+            log_queue (queue.Queue): The bounded queue read by the QueueListener.
+        """
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Returns the record unchanged; the listener is in the same process.
+
+        Args:
+            record (logging.LogRecord): The record.
+
+        Returns:
+            logging.LogRecord: The same record.
+        """
+        return record
+
+
+    def enqueue(self, record: logging.LogRecord):
+        """
+        Puts a record on the queue unless it is full.
+
+        Args:
+            record (logging.LogRecord): The record.
+        """
+        try:
+            if self._unreported:
+                unreported: int = self._unreported
+                self.queue.put_nowait(logging.makeLogRecord({
+                    "name": logger.name, "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": f"[LOGGING] Dropped {unreported} log messages because stdout was too slow"
+                }))
+                self._unreported -= unreported
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+
+
+class ConsoleLogging:
+    """
+    Class for writing the collector's log records to stdout on a background thread.
+
+    Attributes:
+        level (int): The minimum level of the records written.
+        rate_limit (RateLimitFilter): Limits the records about individual messages.
+        handler (NonBlockingQueueHandler): The handler attached to the logger.
+    """
+
+    def __init__(self, level: int = logging.INFO, rate_limit: int = 100, rate_interval: float = 10.0,
+                 max_queue_size: int = 10000, stream = None):
+        """
+        Inits ConsoleLogging.
+
+        Args:
+            level (int): The minimum level of the records written.
+            rate_limit (int): The number of records about individual messages
+                logged per client and interval. If 0, they are not limited.
+            rate_interval (float): The length of an interval in seconds.
+            max_queue_size (int): The maximum number of records waiting to be written.
+            stream: The stream to write to. If None, stdout is used.
+        """
+        self.level = level
+        self.rate_limit = RateLimitFilter(rate_limit, rate_interval)
+        self.handler = NonBlockingQueueHandler(queue.Queue(max_queue_size))
+        self.handler.addFilter(self.rate_limit)
+        output: logging.StreamHandler = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(logging.Formatter("%(message)s"))
+        self._listener = logging.handlers.QueueListener(self.handler.queue, output)
+
+
+    def start(self):
+        """Replaces the logger's handlers and starts writing records."""
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler) # e.g. inherited from the supervisor process
+        logger.addHandler(self.handler)
+        logger.setLevel(self.level)
+        logger.propagate = False
+        self._listener.start()
+
+
+    def stop(self):
+        """Logs the pending summaries and writes every queued record."""
+        self.rate_limit.flush()
+        while True:
+            try:
+                self._listener.stop()
+                break
+            except queue.Full: # no room for the stop sentinel yet
+                time.sleep(0.01)
+        logger.removeHandler(self.handler)
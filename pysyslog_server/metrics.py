@@ -0,0 +1,432 @@
+"""
+Contains counters, gauges, and latency histograms of the collector,
+and a small HTTP server exposing them in the Prometheus text format.
+
+Metrics are created once, at import time, by the modules they
+measure, and registered with the default registry:
+
+>>> from pysyslog_server import metrics
+>>> RECEIVED = metrics.counter("syslog_messages_received_total", "Messages received.")
+>>> RECEIVED.inc()
+"""
+import bisect
+import http.server
+import threading
+from typing import Callable
+
+# from 10 microseconds to 10 seconds
+LATENCY_BUCKETS: tuple = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                          0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS: tuple = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+CONTENT_TYPE: str = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(labels: dict) -> str:
+    """
+    Formats labels as they appear after a metric name.
+
+    Args:
+        labels (dict): The label names and values.
+
+    Returns:
+        str: For example '{stage="parse"}', or '' if there are no labels.
+    """
+    if not labels:
+        return ""
+    escaped: list = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        escaped.append(f"{name}=\"{value}\"")
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    """
+    Formats a sample value.
+
+    Args:
+        value (float): The value.
+
+    Returns:
+        str: The value, without a fraction if it is an integer.
+    """
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """
+    Class for a value that only goes up, e.g. the number of messages received.
+
+    Instead of being incremented, the value can be read from a function
+    whenever the metrics are collected.
+
+    Attributes:
+        name (str): The name of the metric.
+        documentation (str): The HELP text of the metric.
+        labels (dict): The labels of this series.
+        value (float): The current value, unless a function is set.
+    """
+    type: str = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: dict = None):
+        """
+        Inits Counter.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The HELP text of the metric.
+            labels (dict): The labels of this series.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self.value = 0
+        self._function: Callable = None
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def inc(self, amount: float = 1):
+        """
+        Increments the counter.
+
+        Args:
+            amount (float): The non-negative amount to add.
+        """
+        with self._lock:
+            self.value += amount
+
+
+    def set_function(self, function: Callable):
+        """
+        Reads the value from a function when the metrics are collected.
+
+        Useful for values that are already counted elsewhere, e.g. by
+        WorkerPool.stats().
+
+        Args:
+            function (Callable): Returns the current value.
+        """
+        self._function = function
+
+
+    def samples(self) -> list:
+        """
+        Returns the samples of the series.
+
+        Returns:
+            list: (name, labels, value) tuples.
+        """
+        return [(self.name, self.labels, self._function() if self._function is not None else self.value)]
+
+
+class Gauge:
+    """
+    Class for a value that goes up and down, e.g. the depth of a queue.
+
+    Instead of being set, the value can be read from a function
+    whenever the metrics are collected.
+
+    Attributes:
+        name (str): The name of the metric.
+        documentation (str): The HELP text of the metric.
+        labels (dict): The labels of this series.
+        value (float): The current value, unless a function is set.
+    """
+    type: str = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: dict = None):
+        """
+        Inits Gauge.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The HELP text of the metric.
+            labels (dict): The labels of this series.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self.value = 0
+        self._function: Callable = None
+
+
+    def set(self, value: float):
+        """
+        Sets the value.
+
+        Args:
+            value (float): The new value.
+        """
+        self.value = value
+
+
+    def set_function(self, function: Callable):
+        """
+        Reads the value from a function when the metrics are collected.
+
+        Args:
+            function (Callable): Returns the current value.
+        """
+        self._function = function
+
+
+    def samples(self) -> list:
+        """
+        Returns the samples of the series.
+
+        Returns:
+            list: (name, labels, value) tuples.
+        """
+        return [(self.name, self.labels, self._function() if self._function is not None else self.value)]
+
+
+class Histogram:
+    """
+    Class for counting observations, e.g. latencies, in fixed buckets.
+
+    Observing a value is a binary search and two additions, so it is
+    cheap enough for every message.
+
+    Attributes:
+        name (str): The name of the metric.
+        documentation (str): The HELP text of the metric.
+        labels (dict): The labels of this series.
+        buckets (tuple): The sorted upper bounds of the buckets.
+        count (int): The number of observations.
+        sum (float): The sum of the observations.
+    """
+    type: str = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: dict = None, buckets: tuple = LATENCY_BUCKETS):
+        """
+        Inits Histogram.
+
+        Args:
+            name (str): The name of the metric.
+            documentation (str): The HELP text of the metric.
+            labels (dict): The labels of this series.
+            buckets (tuple): The sorted upper bounds of the buckets. A
+                bucket for infinity is added.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels or {}
+        self.buckets = tuple(buckets)
+        self.count = 0
+        self.sum = 0.0
+        # observations per bucket, not cumulative; the last one is +Inf
+        self._counts: list = [0] * (len(self.buckets) + 1)
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def observe(self, value: float):
+        """
+        Records an observation.
+
+        Args:
+            value (float): The observed value, e.g. a duration in seconds.
+        """
+        index: int = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+
+    def samples(self) -> list:
+        """
+        Returns the samples of the series.
+
+        Returns:
+            list: (name, labels, value) tuples.
+        """
+        with self._lock:
+            counts: list = list(self._counts)
+            count: int = self.count
+            total: float = self.sum
+
+        samples: list = []
+        cumulative: int = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            samples.append((self.name + "_bucket", {**self.labels, "le": _format_value(bound)}, cumulative))
+        samples.append((self.name + "_sum", self.labels, total))
+        samples.append((self.name + "_count", self.labels, count))
+        return samples
+
+
+class Registry:
+    """
+    Class for collecting metrics and rendering them in the Prometheus text format.
+
+    Series with the same name but different labels are rendered as one
+    metric.
+    """
+
+    def __init__(self):
+        """Inits Registry."""
+        self._metrics: dict = {}
+        self._lock: threading.Lock = threading.Lock()
+
+
+    def register(self, metric):
+        """
+        Adds a metric, or returns the metric already registered with the same name and labels.
+
+        Args:
+            metric: A Counter, Gauge, or Histogram.
+
+        Returns:
+            The registered metric.
+
+        Raises:
+            ValueError: If a metric of another type has the same name.
+        """
+        key: tuple = (metric.name, tuple(sorted(metric.labels.items())))
+        with self._lock:
+            for existing in self._metrics.values():
+                if existing.name == metric.name and existing.type != metric.type:
+                    raise ValueError(f"Metric '{metric.name}' is already registered as a {existing.type}")
+            return self._metrics.setdefault(key, metric)
+
+
+    def render(self) -> str:
+        """
+        Renders every metric.
+
+        Returns:
+            str: The metrics in the Prometheus text format.
+        """
+        with self._lock:
+            metrics: list = list(self._metrics.values())
+
+        lines: list = []
+        documented: set = set()
+        for metric in sorted(metrics, key=lambda metric: metric.name):
+            if metric.name not in documented:
+                documented.add(metric.name)
+                lines.append(f"# HELP {metric.name} {metric.documentation}")
+                lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY: Registry = Registry()
+
+
+def counter(name: str, documentation: str, labels: dict = None) -> Counter:
+    """
+    Creates a counter in the default registry.
+
+    Args:
+        name (str): The name of the metric.
+        documentation (str): The HELP text of the metric.
+        labels (dict): The labels of this series.
+
+    Returns:
+        Counter: The counter.
+    """
+    return REGISTRY.register(Counter(name, documentation, labels))
+
+
+def gauge(name: str, documentation: str, labels: dict = None) -> Gauge:
+    """
+    Creates a gauge in the default registry.
+
+    Args:
+        name (str): The name of the metric.
+        documentation (str): The HELP text of the metric.
+        labels (dict): The labels of this series.
+
+    Returns:
+        Gauge: The gauge.
+    """
+    return REGISTRY.register(Gauge(name, documentation, labels))
+
+
+def histogram(name: str, documentation: str, labels: dict = None, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+    """
+    Creates a histogram in the default registry.
+
+    Args:
+        name (str): The name of the metric.
+        documentation (str): The HELP text of the metric.
+        labels (dict): The labels of this series.
+        buckets (tuple): The sorted upper bounds of the buckets.
+
+    Returns:
+        Histogram: The histogram.
+    """
+    return REGISTRY.register(Histogram(name, documentation, labels, buckets))
+
+
+class MetricsServer:
+    """
+    Class for serving the metrics over HTTP on a background thread.
+
+    GET /metrics returns the metrics in the Prometheus text format.
+
+    Attributes:
+        address (str): The address to listen on.
+        port (int): The port to listen on. If 0, a free port is chosen.
+        registry (Registry): The metrics to serve.
+    """
+
+    def __init__(self, address: str, port: int, registry: Registry = REGISTRY):
+        """
+        Inits MetricsServer.
+
+        Args:
+            address (str): The address to listen on.
+            port (int): The port to listen on. If 0, a free port is chosen.
+            registry (Registry): The metrics to serve.
+        """
+        self.address = address
+        self.port = port
+        self.registry = registry
+        self._server: http.server.ThreadingHTTPServer = None
+        self._thread: threading.Thread = None
+
+
+    def start(self):
+        """Binds the port and starts serving."""
+        registry: Registry = self.registry
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body: bytes = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+
+            def log_message(self, format, *args):
+                pass # don't log every scrape
+
+        self._server = http.server.ThreadingHTTPServer((self.address, self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+        self._thread.start()
+
+
+    def close(self):
+        """Stops serving and closes the port."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
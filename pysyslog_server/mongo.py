@@ -0,0 +1,233 @@
+"""
+Contains a class for saving parsed Syslog messages to MongoDB
+in batches.
+"""
+import collections
+import threading
+import time
+from pymongo.errors import BulkWriteError, PyMongoError
+from . import metrics
+from .log import logger
+
+DUPLICATE_KEY_ERROR: int = 11000
+
+# also updated by the asyncio sink
+INSERT_DURATION: metrics.Histogram = metrics.histogram(
+    "syslog_mongodb_insert_duration_seconds", "Time spent in successful insert_many() calls.")
+BATCH_DOCUMENTS: metrics.Histogram = metrics.histogram(
+    "syslog_mongodb_batch_documents", "Documents per batch.", buckets=metrics.SIZE_BUCKETS)
+INSERTED_DOCUMENTS: metrics.Counter = metrics.counter("syslog_mongodb_inserted_total", "Documents inserted.")
+DROPPED_DOCUMENTS: metrics.Counter = metrics.counter(
+    "syslog_mongodb_dropped_total", "Documents dropped because the buffer was full, MongoDB rejected them, or it was unreachable while shutting down.")
+INSERT_RETRIES: metrics.Counter = metrics.counter("syslog_mongodb_retries_total", "Failed insert_many() calls that were retried.")
+
+
+class MongoSink:
+    """
+    Class for inserting parsed Syslog messages with insert_many().
+
+    Any thread may call save(). The documents are buffered and inserted
+    by the flusher thread once 'batch_size' documents are buffered, or
+    once the oldest buffered document has waited 'batch_interval' seconds.
+
+    If MongoDB is unavailable, the batch is retried with exponential
+    backoff. Meanwhile, new documents keep being buffered. If the buffer
+    reaches 'max_buffer' documents, the oldest documents are dropped.
+
+    The collection is shared by every batch, so a single MongoClient
+    (and its connection pool) is used for the lifetime of the sink.
+    Any object with a pymongo-compatible insert_many() method may be
+    used instead, e.g. a mongomock collection.
+
+    Attributes:
+        collection: The collection the documents are inserted into.
+        batch_size (int): The maximum number of documents per insert_many().
+        batch_interval (float): The maximum number of seconds a document is buffered.
+        max_buffer (int): The maximum number of buffered documents.
+        retry_backoff (float): The number of seconds to wait before the first retry.
+        max_retry_backoff (float): The maximum number of seconds between retries.
+        inserted (int): The number of documents inserted.
+        batches (int): The number of successful insert_many() calls.
+        retries (int): The number of failed insert_many() calls that were retried.
+        dropped (int): The number of documents dropped because the buffer was full
+            or because MongoDB rejected them.
+    """
+
+    def __init__(self, collection, batch_size: int = 500, batch_interval: float = 0.1,
+                 max_buffer: int = 100000, retry_backoff: float = 0.5, max_retry_backoff: float = 30.0):
+        """
+        Inits MongoSink.
+
+        Args:
+            collection: The collection the documents are inserted into.
+            batch_size (int): The maximum number of documents per insert_many().
+            batch_interval (float): The maximum number of seconds a document is buffered.
+            max_buffer (int): The maximum number of buffered documents.
+            retry_backoff (float): The number of seconds to wait before the first retry.
+            max_retry_backoff (float): The maximum number of seconds between retries.
+        """
+        self.collection = collection
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_buffer = max_buffer
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.inserted = 0
+        self.batches = 0
+        self.retries = 0
+        self.dropped = 0
+        self._buffer: collections.deque = collections.deque()
+        self._condition: threading.Condition = threading.Condition()
+        self._oldest = 0.0
+        self._stopping: threading.Event = threading.Event()
+        # set once an insert fails while closing
+        self._unreachable = False
+        self._thread: threading.Thread = None
+
+
+    @property
+    def buffered(self) -> int:
+        """int: The number of documents waiting to be inserted."""
+        return len(self._buffer)
+
+
+    def start(self):
+        """Starts the flusher thread."""
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="pysyslog-mongo", daemon=True)
+        self._thread.start()
+
+
+    def save(self, document: dict):
+        """
+        Buffers a document to be inserted.
+
+        Args:
+            document (dict): The parsed Syslog message.
+        """
+        with self._condition:
+            if len(self._buffer) >= self.max_buffer:
+                self._buffer.popleft()
+                self.dropped += 1
+                DROPPED_DOCUMENTS.inc()
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append(document)
+            # wake the flusher to start the batch interval or insert a full batch
+            if len(self._buffer) == 1 or len(self._buffer) >= self.batch_size:
+                self._condition.notify()
+
+
+    def close(self):
+        """
+        Inserts the buffered documents and stops the flusher thread.
+
+        While closing, every batch is attempted once more. Once an attempt
+        fails, MongoDB is assumed to be unreachable and the remaining
+        documents are dropped without waiting for it again, so closing
+        takes at most about one server selection timeout.
+        """
+        with self._condition:
+            self._stopping.set()
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+    def _run(self):
+        """Inserts batches of buffered documents until close() is called."""
+        while True:
+            batch: list = self._next_batch()
+            if batch:
+                if not self.insert(batch):
+                    self.dropped += len(batch)
+                    DROPPED_DOCUMENTS.inc(len(batch))
+            elif self._stopping.is_set():
+                return
+
+
+    def _next_batch(self) -> list:
+        """
+        Waits until a batch is due and takes it off the buffer.
+
+        Returns:
+            list: The documents to insert. Empty if the sink is closing
+                and nothing is buffered.
+        """
+        with self._condition:
+            while not self._stopping.is_set() and len(self._buffer) < self.batch_size:
+                if self._buffer:
+                    remaining: float = self._oldest + self.batch_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                else:
+                    self._condition.wait()
+
+            count: int = min(len(self._buffer), self.batch_size)
+            batch: list = [self._buffer.popleft() for _ in range(count)]
+            self._oldest = time.monotonic()
+            return batch
+
+
+    def insert(self, batch: list) -> bool:
+        """
+        Inserts a batch, retrying with exponential backoff on failure.
+
+        Blocks until the batch is inserted or the sink is closing. The
+        flusher thread calls this for buffered documents, but it may also
+        be called directly, e.g. by a SpoolDrainer.
+
+        Args:
+            batch (list): The documents to insert.
+
+        Returns:
+            bool: False if the batch was given up on because the sink is
+                closing. Documents rejected by MongoDB count as handled.
+        """
+        if self._unreachable:
+            return False
+        backoff: float = self.retry_backoff
+        BATCH_DOCUMENTS.observe(len(batch))
+        while True:
+            start: float = time.perf_counter()
+            try:
+                self.collection.insert_many(batch, ordered=False)
+                INSERT_DURATION.observe(time.perf_counter() - start)
+                self._inserted(len(batch))
+                return True
+            except BulkWriteError as e:
+                # documents that were inserted by an earlier attempt are not errors
+                errors: list = [error for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY_ERROR]
+                self._inserted(len(batch) - len(errors))
+                if errors:
+                    self.dropped += len(errors)
+                    DROPPED_DOCUMENTS.inc(len(errors))
+                    logger.error("[ERROR] MongoDB rejected %d logs: %s", len(errors), errors[0].get("errmsg"))
+                return True
+            except PyMongoError as e:
+                if self._stopping.is_set():
+                    # every further batch would wait for the server selection timeout again
+                    self._unreachable = True
+                    logger.error("[ERROR] Failed to insert %d logs while shutting down, dropping the rest: %s",
+                                 len(batch), e)
+                    return False
+                self.retries += 1
+                INSERT_RETRIES.inc()
+                logger.warning("[ERROR] Failed to insert %d logs, retrying in %.1fs: %s", len(batch), backoff, e)
+                self._stopping.wait(backoff)
+                backoff = min(backoff * 2, self.max_retry_backoff)
+
+
+    def _inserted(self, count: int):
+        """
+        Records a successful insert.
+
+        Args:
+            count (int): The number of documents inserted.
+        """
+        self.inserted += count
+        self.batches += 1
+        INSERTED_DOCUMENTS.inc(count)
+        logger.debug("[INSERTED] Created %d logs", count)
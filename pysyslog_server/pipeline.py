@@ -0,0 +1,199 @@
+"""
+Contains a bounded pool of worker threads that decouples
+receiving Syslog messages from validating, parsing, and
+storing them.
+"""
+import queue
+import threading
+import time
+from typing import Callable
+from . import metrics
+from .log import logger
+
+BLOCK: str = "block"
+DROP_NEWEST: str = "drop-newest"
+DROP_OLDEST: str = "drop-oldest"
+OVERLOAD_POLICIES: tuple = (BLOCK, DROP_NEWEST, DROP_OLDEST)
+
+# also observed by the asyncio engine
+HANDLE_DURATION: metrics.Histogram = metrics.histogram(
+    "syslog_stage_duration_seconds", "Time spent in each stage of handling a message.", {"stage": "handle"})
+
+
+class WorkerPool:
+    """
+    Class for handling messages on a fixed number of long-lived threads.
+
+    The receive loop only submits messages to a bounded queue. The
+    workers take messages off the queue and pass them to the handler.
+    If the queue is full, the overload policy decides what happens:
+
+    'block':
+        The receive loop waits until a worker frees up a slot.
+    'drop-newest':
+        The submitted message is discarded.
+    'drop-oldest':
+        The oldest queued message is discarded to make room for the
+        submitted message.
+
+    Every discarded message is passed to on_drop, e.g. to give its
+    buffer back to the pool it was taken from.
+
+    Attributes:
+        handler (Callable): Called by a worker with the submitted arguments.
+        workers (int): The number of worker threads.
+        max_queue_size (int): The maximum number of queued messages.
+        overload_policy (str): One of 'block', 'drop-newest', or 'drop-oldest'.
+        on_drop (Callable): Called with the submitted arguments of every
+            discarded message, or None.
+        received (int): The number of messages submitted to the pool.
+        dropped (int): The number of messages discarded due to overload.
+        failed (int): The number of messages for which the handler raised.
+    """
+
+    def __init__(self, handler: Callable, workers: int = 4, max_queue_size: int = 10000,
+                 overload_policy: str = BLOCK, on_drop: Callable = None):
+        """
+        Inits WorkerPool.
+
+        Args:
+            handler (Callable): Called by a worker with the submitted arguments.
+            workers (int): The number of worker threads.
+            max_queue_size (int): The maximum number of queued messages.
+            overload_policy (str): One of 'block', 'drop-newest', or 'drop-oldest'.
+            on_drop (Callable): Called with the submitted arguments of every
+                discarded message, or None.
+
+        Raises:
+            ValueError: If the overload policy is unknown or a size is not positive.
+        """
+        if overload_policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"Unknown overload policy '{overload_policy}'. Use one of {OVERLOAD_POLICIES}")
+        if workers < 1 or max_queue_size < 1:
+            raise ValueError("The number of workers and the queue size must be positive")
+
+        self.handler = handler
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.overload_policy = overload_policy
+        self.on_drop = on_drop
+        self.received = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue(max_queue_size)
+        self._threads: list[threading.Thread] = []
+        self._lock: threading.Lock = threading.Lock()
+
+
+    @property
+    def queue_depth(self) -> int:
+        """int: The approximate number of messages waiting for a worker."""
+        return self._queue.qsize()
+
+
+    def start(self):
+        """Starts the worker threads."""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"pysyslog-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+
+    def submit(self, *args) -> bool:
+        """
+        Queues a message for the workers.
+
+        Args:
+            *args: The arguments passed to the handler.
+
+        Returns:
+            bool: Indicates whether or not the message was queued.
+        """
+        with self._lock:
+            self.received += 1
+
+        if self.overload_policy == BLOCK:
+            self._queue.put(args)
+            return True
+
+        try:
+            self._queue.put_nowait(args)
+            return True
+        except queue.Full:
+            if self.overload_policy == DROP_NEWEST:
+                self._dropped(args)
+                return False
+
+        # drop-oldest: make room by discarding queued messages until ours fits
+        while True:
+            try:
+                oldest = self._queue.get_nowait()
+                self._queue.task_done()
+                self._dropped(oldest)
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(args)
+                return True
+            except queue.Full:
+                continue
+
+
+    def stats(self) -> dict:
+        """
+        Returns the pool's counters.
+
+        Returns:
+            dict: The keys are 'received', 'dropped', 'failed', and 'queue_depth'.
+        """
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "queue_depth": self.queue_depth
+        }
+
+
+    def join(self):
+        """Blocks until every queued message has been handled."""
+        self._queue.join()
+
+
+    def stop(self):
+        """Handles the remaining queued messages and stops the workers."""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+
+    def _dropped(self, args: tuple):
+        """
+        Counts a discarded message and passes it to on_drop.
+
+        Args:
+            args (tuple): The submitted arguments of the message.
+        """
+        with self._lock:
+            self.dropped += 1
+        if self.on_drop is not None:
+            self.on_drop(*args)
+
+
+    def _work(self):
+        """Runs the handler for queued messages until a stop sentinel is received."""
+        while True:
+            args = self._queue.get()
+            try:
+                if args is None:
+                    return
+                start: float = time.perf_counter()
+                self.handler(*args)
+                HANDLE_DURATION.observe(time.perf_counter() - start)
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                logger.error("[ERROR] %s: %s", type(e).__name__, e)
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,155 @@
+"""
+Contains a per-client rate limiter, so that a single client flooding
+the collector (e.g. a device stuck in a debug loop) can't starve the
+others.
+
+Messages are limited right after they are received, before they are
+decoded or validated, so a flood costs little more than the receive
+call.
+"""
+import collections
+import threading
+import time
+from .log import logger
+
+
+class SourceRateLimiter:
+    """
+    Class for limiting the number of messages accepted per client with token buckets.
+
+    Every client has a bucket holding up to 'burst' tokens, which is
+    refilled at 'rate' tokens per second. Accepting a message takes a
+    token; a message arriving at an empty bucket is suppressed.
+
+    At most 'max_sources' buckets are kept. The least recently seen
+    client is forgotten to make room for a new one, so memory stays
+    bounded no matter how many addresses send messages. A forgotten
+    client starts over with a full bucket.
+
+    When a summary interval ends, the number of messages suppressed per
+    client is logged. Summaries are only logged when a message arrives
+    or flush() is called.
+
+    Attributes:
+        rate (float): The number of messages accepted per client and second.
+        burst (float): The number of messages a client may send at once.
+        max_sources (int): The maximum number of clients tracked.
+        summary_interval (float): The number of seconds between summaries.
+        suppressed (int): The number of messages suppressed so far.
+    """
+    # the number of clients listed in a summary; the rest are added up
+    MAX_SUMMARY_SOURCES: int = 10
+
+    def __init__(self, rate: float, burst: float = 0, max_sources: int = 100000, summary_interval: float = 10.0):
+        """
+        Inits SourceRateLimiter.
+
+        Args:
+            rate (float): The number of messages accepted per client and second.
+            burst (float): The number of messages a client may send at once.
+                If 0, it is the same as the rate (but at least 1).
+            max_sources (int): The maximum number of clients tracked.
+            summary_interval (float): The number of seconds between summaries.
+
+        Raises:
+            ValueError: If the rate isn't positive or max_sources is less than 1.
+        """
+        if rate <= 0:
+            raise ValueError(f"The rate limit must be positive, not {rate}")
+        if max_sources < 1:
+            raise ValueError(f"At least 1 source must be tracked, not {max_sources}")
+
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+        self.max_sources = max_sources
+        self.summary_interval = summary_interval
+        self.suppressed = 0
+        # source -> [tokens, time of the last refill], least recently seen first
+        self._buckets: collections.OrderedDict = collections.OrderedDict()
+        # source -> messages suppressed in the current interval
+        self._suppressed: dict = {}
+        self._suppressed_untracked: int = 0
+        self._window_start: float = time.monotonic()
+        self._lock: threading.Lock = threading.Lock()
+
+
+    @property
+    def sources(self) -> int:
+        """int: The number of clients currently tracked."""
+        return len(self._buckets)
+
+
+    def allow(self, source_addr: str) -> bool:
+        """
+        Takes a token from the client's bucket.
+
+        Args:
+            source_addr (str): The IP address of the client.
+
+        Returns:
+            bool: True if the message is accepted, False if it is suppressed.
+        """
+        now: float = time.monotonic()
+        with self._lock:
+            if now - self._window_start >= self.summary_interval:
+                summaries: list = self._end_window(now)
+            else:
+                summaries = []
+
+            bucket: list = self._buckets.get(source_addr)
+            if bucket is None:
+                if len(self._buckets) >= self.max_sources:
+                    self._buckets.popitem(last=False)
+                bucket = [self.burst, now]
+                self._buckets[source_addr] = bucket
+            else:
+                self._buckets.move_to_end(source_addr)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            allowed: bool = bucket[0] >= 1
+            if allowed:
+                bucket[0] -= 1
+            else:
+                self.suppressed += 1
+                if source_addr in self._suppressed or len(self._suppressed) < self.max_sources:
+                    self._suppressed[source_addr] = self._suppressed.get(source_addr, 0) + 1
+                else: # forgotten clients were suppressed too; keep the memory bounded
+                    self._suppressed_untracked += 1
+
+        for summary in summaries:
+            logger.warning(summary)
+        return allowed
+
+
+    def flush(self):
+        """Logs the summaries of the current interval and starts a new one."""
+        with self._lock:
+            summaries: list = self._end_window(time.monotonic())
+        for summary in summaries:
+            logger.warning(summary)
+
+
+    def _end_window(self, now: float) -> list:
+        """
+        Resets the suppressed counts. Must be called with the lock held.
+
+        Args:
+            now (float): The start of the new interval.
+
+        Returns:
+            list: The summaries of the clients whose messages were suppressed,
+                the noisiest first.
+        """
+        elapsed: float = now - self._window_start
+        noisiest: list = sorted(self._suppressed.items(), key=lambda item: item[1], reverse=True)
+        summaries: list = [f"[RATE LIMITED] Suppressed {count} messages from {source} in the last {elapsed:.0f}s"
+                           for source, count in noisiest[:self.MAX_SUMMARY_SOURCES]]
+        rest: list = noisiest[self.MAX_SUMMARY_SOURCES:]
+        if rest or self._suppressed_untracked:
+            summaries.append(f"[RATE LIMITED] Suppressed {sum(count for _, count in rest) + self._suppressed_untracked} "
+                             f"messages from other sources in the last {elapsed:.0f}s")
+        self._suppressed = {}
+        self._suppressed_untracked = 0
+        self._window_start = now
+        return summaries
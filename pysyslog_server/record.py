@@ -0,0 +1,254 @@
+"""
+Contains a compact record of a parsed Syslog message.
+
+Instead of a dict of strings per message, a SyslogRecord keeps the
+valid message and the offsets of its fields, as found by the regular
+expression that validated or parsed it. A field is sliced out of the
+message only when it is accessed, so sinks that only need a few fields
+(or none) don't pay for the rest. A record is converted to a dict with
+to_dict() when it is inserted into MongoDB.
+
+Both BSD Syslog (RFC 3164) and Syslog protocol (RFC 5424) messages
+are supported:
+
+>>> <34>Oct 11 22:14:15 mymachine su: 'su root' failed for lonvick on /dev/pts/8
+>>> <165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 [exampleSDID@32473 iut="3"] An application event
+"""
+import datetime
+import re
+from typing import Pattern
+
+RFC3164: str = "rfc3164"
+RFC5424: str = "rfc5424"
+
+# an RFC 5424 header field that has no value
+NILVALUE: str = "-"
+
+# the fields of each format, in the order of the groups after the PRI
+_FIELDS: dict = {
+    RFC3164: ("date", "time", "hostname", "tag", "content"),
+    RFC5424: ("version", "timestamp", "hostname", "app_name", "procid", "msgid", "structured_data", "content"),
+}
+_INDEXES: dict = {syslog_format: {name: i for i, name in enumerate(names)} for syslog_format, names in _FIELDS.items()}
+# rules, the store, etc. use the APP-NAME of an RFC 5424 message as its TAG
+_INDEXES[RFC5424]["tag"] = _INDEXES[RFC5424]["app_name"]
+# the RFC 5424 fields that are None in the dict of a record if they are NILVALUE
+_NILLABLE: tuple = ("timestamp", "hostname", "app_name", "procid", "msgid", "structured_data")
+
+# PRI, VERSION, TIMESTAMP, HOSTNAME, APP-NAME, PROCID, MSGID, STRUCTURED-DATA, and MSG
+#
+# An SD-ELEMENT is '[SD-ID PARAM-NAME="PARAM-VALUE" ...]', and a
+# PARAM-VALUE may contain escaped quotes and brackets. The MSG is
+# optional and may start with a byte order mark, which is skipped.
+RFC5424_PATTERN: str = (
+    r"<(191|190|1[0-8][0-9]|[1-9][0-9]|[0-9])>([1-9][0-9]{0,2}) "
+    r"(-|[0-9]{4}-[0-9]{2}-[0-9]{2}T[0-9]{2}:[0-9]{2}:[0-9]{2}(?:\.[0-9]{1,6})?(?:Z|[+-][0-9]{2}:[0-9]{2})) "
+    r"([^ ]{1,255}) ([^ ]{1,48}) ([^ ]{1,128}) ([^ ]{1,32}) "
+    r'(-|(?:\[[^ =\]"]{1,32}(?: [^ =\]"]{1,32}="(?:[^"\\]|\\.)*")*\])+)'
+    "(?: \ufeff?(.*))?"
+)
+_RFC5424_REGEX: Pattern = re.compile(RFC5424_PATTERN, re.DOTALL)
+_RFC5424_TIMESTAMP_REGEX: Pattern = re.compile(
+    r"([0-9]{4})-([0-9]{2})-([0-9]{2})T([0-9]{2}):([0-9]{2}):([0-9]{2})(?:\.([0-9]{1,6}))?(?:Z|([+-])([0-9]{2}):([0-9]{2}))"
+)
+
+
+def match_rfc5424(syslog_message: str):
+    """
+    Matches a message against the RFC 5424 format.
+
+    Args:
+        syslog_message (str): The message.
+
+    Returns:
+        re.Match: The match, or None if the message isn't an RFC 5424 message.
+    """
+    return _RFC5424_REGEX.match(syslog_message)
+
+
+def rfc5424_seconds(timestamp: str) -> float:
+    """
+    Converts an RFC 5424 TIMESTAMP into a point in time.
+
+    Unlike an RFC 3164 TIMESTAMP, it has a year, fractions of a second,
+    and the offset from UTC, so nothing has to be assumed.
+
+    Args:
+        timestamp (str): The TIMESTAMP, e.g. '2003-10-11T22:14:15.003Z'.
+
+    Returns:
+        float: The point in time in seconds since the epoch, or None if
+            the TIMESTAMP is NILVALUE or invalid (e.g. month 13).
+    """
+    match = _RFC5424_TIMESTAMP_REGEX.fullmatch(timestamp)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, fraction, sign, offset_hours, offset_minutes = match.groups()
+    offset: datetime.timedelta = datetime.timedelta()
+    if sign is not None:
+        offset = datetime.timedelta(hours=int(offset_hours), minutes=int(offset_minutes))
+        if sign == "-":
+            offset = -offset
+    try:
+        moment: datetime.datetime = datetime.datetime(
+            int(year), int(month), int(day), int(hour), int(minute), int(second),
+            int(fraction.ljust(6, "0")) if fraction else 0, tzinfo=datetime.timezone(offset))
+    except ValueError:
+        return None
+    return moment.timestamp()
+
+
+class SyslogRecord:
+    """
+    Class for the fields of a valid Syslog message, decoded on access.
+
+    Fields are read like the keys of a dict, e.g. record["hostname"]:
+    - RFC 3164: facility, severity, date, time, hostname, tag, content
+    - RFC 5424: facility, severity, version, timestamp, hostname,
+      app_name, procid, msgid, structured_data, content
+
+    The facility and severity are ints; every other field is the
+    string found in the message (NILVALUE included). The APP-NAME of an
+    RFC 5424 message can also be read as its 'tag'.
+
+    A record compares equal to the dict that to_dict() returns.
+
+    Attributes:
+        message (str): The valid Syslog message.
+        format (str): 'rfc3164' or 'rfc5424'.
+        pri (int): The priority value.
+    """
+
+    __slots__ = ("message", "format", "pri", "_spans")
+
+    def __init__(self, message: str, syslog_format: str, pri: int, spans: tuple):
+        """
+        Inits SyslogRecord.
+
+        Args:
+            message (str): The valid Syslog message.
+            syslog_format (str): 'rfc3164' or 'rfc5424'.
+            pri (int): The priority value.
+            spans (tuple): The (start, end) offsets of every field of the
+                format in the message, in order. (-1, -1) for a missing MSG.
+        """
+        self.message = message
+        self.format = syslog_format
+        self.pri = pri
+        self._spans = spans
+
+
+    @classmethod
+    def from_match(cls, match, syslog_format: str) -> "SyslogRecord":
+        """
+        Creates a record from a match whose first group is the PRI value,
+        followed by a group for every field of the format.
+
+        Args:
+            match (re.Match): The match of the whole message.
+            syslog_format (str): 'rfc3164' or 'rfc5424'.
+
+        Returns:
+            SyslogRecord: The record.
+        """
+        # regs holds the span of every group, created in a single call
+        return cls(match.string, syslog_format, int(match.group(1)), match.regs[2:])
+
+
+    @property
+    def facility(self) -> int:
+        """int: The facility."""
+        return self.pri >> 3
+
+
+    @property
+    def severity(self) -> int:
+        """int: The severity."""
+        return self.pri & 7
+
+
+    def __getitem__(self, key: str):
+        index: int = _INDEXES[self.format].get(key)
+        if index is None:
+            if key == "facility":
+                return self.pri >> 3
+            if key == "severity":
+                return self.pri & 7
+            raise KeyError(key)
+        start, end = self._spans[index]
+        return self.message[start:end]
+
+
+    def get(self, key: str, default=None):
+        """
+        Returns a field, or default if the format doesn't have it.
+
+        Args:
+            key (str): The name of the field.
+            default: Returned if the format doesn't have the field.
+
+        Returns:
+            The field, or default.
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+    def keys(self) -> tuple:
+        """
+        Returns the names of the fields of the format.
+
+        Returns:
+            tuple: The names, e.g. ('facility', 'severity', 'date', ...).
+        """
+        return ("facility", "severity") + _FIELDS[self.format]
+
+
+    def to_dict(self) -> dict:
+        """
+        Decodes every field, e.g. to be inserted into MongoDB.
+
+        A new dict is returned by every call. The header fields of an
+        RFC 5424 message that are NILVALUE are None.
+
+        Returns:
+            dict: The fields by name. The keys are 'facility', 'severity', etc.
+        """
+        message: str = self.message
+        if self.format == RFC3164: # unrolled; by far the most common
+            (date_start, date_end), (time_start, time_end), (hostname_start, hostname_end), (tag_start, tag_end), \
+                (content_start, content_end) = self._spans
+            return {
+                "facility": self.pri >> 3,
+                "severity": self.pri & 7,
+                "date": message[date_start:date_end],
+                "time": message[time_start:time_end],
+                "hostname": message[hostname_start:hostname_end],
+                "tag": message[tag_start:tag_end],
+                "content": message[content_start:content_end]
+            }
+
+        document: dict = {"facility": self.pri >> 3, "severity": self.pri & 7}
+        for name, (start, end) in zip(_FIELDS[self.format], self._spans):
+            document[name] = message[start:end]
+        for name in _NILLABLE:
+            if document[name] == NILVALUE:
+                document[name] = None
+        return document
+
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SyslogRecord):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+
+    __hash__ = None
+
+
+    def __repr__(self) -> str:
+        return f"SyslogRecord({self.message!r}, {self.format!r})"
@@ -0,0 +1,212 @@
+"""
+Contains a class for rotating the Syslog file by size and/or time,
+compressing rotated files in the background.
+"""
+import datetime
+import gzip
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from typing import Pattern
+
+try:
+    import zstandard
+except ImportError: # zstd compression is optional
+    zstandard = None
+
+from .log import logger
+
+INTERVAL_NONE: str = "none"
+INTERVAL_HOUR: str = "hour"
+INTERVAL_DAY: str = "day"
+INTERVALS: dict = {INTERVAL_NONE: None, INTERVAL_HOUR: "%Y%m%d%H", INTERVAL_DAY: "%Y%m%d"}
+
+COMPRESSION_NONE: str = "none"
+COMPRESSION_GZIP: str = "gzip"
+COMPRESSION_ZSTD: str = "zstd"
+COMPRESSION_EXTENSIONS: dict = {COMPRESSION_NONE: "", COMPRESSION_GZIP: ".gz", COMPRESSION_ZSTD: ".zst"}
+
+_STOP = object()
+
+
+class Rotator:
+    """
+    Class for rotating a file written by a FileWriter.
+
+    A file is rotated once the next write would make it larger than
+    'max_bytes', or once the current hour or day has ended. Rotating
+    atomically renames the file to '<name>.<YYYYmmdd-HHMMSS-ffffff>',
+    so the names of rotated files sort by age. Rotated files are then
+    compressed by a background thread, which also deletes the oldest
+    rotated files so that exactly 'backups' of them are kept.
+
+    Attributes:
+        max_bytes (int): The maximum size of the file. 0 disables rotating by size.
+        interval (str): One of 'none', 'hour', or 'day'.
+        backups (int): The number of rotated files to keep.
+        compression (str): One of 'none', 'gzip', or 'zstd'.
+        rotations (int): The number of times the file has been rotated.
+    """
+
+    def __init__(self, max_bytes: int = 0, interval: str = INTERVAL_NONE, backups: int = 7,
+                 compression: str = COMPRESSION_GZIP):
+        """
+        Inits Rotator.
+
+        Args:
+            max_bytes (int): The maximum size of the file. 0 disables rotating by size.
+            interval (str): One of 'none', 'hour', or 'day'.
+            backups (int): The number of rotated files to keep.
+            compression (str): One of 'none', 'gzip', or 'zstd'.
+
+        Raises:
+            ValueError: If the interval or compression is unknown, or if
+                zstd compression is requested without the 'zstandard' package.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown rotation interval '{interval}'. Use one of {tuple(INTERVALS)}")
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Unknown compression '{compression}'. Use one of {tuple(COMPRESSION_EXTENSIONS)}")
+        if compression == COMPRESSION_ZSTD and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.backups = backups
+        self.compression = compression
+        self.rotations = 0
+        self._period: str = None
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread = None
+
+
+    @property
+    def enabled(self) -> bool:
+        """bool: Indicates whether or not the file is ever rotated."""
+        return self.max_bytes > 0 or self.interval != INTERVAL_NONE
+
+
+    def start(self):
+        """Starts the compression thread."""
+        self._thread = threading.Thread(target=self._run, name="pysyslog-compressor", daemon=True)
+        self._thread.start()
+
+
+    def close(self):
+        """Waits for queued files to be compressed and stops the compression thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+
+    def opened(self):
+        """Records the time period in which the file was (re)opened."""
+        self._period = self._current_period()
+
+
+    def due(self, size: int, incoming: int) -> bool:
+        """
+        Checks whether or not the file must be rotated before a write.
+
+        Args:
+            size (int): The current size of the file in bytes.
+            incoming (int): The number of bytes about to be written.
+
+        Returns:
+            bool: True if the file must be rotated first.
+        """
+        if size == 0:
+            return False
+        if self.max_bytes > 0 and size + incoming > self.max_bytes:
+            return True
+        return self._period != self._current_period()
+
+
+    def rotate(self, path: str) -> str:
+        """
+        Renames the file and queues it for compression.
+
+        The file must be closed by the caller beforehand.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            str: The path of the rotated file.
+        """
+        suffix: str = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        rotated: str = f"{path}.{suffix}"
+        os.rename(path, rotated) # atomic on the same filesystem
+        self.rotations += 1
+        self._queue.put(rotated)
+        return rotated
+
+
+    def _current_period(self) -> str:
+        """
+        Returns the hour or day that the current time belongs to.
+
+        Returns:
+            str: The formatted period, or None if not rotating by time.
+        """
+        period_format: str = INTERVALS[self.interval]
+        return time.strftime(period_format) if period_format else None
+
+
+    def _run(self):
+        """Compresses rotated files until close() is called."""
+        while True:
+            rotated = self._queue.get()
+            if rotated is _STOP:
+                return
+            try:
+                self._compress(rotated)
+                self._prune(rotated[:rotated.rindex(".")])
+            except OSError as e:
+                logger.error("[ERROR] Failed to compress '%s': %s", rotated, e)
+
+
+    def _compress(self, rotated: str):
+        """
+        Compresses a rotated file and deletes the uncompressed file.
+
+        The compressed file is written to a temporary name first, so
+        a partially compressed file is never mistaken for a complete one.
+
+        Args:
+            rotated (str): The path of the rotated file.
+        """
+        if self.compression == COMPRESSION_NONE:
+            return
+
+        compressed: str = rotated + COMPRESSION_EXTENSIONS[self.compression]
+        temporary: str = compressed + ".tmp"
+        with open(rotated, "rb") as source:
+            if self.compression == COMPRESSION_GZIP:
+                with gzip.open(temporary, "wb") as destination:
+                    shutil.copyfileobj(source, destination, 1024 * 1024)
+            else:
+                with open(temporary, "wb") as destination:
+                    zstandard.ZstdCompressor().copy_stream(source, destination)
+        os.replace(temporary, compressed)
+        os.remove(rotated)
+
+
+    def _prune(self, path: str):
+        """
+        Deletes the oldest rotated files until 'backups' of them are left.
+
+        Args:
+            path (str): The path of the file being rotated.
+        """
+        directory, name = os.path.split(path)
+        rotated_name: Pattern = re.compile(re.escape(name) + r"\.\d{8}-\d{6}-\d{6}(\.gz|\.zst)?$")
+        rotated: list[str] = sorted(entry for entry in os.listdir(directory or ".") if rotated_name.match(entry))
+
+        for entry in rotated[:max(0, len(rotated) - self.backups)]:
+            os.remove(os.path.join(directory, entry))
@@ -0,0 +1,320 @@
+"""
+Contains a rules engine for filtering messages and routing them to
+different files or MongoDB collections.
+
+Rules are read from a JSON file holding a list of objects, e.g.:
+
+    [
+        {"selector": "*.=debug", "drop": true},
+        {"selector": "auth,authpriv.*", "file": "auth.log"},
+        {"selector": "*.err", "content": "segfault|panic", "file": "crashes.log", "continue": true},
+        {"hostname": "^fw\\\\d+$", "file": "firewall.log", "collection": "firewall"}
+    ]
+
+Every rule may have these keys:
+- selector: facilities and severities in the syntax of rsyslog/syslogd
+  (e.g. 'mail.info', 'kern,daemon.=err', '*.info;mail.none'), '*.*' by default
+- hostname, tag, content: regular expressions searched in these fields
+  (the tag of an RFC 5424 message is its APP-NAME)
+- file: the file in './syslog/' the message is appended to
+- collection: the MongoDB collection the message is saved to
+- drop: if true, the message is discarded
+- continue: if true, the following rules are evaluated too
+
+A message is handled by the first rule it matches (and by the matching
+rules before it that have 'continue' set). Messages that don't match
+any rule go to SYSLOG_FILE and MONGODB_COLLECTION as usual.
+
+Rules are compiled once: the selectors into a table of the rules that
+can match each of the 192 PRI values, and the regular expressions of
+every field into one combined expression, which rules out all rules
+filtering on that field with a single search.
+"""
+import json
+import re
+from typing import Pattern
+from .record import SyslogRecord
+
+FACILITIES: dict = {
+    "kern": 0, "user": 1, "mail": 2, "daemon": 3, "auth": 4, "syslog": 5, "lpr": 6, "news": 7,
+    "uucp": 8, "cron": 9, "authpriv": 10, "ftp": 11, "ntp": 12, "security": 13, "console": 14, "clock": 15,
+    "local0": 16, "local1": 17, "local2": 18, "local3": 19, "local4": 20, "local5": 21, "local6": 22, "local7": 23
+}
+SEVERITIES: dict = {
+    "emerg": 0, "panic": 0, "alert": 1, "crit": 2, "err": 3, "error": 3,
+    "warning": 4, "warn": 4, "notice": 5, "info": 6, "debug": 7
+}
+PRI_VALUES: int = len(FACILITIES) * 8
+
+_FILTERED_FIELDS: tuple = ("hostname", "tag", "content")
+_RULE_KEYS: set = {"selector", "file", "collection", "drop", "continue", *_FILTERED_FIELDS}
+
+
+def _lookup(names: dict, name: str, kind: str) -> int:
+    """
+    Looks up a facility or severity by name or number.
+
+    Args:
+        names (dict): FACILITIES or SEVERITIES.
+        name (str): The name, e.g. 'mail', or the number, e.g. '2'.
+        kind (str): 'facility' or 'severity', for the error message.
+
+    Returns:
+        int: The facility or severity.
+
+    Raises:
+        ValueError: If the name is unknown.
+    """
+    if name.isdigit() and int(name) in names.values():
+        return int(name)
+    try:
+        return names[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown {kind} '{name}'")
+
+
+def parse_selector(selector: str) -> int:
+    """
+    Compiles a selector into a bitmap of the PRI values it matches.
+
+    A selector is a list of 'facilities.severity' separated by ';'.
+    Facilities are separated by ',' or '*' for all of them. The
+    severity is:
+    - '*' for all severities
+    - 'none' for none; clears the facilities matched so far
+    - 'sev' for sev and every more severe severity, e.g. 'err' also
+      matches 'crit'
+    - '=sev' for sev only
+    - '!sev' or '!=sev' to exclude these severities from the facilities
+      matched so far (or from all severities, if nothing matched yet)
+
+    Args:
+        selector (str): The selector, e.g. '*.info;mail.none'.
+
+    Returns:
+        int: The bitmap. Bit n is set if messages with PRI n match.
+
+    Raises:
+        ValueError: If the selector is malformed.
+    """
+    bitmap: int = 0
+    for part in selector.split(";"):
+        facilities, separator, severity = part.strip().rpartition(".")
+        if not separator or not facilities or not severity:
+            raise ValueError(f"Malformed selector '{part}'. Use 'facility.severity'")
+
+        if facilities == "*":
+            facility_list: list = list(range(len(FACILITIES)))
+        else:
+            facility_list = [_lookup(FACILITIES, facility.strip(), "facility") for facility in facilities.split(",")]
+
+        negated: bool = severity.startswith("!")
+        severity = severity[1:] if negated else severity
+        if severity in ("*", "none"):
+            severities: range = range(8)
+        elif severity.startswith("="):
+            value: int = _lookup(SEVERITIES, severity[1:], "severity")
+            severities = range(value, value + 1)
+        else:
+            severities = range(_lookup(SEVERITIES, severity, "severity") + 1)
+
+        mask: int = 0
+        for facility in facility_list:
+            for value in severities:
+                mask |= 1 << (facility * 8 + value)
+        if negated or severity == "none":
+            if negated and not bitmap:
+                for facility in facility_list:
+                    bitmap |= 0xff << (facility * 8)
+            bitmap &= ~mask
+        else:
+            bitmap |= mask
+    return bitmap
+
+
+class Rule:
+    """
+    Class for a compiled rule.
+
+    Attributes:
+        selector (int): The bitmap of the PRI values the rule matches.
+        hostname (Pattern): Searched in the HOSTNAME, or None.
+        tag (Pattern): Searched in the TAG, or None.
+        content (Pattern): Searched in the CONTENT, or None.
+        file (str): The file the message is appended to, or None.
+        collection (str): The collection the message is saved to, or None.
+        drop (bool): Whether or not the message is discarded.
+        continue_ (bool): Whether or not the following rules are evaluated.
+    """
+    __slots__ = ("selector", "hostname", "tag", "content", "file", "collection", "drop", "continue_")
+
+    def __init__(self, config: dict):
+        """
+        Inits Rule.
+
+        Args:
+            config (dict): The rule as read from the rules file.
+
+        Raises:
+            ValueError: If the rule is malformed.
+        """
+        if not isinstance(config, dict):
+            raise ValueError(f"A rule must be an object, not {config!r}")
+        unknown: set = set(config) - _RULE_KEYS
+        if unknown:
+            raise ValueError(f"Unknown keys {sorted(unknown)}. Use any of {sorted(_RULE_KEYS)}")
+
+        self.selector = parse_selector(config.get("selector", "*.*"))
+        for field in _FILTERED_FIELDS:
+            try:
+                setattr(self, field, re.compile(config[field]) if config.get(field) else None)
+            except re.error as e:
+                raise ValueError(f"Invalid regular expression for '{field}': {e}")
+        self.file = config.get("file")
+        self.collection = config.get("collection")
+        self.drop = bool(config.get("drop", False))
+        self.continue_ = bool(config.get("continue", False))
+        if self.drop == bool(self.file or self.collection):
+            raise ValueError("A rule must either have a 'file' and/or 'collection', or 'drop'")
+
+
+class Route:
+    """
+    Class for where a message goes.
+
+    Attributes:
+        files (list[str]): The files the message is appended to.
+        collections (list[str]): The collections the message is saved to.
+    """
+    __slots__ = ("files", "collections")
+
+    def __init__(self):
+        """Inits Route."""
+        self.files = []
+        self.collections = []
+
+
+class RuleSet:
+    """
+    Class for evaluating compiled rules against parsed messages.
+
+    Attributes:
+        rules (list[Rule]): The rules, in order.
+        files (set): The files of every rule.
+        collections (set): The collections of every rule.
+    """
+
+    def __init__(self, rules: list[Rule]):
+        """
+        Inits RuleSet.
+
+        Args:
+            rules (list[Rule]): The rules, in order.
+        """
+        self.rules = rules
+        self.files = {rule.file for rule in rules if rule.file}
+        self.collections = {rule.collection for rule in rules if rule.collection}
+        # the rules that can match each PRI value, in order
+        self._candidates: tuple = tuple(tuple(rule for rule in rules if rule.selector >> pri & 1)
+                                        for pri in range(PRI_VALUES))
+        # one search rules out every rule filtering on the field
+        self._combined: dict = {}
+        for field in _FILTERED_FIELDS:
+            patterns: list = [getattr(rule, field).pattern for rule in rules if getattr(rule, field) is not None]
+            if len(patterns) > 1:
+                try:
+                    self._combined[field] = re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
+                except re.error: # e.g. a global flag like (?i) in the middle
+                    pass
+
+
+    def route(self, fields: SyslogRecord) -> Route:
+        """
+        Finds where a message goes.
+
+        Args:
+            fields (SyslogRecord): The parsed message, as returned by Parser.parse(),
+                or None if the message couldn't be parsed.
+
+        Returns:
+            Route: The files and collections of the matching rules (both empty
+                if the message is dropped), or None if no rule matched.
+        """
+        if fields is None:
+            return None
+        pri: int = fields["facility"] * 8 + fields["severity"]
+        if pri >= PRI_VALUES:
+            return None
+
+        route: Route = None
+        # field -> whether the combined expression matched, computed on demand
+        possible: dict = {}
+        for rule in self._candidates[pri]:
+            if not self._matches(rule, fields, possible):
+                continue
+            if route is None:
+                route = Route()
+            if rule.drop:
+                break
+            if rule.file:
+                route.files.append(rule.file)
+            if rule.collection:
+                route.collections.append(rule.collection)
+            if not rule.continue_:
+                break
+        return route
+
+
+    def _matches(self, rule: Rule, fields: SyslogRecord, possible: dict) -> bool:
+        """
+        Evaluates the regular expressions of a rule.
+
+        Args:
+            rule (Rule): A rule whose selector matches the message.
+            fields (SyslogRecord): The parsed message.
+            possible (dict): Caches the searches with the combined expressions.
+
+        Returns:
+            bool: True if every regular expression of the rule matches.
+        """
+        for field in _FILTERED_FIELDS:
+            pattern: Pattern = getattr(rule, field)
+            if pattern is None:
+                continue
+            combined: Pattern = self._combined.get(field)
+            if combined is not None:
+                if field not in possible:
+                    possible[field] = combined.search(fields[field]) is not None
+                if not possible[field]:
+                    return False
+            if not pattern.search(fields[field]):
+                return False
+        return True
+
+
+def load(path: str) -> RuleSet:
+    """
+    Reads and compiles the rules in a JSON file.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        RuleSet: The compiled rules.
+
+    Raises:
+        OSError: If the file can't be read.
+        ValueError: If the file isn't valid JSON or a rule is malformed.
+    """
+    with open(path, encoding="utf-8") as file:
+        config = json.load(file)
+    if not isinstance(config, list):
+        raise ValueError("The rules file must contain a list of rules")
+
+    rules: list[Rule] = []
+    for i, rule in enumerate(config):
+        try:
+            rules.append(Rule(rule))
+        except ValueError as e:
+            raise ValueError(f"Rule {i + 1}: {e}")
+    return RuleSet(rules)
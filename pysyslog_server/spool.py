@@ -0,0 +1,393 @@
+"""
+Contains classes for spooling Syslog messages to disk before they
+are saved to the database.
+
+The spool is a directory of append-only segment files. Every record
+is a 4-byte big-endian length followed by the UTF-8 encoded message.
+The position of the first record that hasn't been saved yet is kept
+in the 'offset' file, so saving resumes where it left off after a
+restart or a database outage.
+"""
+import os
+import re
+import struct
+import threading
+from typing import Callable, Pattern, Tuple
+
+_HEADER: struct.Struct = struct.Struct(">I")
+_SEGMENT_NAME: Pattern = re.compile(r"^(\d{10})\.spool$")
+
+
+class Spool:
+    """
+    Class for appending messages to segment files and reading them back.
+
+    Any thread may call append(). A new segment is started every time
+    the spool is opened and whenever the current segment reaches
+    'segment_bytes' bytes. Segments are deleted once every record in
+    them has been committed. If 'max_bytes' is set, messages that
+    would make the uncommitted records larger are dropped.
+
+    Attributes:
+        directory (str): The directory holding the segments.
+        segment_bytes (int): The size at which a new segment is started.
+        max_bytes (int): The maximum size of the uncommitted records, or 0 for no limit.
+        appended (int): The number of records appended since opening.
+        dropped (int): The number of messages dropped because the spool was full.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, max_bytes: int = 0):
+        """
+        Inits Spool.
+
+        Args:
+            directory (str): The directory holding the segments. It is
+                created if it doesn't exist.
+            segment_bytes (int): The size at which a new segment is started.
+            max_bytes (int): The maximum size of the uncommitted records, or 0 for no limit.
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.appended = 0
+        self.dropped = 0
+        self._size = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._available: threading.Event = threading.Event()
+        self._writer = None
+        self._write_segment = 0
+        self._write_position = 0
+        self._reader = None
+        self._reader_segment = 0
+        self._read_segment = 0
+        self._read_position = 0
+
+
+    def open(self):
+        """Starts a new segment and restores the committed offset."""
+        os.makedirs(self.directory, exist_ok=True)
+        segments: list[int] = self._segments()
+        self._read_segment, self._read_position = self._load_offset()
+        if segments and self._read_segment < segments[0]:
+            self._read_segment, self._read_position = segments[0], 0
+        # the bytes after the committed offset
+        self._size = sum(os.path.getsize(self._segment_path(segment)) for segment in segments
+                         if segment >= self._read_segment)
+        if self._read_segment in segments:
+            self._size -= self._read_position
+        # never append to an old segment; its last record may be incomplete
+        self._start_segment((segments[-1] + 1) if segments else max(1, self._read_segment))
+        if not segments:
+            self._read_segment, self._read_position = self._write_segment, 0
+        if self.pending():
+            self._available.set()
+
+
+    def close(self):
+        """Flushes and closes the segment files."""
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+
+    def append(self, message: str) -> bool:
+        """
+        Appends a message to the current segment.
+
+        Args:
+            message (str): The message to spool.
+
+        Returns:
+            bool: False if the message was dropped because the spool is full.
+        """
+        payload: bytes = message.encode("utf-8")
+        with self._lock:
+            if self.max_bytes and self._size + _HEADER.size + len(payload) > self.max_bytes:
+                self.dropped += 1
+                return False
+            if self._write_position >= self.segment_bytes:
+                self._writer.close()
+                self._start_segment(self._write_segment + 1)
+            self._writer.write(_HEADER.pack(len(payload)))
+            self._writer.write(payload)
+            self._write_position += _HEADER.size + len(payload)
+            self._size += _HEADER.size + len(payload)
+            self.appended += 1
+        self._available.set()
+        return True
+
+
+    @property
+    def offset(self) -> Tuple[int, int]:
+        """Tuple[int, int]: The segment and position of the first uncommitted record."""
+        return (self._read_segment, self._read_position)
+
+
+    def pending(self) -> bool:
+        """
+        Checks whether or not there are records that haven't been committed.
+
+        Returns:
+            bool: True if there may be uncommitted records.
+        """
+        return self.offset < (self._write_segment, self._write_position)
+
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Waits until a message is appended.
+
+        Args:
+            timeout (float): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if a message was appended since the last read().
+        """
+        return self._available.wait(timeout)
+
+
+    def read(self, max_records: int) -> Tuple[list, Tuple[int, int]]:
+        """
+        Reads uncommitted records, starting at the committed offset.
+
+        Reading doesn't move the committed offset, so the same records
+        are read again until commit() is called.
+
+        Args:
+            max_records (int): The maximum number of records to read.
+
+        Returns:
+            Tuple[list, Tuple[int, int]]: The messages read, and the
+                offset to pass to commit() once they have been saved.
+        """
+        self._available.clear()
+        with self._lock:
+            self._writer.flush()
+            write_segment: int = self._write_segment
+
+        records: list[str] = []
+        segment, position = self._read_segment, self._read_position
+        while len(records) < max_records:
+            reader = self._open_reader(segment, position)
+            if reader is None:
+                break
+            header: bytes = reader.read(_HEADER.size)
+            if len(header) == _HEADER.size:
+                length: int = _HEADER.unpack(header)[0]
+                payload: bytes = reader.read(length)
+                if len(payload) == length:
+                    records.append(payload.decode("utf-8"))
+                    position += _HEADER.size + length
+                    continue
+            if segment >= write_segment:
+                break # the rest of the record hasn't been written yet
+            # end of an older segment, or an incomplete record from a crash
+            segment, position = self._next_segment(segment, write_segment), 0
+
+        if records or (segment, position) != self.offset:
+            self._available.set() # more records may be waiting
+        return records, (segment, position)
+
+
+    def commit(self, offset: Tuple[int, int]):
+        """
+        Persists the offset of the first record that hasn't been saved.
+
+        Segments before the offset are deleted, and the committed
+        records no longer count towards max_bytes.
+
+        Args:
+            offset (Tuple[int, int]): The offset returned by read().
+        """
+        segment, position = offset
+        temporary: str = os.path.join(self.directory, "offset.tmp")
+        with open(temporary, "w") as f:
+            f.write(f"{segment} {position}\n")
+        os.replace(temporary, os.path.join(self.directory, "offset"))
+
+        # the bytes from the previous offset up to this one
+        committed: int = position - self._read_position
+        if segment != self._read_segment:
+            for old_segment in self._segments():
+                if old_segment < segment:
+                    if old_segment >= self._read_segment:
+                        committed += os.path.getsize(self._segment_path(old_segment))
+                    os.remove(self._segment_path(old_segment))
+        with self._lock:
+            self._size -= committed
+        self._read_segment, self._read_position = segment, position
+
+
+    def _start_segment(self, segment: int):
+        """
+        Opens a new segment for appending. Must hold the lock.
+
+        Args:
+            segment (int): The number of the segment.
+        """
+        self._writer = open(self._segment_path(segment), "ab")
+        self._write_segment = segment
+        self._write_position = self._writer.tell()
+
+
+    def _open_reader(self, segment: int, position: int):
+        """
+        Returns the reader positioned at the given offset.
+
+        Args:
+            segment (int): The number of the segment.
+            position (int): The position in the segment.
+
+        Returns:
+            The open segment file, or None if the segment doesn't exist.
+        """
+        if self._reader is None or self._reader_segment != segment:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+            try:
+                self._reader = open(self._segment_path(segment), "rb")
+            except FileNotFoundError:
+                return None
+            self._reader_segment = segment
+        if self._reader.tell() != position:
+            self._reader.seek(position)
+        return self._reader
+
+
+    def _next_segment(self, segment: int, write_segment: int) -> int:
+        """
+        Returns the segment after the given one.
+
+        Args:
+            segment (int): The number of the segment.
+            write_segment (int): The number of the segment being appended to.
+
+        Returns:
+            int: The number of the next existing segment.
+        """
+        later: list[int] = [number for number in self._segments() if segment < number <= write_segment]
+        return later[0] if later else write_segment
+
+
+    def _load_offset(self) -> Tuple[int, int]:
+        """
+        Reads the committed offset.
+
+        Returns:
+            Tuple[int, int]: The segment and position, or (0, 0) if
+                nothing has been committed.
+        """
+        try:
+            with open(os.path.join(self.directory, "offset")) as f:
+                segment, position = f.read().split()
+                return (int(segment), int(position))
+        except (FileNotFoundError, ValueError):
+            return (0, 0)
+
+
+    def _segments(self) -> list[int]:
+        """
+        Lists the existing segments.
+
+        Returns:
+            list[int]: The numbers of the segments in ascending order.
+        """
+        matches = (_SEGMENT_NAME.match(entry) for entry in os.listdir(self.directory))
+        return sorted(int(match.group(1)) for match in matches if match)
+
+
+    def _segment_path(self, segment: int) -> str:
+        """
+        Returns the path of a segment.
+
+        Args:
+            segment (int): The number of the segment.
+
+        Returns:
+            str: The path of the segment file.
+        """
+        return os.path.join(self.directory, f"{segment:010d}.spool")
+
+
+class SpoolDrainer:
+    """
+    Class for replaying spooled messages into a sink from a background thread.
+
+    The handler is called with batches of spooled messages and returns
+    whether or not the batch was saved. The offset is only committed
+    after a batch was saved, so no message is lost if the sink is
+    unavailable or the collector stops.
+
+    Attributes:
+        spool (Spool): The spool to read from.
+        handler (Callable): Saves a list of messages and returns True on success.
+        batch_size (int): The maximum number of messages per batch.
+        poll_interval (float): The maximum number of seconds to wait for new messages.
+        drained (int): The number of messages saved by the handler.
+    """
+
+    def __init__(self, spool: Spool, handler: Callable, batch_size: int = 500, poll_interval: float = 0.1):
+        """
+        Inits SpoolDrainer.
+
+        Args:
+            spool (Spool): The spool to read from.
+            handler (Callable): Saves a list of messages and returns True on success.
+            batch_size (int): The maximum number of messages per batch.
+            poll_interval (float): The maximum number of seconds to wait for new messages.
+        """
+        self.spool = spool
+        self.handler = handler
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.drained = 0
+        self._stopping: threading.Event = threading.Event()
+        self._thread: threading.Thread = None
+
+
+    def start(self):
+        """Starts the drainer thread."""
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="pysyslog-spool", daemon=True)
+        self._thread.start()
+
+
+    def stop(self):
+        """Asks the drainer thread to stop after the current batch, without waiting for it."""
+        self._stopping.set()
+
+
+    def close(self):
+        """
+        Stops the drainer thread after the current batch.
+
+        The records that haven't been replayed stay in the spool for the
+        next start. The handler must stop retrying once it is asked to
+        stop (e.g. by closing the sink), otherwise this blocks until it
+        succeeds.
+        """
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join()
+        self._thread = None
+
+
+    def _run(self):
+        """Replays spooled messages until close() is called."""
+        while not self._stopping.is_set():
+            records, offset = self.spool.read(self.batch_size)
+            if records:
+                if not self.handler(records):
+                    return # the sink gave up; the records are replayed after a restart
+                self.spool.commit(offset)
+                self.drained += len(records)
+                continue
+            if offset != self.spool.offset:
+                self.spool.commit(offset)
+            self.spool.wait(self.poll_interval)
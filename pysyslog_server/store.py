@@ -0,0 +1,475 @@
+"""
+Contains a local store of messages partitioned by time, with an index
+on their hostname, tag, facility, and severity, and the functions
+for querying it.
+
+Every hour (or day) of messages is appended to its own segment file,
+e.g. '2026-10-17T23.log', next to a small SQLite index, e.g.
+'2026-10-17T23.idx', that maps the fields of every message to its
+offset in the segment. A query only opens the segments overlapping
+the requested time range, asks their indexes for the matching offsets,
+and reads just those lines, instead of scanning the whole history.
+
+Segments are named after the time the messages were received, in UTC,
+because an RFC 3164 TIMESTAMP has neither a year nor a timezone.
+"""
+import datetime
+import glob
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterator, Tuple
+from . import metrics
+from .log import logger
+from .record import SyslogRecord
+from .rules import FACILITIES, SEVERITIES
+
+PARTITION_HOUR: str = "hour"
+PARTITION_DAY: str = "day"
+PARTITIONS: tuple = (PARTITION_HOUR, PARTITION_DAY)
+
+_SEGMENT_FORMATS: dict = {PARTITION_HOUR: "%Y-%m-%dT%H", PARTITION_DAY: "%Y-%m-%d"}
+_SEGMENT_LENGTHS: dict = {PARTITION_HOUR: 3600, PARTITION_DAY: 86400}
+_SEGMENT_NAME: re.Pattern = re.compile(r"^(\d{4}-\d{2}-\d{2})(T\d{2})?\.log$")
+
+_SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS messages (
+    offset INTEGER PRIMARY KEY,
+    length INTEGER NOT NULL,
+    received REAL NOT NULL,
+    facility INTEGER,
+    severity INTEGER,
+    hostname TEXT,
+    tag TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_hostname ON messages (hostname);
+CREATE INDEX IF NOT EXISTS messages_tag ON messages (tag);
+CREATE INDEX IF NOT EXISTS messages_severity ON messages (severity, facility);
+"""
+
+_SEVERITY_OPERATORS: tuple = ("<=", ">=", "<", ">", "=")
+
+_STOP = object()
+
+_INDEX_DURATION: metrics.Histogram = metrics.histogram(
+    "syslog_store_flush_duration_seconds", "Time spent appending a batch to a segment and indexing it.")
+_STORED: metrics.Counter = metrics.counter("syslog_store_messages_total", "Messages appended to the store.")
+
+
+def segment_name(seconds: float, partition: str = PARTITION_HOUR) -> str:
+    """
+    Returns the name of the segment holding the messages received at a point in time.
+
+    Args:
+        seconds (float): The number of seconds since the epoch.
+        partition (str): 'hour' or 'day'.
+
+    Returns:
+        str: For example '2026-10-17T23' or '2026-10-17'.
+    """
+    return time.strftime(_SEGMENT_FORMATS[partition], time.gmtime(seconds))
+
+
+def segment_range(file_name: str) -> Tuple[float, float]:
+    """
+    Returns the time range of a segment.
+
+    Args:
+        file_name (str): The file name of the segment, e.g. '2026-10-17T23.log'.
+
+    Returns:
+        Tuple[float, float]: The start (inclusive) and end (exclusive) in
+            seconds since the epoch, or None if it isn't a segment.
+    """
+    match: re.Match = _SEGMENT_NAME.match(file_name)
+    if match is None:
+        return None
+    date, hour = match.groups()
+    start: datetime.datetime = datetime.datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+    if hour is None:
+        return start.timestamp(), start.timestamp() + _SEGMENT_LENGTHS[PARTITION_DAY]
+    start += datetime.timedelta(hours=int(hour[1:]))
+    return start.timestamp(), start.timestamp() + _SEGMENT_LENGTHS[PARTITION_HOUR]
+
+
+def _index_tag(tag: str) -> str:
+    """
+    Removes the character terminating a TAG, e.g. 'sshd[' becomes 'sshd'.
+
+    Args:
+        tag (str): The TAG as returned by Parser.parse().
+
+    Returns:
+        str: The TAG without its terminating character, or None if nothing is left.
+    """
+    if tag and not tag[-1].isalnum():
+        tag = tag[:-1]
+    return tag or None
+
+
+class SegmentStore:
+    """
+    Class for appending messages to time-partitioned segments and indexing them.
+
+    Any thread may call write(). Messages are queued and written in
+    batches by the store's thread: every batch is appended to the
+    segment with a single write() system call, and its index entries
+    are inserted in a single transaction.
+
+    Attributes:
+        directory (str): The directory of the segments.
+        partition (str): 'hour' or 'day'.
+        batch_size (int): The maximum number of messages per batch.
+        batch_interval (float): The maximum number of seconds a message waits.
+        stored (int): The number of messages written.
+    """
+
+    def __init__(self, directory: str, partition: str = PARTITION_HOUR, batch_size: int = 1000,
+                 batch_interval: float = 1.0, max_queue_size: int = 100000):
+        """
+        Inits SegmentStore.
+
+        Args:
+            directory (str): The directory of the segments. It is created if needed.
+            partition (str): 'hour' or 'day'.
+            batch_size (int): The maximum number of messages per batch.
+            batch_interval (float): The maximum number of seconds a message waits.
+            max_queue_size (int): The maximum number of messages waiting for the
+                store's thread. write() blocks while the queue is full.
+
+        Raises:
+            ValueError: If the partition is unknown.
+        """
+        if partition not in PARTITIONS:
+            raise ValueError(f"Unknown partition '{partition}'. Use one of {PARTITIONS}")
+
+        self.directory = directory
+        self.partition = partition
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.stored = 0
+        self._queue: queue.Queue = queue.Queue(max_queue_size)
+        self._thread: threading.Thread = None
+        self._segment: str = None
+        self._fd: int = -1
+        self._size = 0
+        self._index: sqlite3.Connection = None
+
+
+    def start(self):
+        """Starts the store's thread."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="pysyslog-store", daemon=True)
+        self._thread.start()
+
+
+    def write(self, syslog_message: str, fields: SyslogRecord = None, received: float = None):
+        """
+        Queues a message to be stored.
+
+        Args:
+            syslog_message (str): The valid Syslog message.
+            fields (SyslogRecord): The parsed message, or None if it couldn't be
+                parsed. Only its time of arrival is indexed then.
+            received (float): The time the message arrived in seconds since
+                the epoch. If None, the current time is used.
+        """
+        self._queue.put((time.time() if received is None else received, syslog_message, fields))
+
+
+    def flush(self):
+        """Stores every queued message, and returns once they have been written."""
+        if self._thread is None:
+            return
+        flushed: threading.Event = threading.Event()
+        self._queue.put(flushed)
+        flushed.wait()
+
+
+    def close(self):
+        """Stores every queued message, then stops the thread and closes the segment."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        self._close_segment()
+
+
+    def _run(self):
+        """Stores queued messages in batches until close() is called."""
+        while True:
+            batch: list = []
+            deadline: float = None
+            flushed: threading.Event = None
+            while len(batch) < self.batch_size:
+                try:
+                    timeout: float = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._store(batch)
+                    return
+                if isinstance(item, threading.Event): # flush() is waiting
+                    flushed = item
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.batch_interval
+            try:
+                self._store(batch)
+            except (OSError, sqlite3.Error) as e:
+                logger.error("[STORE] Failed to store %d messages: %s", len(batch), e)
+            if flushed is not None:
+                flushed.set()
+
+
+    def _store(self, batch: list):
+        """
+        Appends a batch to the segments of their arrival times and indexes it.
+
+        Args:
+            batch (list): (arrival time, message, fields) tuples, in order.
+        """
+        start: float = time.perf_counter()
+        i: int = 0
+        while i < len(batch):
+            # the batch rarely spans two segments
+            segment: str = segment_name(batch[i][0], self.partition)
+            lines: list = []
+            rows: list = []
+            offset: int = self._open_segment(segment)
+            while i < len(batch) and segment_name(batch[i][0], self.partition) == segment:
+                received, syslog_message, fields = batch[i]
+                line: bytes = f"{syslog_message}\n".encode("utf-8")
+                if fields is None:
+                    rows.append((offset, len(line) - 1, received, None, None, None, None))
+                else:
+                    rows.append((offset, len(line) - 1, received, fields["facility"], fields["severity"],
+                                 fields["hostname"], _index_tag(fields["tag"])))
+                lines.append(line)
+                offset += len(line)
+                i += 1
+
+            view: memoryview = memoryview(b"".join(lines))
+            while view:
+                view = view[os.write(self._fd, view):]
+            self._size = offset
+            # the lines are written first, so the index never points past the end of the segment
+            with self._index:
+                self._index.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.stored += len(rows)
+            _STORED.inc(len(rows))
+        if batch:
+            _INDEX_DURATION.observe(time.perf_counter() - start)
+
+
+    def _open_segment(self, segment: str) -> int:
+        """
+        Makes a segment the one being appended to.
+
+        Args:
+            segment (str): The name of the segment, e.g. '2026-10-17T23'.
+
+        Returns:
+            int: The size of the segment, i.e. the offset of the next line.
+        """
+        if segment != self._segment:
+            self._close_segment()
+            path: str = os.path.join(self.directory, segment)
+            self._fd = os.open(path + ".log", os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._size = os.fstat(self._fd).st_size
+            self._index = sqlite3.connect(path + ".idx", check_same_thread=False)
+            self._index.execute("PRAGMA journal_mode=WAL")
+            self._index.execute("PRAGMA synchronous=NORMAL")
+            self._index.executescript(_SCHEMA)
+            self._segment = segment
+        return self._size
+
+
+    def _close_segment(self):
+        """Closes the segment being appended to, if any."""
+        if self._segment is None:
+            return
+        os.close(self._fd)
+        self._index.close()
+        self._fd = -1
+        self._index = None
+        self._segment = None
+
+
+def parse_time(text: str, now: float = None) -> float:
+    """
+    Parses the bounds of a query's time range.
+
+    Args:
+        text (str): A duration before now, e.g. '30s', '15m', '2h', or '7d',
+            or an ISO 8601 date or date and time, e.g. '2026-10-17' or
+            '2026-10-17T23:00'. Local time is assumed if no offset is given.
+        now (float): The current time in seconds since the epoch. If None,
+            the current time is used.
+
+    Returns:
+        float: The point in time in seconds since the epoch.
+
+    Raises:
+        ValueError: If the text is neither a duration nor a date.
+    """
+    match: re.Match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", text.strip())
+    if match:
+        seconds: float = float(match.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[match.group(2)]
+        return (time.time() if now is None else now) - seconds
+    try:
+        moment: datetime.datetime = datetime.datetime.fromisoformat(text.strip())
+    except ValueError:
+        raise ValueError(f"Invalid time '{text}'. Use e.g. '2h', '7d', or '2026-10-17T23:00'")
+    return moment.timestamp() # naive datetimes are local time
+
+
+def parse_severity(text: str) -> Tuple[str, int]:
+    """
+    Parses a severity filter.
+
+    Args:
+        text (str): A severity name or number, optionally preceded by
+            '<=', '>=', '<', '>', or '=', e.g. '<=3' or '<=err'. Without
+            an operator, the severity has to match exactly.
+
+    Returns:
+        Tuple[str, int]: The comparison operator and the severity.
+
+    Raises:
+        ValueError: If the severity is unknown.
+    """
+    text = text.strip()
+    operator: str = next((operator for operator in _SEVERITY_OPERATORS if text.startswith(operator)), "=")
+    name: str = text[len(operator):].strip() if text.startswith(operator) else text
+    if name.isdigit() and 0 <= int(name) <= 7:
+        return operator, int(name)
+    if name.lower() in SEVERITIES:
+        return operator, SEVERITIES[name.lower()]
+    raise ValueError(f"Unknown severity '{name}'. Use 0-7 or one of {tuple(SEVERITIES)}")
+
+
+def parse_facility(text: str) -> int:
+    """
+    Parses a facility filter.
+
+    Args:
+        text (str): A facility name or number, e.g. 'auth' or '4'.
+
+    Returns:
+        int: The facility.
+
+    Raises:
+        ValueError: If the facility is unknown.
+    """
+    if text.isdigit() and int(text) < len(FACILITIES):
+        return int(text)
+    if text.lower() in FACILITIES:
+        return FACILITIES[text.lower()]
+    raise ValueError(f"Unknown facility '{text}'. Use 0-23 or one of {tuple(FACILITIES)}")
+
+
+def segments(directory: str, since: float = None, until: float = None) -> list[str]:
+    """
+    Finds the segments overlapping a time range.
+
+    The shards of worker processes (e.g. 'store.1' next to 'store') are
+    searched too.
+
+    Args:
+        directory (str): The directory of the segments.
+        since (float): The start of the range in seconds since the epoch, or None.
+        until (float): The end of the range in seconds since the epoch, or None.
+
+    Returns:
+        list[str]: The paths of the segments without their extension,
+            sorted by time.
+    """
+    found: list = []
+    directories: list = [directory] + sorted(glob.glob(glob.escape(directory.rstrip("/\\")) + ".[0-9]*"))
+    for path in directories:
+        if not os.path.isdir(path):
+            continue
+        for file_name in os.listdir(path):
+            time_range: tuple = segment_range(file_name)
+            if time_range is None:
+                continue
+            start, end = time_range
+            if (since is None or end > since) and (until is None or start < until):
+                found.append((start, os.path.join(path, file_name[:-len(".log")])))
+    return [path for _, path in sorted(found)]
+
+
+def query(directory: str, hostnames: list = None, tags: list = None, facilities: list = None,
+          severity: Tuple[str, int] = None, since: float = None, until: float = None,
+          limit: int = None) -> Iterator[str]:
+    """
+    Finds stored messages.
+
+    Every filter that is given has to match. Messages are returned in
+    the order they were received (per worker process, if there are
+    several).
+
+    Args:
+        directory (str): The directory of the segments.
+        hostnames (list): The HOSTNAMEs to match, or None for any.
+        tags (list): The TAGs to match without their terminating character
+            (e.g. 'sshd'), or None for any.
+        facilities (list): The facilities to match, or None for any.
+        severity (Tuple[str, int]): A comparison like ('<=', 3), as
+            returned by parse_severity(), or None for any.
+        since (float): Only messages received at or after this time in
+            seconds since the epoch, or None.
+        until (float): Only messages received before this time in seconds
+            since the epoch, or None.
+        limit (int): The maximum number of messages, or None for all.
+
+    Returns:
+        Iterator[str]: The matching messages.
+    """
+    conditions: list = []
+    parameters: list = []
+    for column, values in (("hostname", hostnames), ("tag", tags), ("facility", facilities)):
+        if values:
+            conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+            parameters += values
+    if severity is not None:
+        operator, value = severity
+        if operator not in _SEVERITY_OPERATORS:
+            raise ValueError(f"Unknown operator '{operator}'. Use one of {_SEVERITY_OPERATORS}")
+        conditions.append(f"severity {operator} ?")
+        parameters.append(value)
+    if since is not None:
+        conditions.append("received >= ?")
+        parameters.append(since)
+    if until is not None:
+        conditions.append("received < ?")
+        parameters.append(until)
+    sql: str = "SELECT offset, length FROM messages"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY offset"
+
+    returned: int = 0
+    for segment in segments(directory, since, until):
+        if limit is not None and returned >= limit:
+            return
+        if not os.path.exists(segment + ".idx"):
+            continue
+        index: sqlite3.Connection = sqlite3.connect(f"file:{segment}.idx?mode=ro", uri=True)
+        try:
+            cursor: sqlite3.Cursor = index.execute(sql if limit is None else f"{sql} LIMIT {limit - returned}",
+                                                   parameters)
+            with open(segment + ".log", "rb") as log:
+                for offset, length in cursor:
+                    log.seek(offset)
+                    yield log.read(length).decode("utf-8", "replace")
+                    returned += 1
+        finally:
+            index.close()
@@ -0,0 +1,211 @@
+"""
+Contains a supervisor for running the collector in several worker
+processes that share the same listening port.
+
+Each worker binds the listening address with SO_REUSEPORT, so the
+kernel load-balances incoming datagrams between the workers. This
+allows validation and parsing to use more than one CPU core.
+"""
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+from typing import Callable
+from .log import logger
+
+STATS_FIELDS: tuple = ("received", "dropped", "failed", "queue_depth")
+
+
+def publish_stats(stats, worker_index: int, source: Callable, interval: float = 1.0) -> threading.Thread:
+    """
+    Periodically copies a worker's counters into shared memory.
+
+    Args:
+        stats: The shared array created by the Supervisor.
+        worker_index (int): The index of the worker.
+        source (Callable): Returns a dict containing the keys in STATS_FIELDS.
+        interval (float): The number of seconds between updates.
+
+    Returns:
+        threading.Thread: The daemon thread performing the updates.
+    """
+    offset: int = worker_index * len(STATS_FIELDS)
+
+    def publish():
+        while True:
+            values: dict = source()
+            for i, field in enumerate(STATS_FIELDS):
+                stats[offset + i] = values.get(field, 0)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=publish, name="pysyslog-stats", daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_worker(target: Callable, worker_index: int, stats):
+    """
+    Entry point of a worker process.
+
+    The supervisor's signal handlers are inherited when forking, so they
+    are replaced before running the target. SIGINT is ignored: Ctrl+C
+    reaches the whole process group, and the supervisor stops the
+    workers with SIGTERM, which lets them flush their sinks. SIGHUP is
+    ignored until the target installs its own handler (e.g. once the
+    rules are loaded), so a reload can't kill a starting worker.
+
+    Args:
+        target (Callable): Called with the worker index and the shared stats array.
+        worker_index (int): The index of the worker.
+        stats: The shared array created by the Supervisor.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    target(worker_index, stats)
+
+
+class Supervisor:
+    """
+    Class for starting worker processes and restarting them if they crash.
+
+    Each worker publishes its counters into a shared array (see
+    publish_stats()), which can be read with stats(). Sending SIGUSR1
+    to the supervisor prints the counters of every worker, and SIGHUP
+    is passed on to every worker (e.g. to reload the rules).
+
+    Attributes:
+        target (Callable): The function run by every worker. It is called
+            with the worker index and the shared stats array.
+        workers (int): The number of worker processes.
+        restart_delay (float): The number of seconds to wait before
+            restarting a crashed worker.
+        restarts (int): The number of times a worker has been restarted.
+    """
+
+    def __init__(self, target: Callable, workers: int, restart_delay: float = 1.0):
+        """
+        Inits Supervisor.
+
+        Args:
+            target (Callable): The function run by every worker.
+            workers (int): The number of worker processes.
+            restart_delay (float): The number of seconds to wait before
+                restarting a crashed worker.
+        """
+        self.target = target
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self._stats = multiprocessing.Array("q", workers * len(STATS_FIELDS), lock=False)
+        self._processes: list = [None] * workers
+        self._running = False
+
+
+    def start(self):
+        """Starts every worker process."""
+        self._running = True
+        for i in range(self.workers):
+            self._spawn(i)
+
+
+    def run(self, poll_interval: float = 1.0):
+        """
+        Starts the workers and supervises them until SIGTERM or SIGINT.
+
+        Args:
+            poll_interval (float): The number of seconds between health checks.
+        """
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop())
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self._print_stats())
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.send_signal(signal.SIGHUP))
+
+        self.start()
+        while self._running:
+            time.sleep(poll_interval)
+            self.check()
+        self.join()
+
+
+    def check(self):
+        """Restarts every worker that is no longer running."""
+        for i, process in enumerate(self._processes):
+            if self._running and not process.is_alive():
+                logger.warning("[SUPERVISOR] Worker %d (pid %d) exited with code %s, restarting", i, process.pid, process.exitcode)
+                time.sleep(self.restart_delay)
+                self.restarts += 1
+                self._spawn(i)
+
+
+    def stats(self) -> list[dict]:
+        """
+        Returns the latest counters published by every worker.
+
+        Returns:
+            list[dict]: The counters of each worker. The keys are the
+                names in STATS_FIELDS.
+        """
+        return [
+            {field: self._stats[i * len(STATS_FIELDS) + j] for j, field in enumerate(STATS_FIELDS)}
+            for i in range(self.workers)
+        ]
+
+
+    def stop(self):
+        """Terminates every worker process."""
+        self._running = False
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+
+
+    def send_signal(self, signum: int):
+        """
+        Sends a signal to every running worker process.
+
+        Args:
+            signum (int): The signal, e.g. signal.SIGHUP.
+        """
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                os.kill(process.pid, signum)
+
+
+    def join(self):
+        """Waits for every worker process to exit."""
+        for process in self._processes:
+            if process is not None:
+                process.join()
+
+
+    def _spawn(self, worker_index: int):
+        """
+        Starts a worker process.
+
+        Args:
+            worker_index (int): The index of the worker.
+        """
+        process = multiprocessing.Process(
+            target=_run_worker,
+            args=(self.target, worker_index, self._stats),
+            name=f"pysyslog-worker-{worker_index}",
+            daemon=True
+        )
+        process.start()
+        self._processes[worker_index] = process
+
+
+    def _print_stats(self):
+        """Prints the counters of every worker."""
+        for i, worker_stats in enumerate(self.stats()):
+            counters: str = ", ".join(f"{field}={value}" for field, value in worker_stats.items())
+            logger.info("[STATS] Worker %d: %s", i, counters)
+        sys.stdout.flush()
@@ -1,14 +1,95 @@
 """
 Contains class to validate incoming Syslog messages. Invalid
 messages are modified to adhere to the BSD Syslog format.
+Valid RFC 5424 messages are left as they are.
 """
-import datetime
 import re
-from typing import Tuple, Pattern
+from typing import NamedTuple, Pattern
+from .clock import SyslogClock
+from .record import RFC3164, RFC5424, SyslogRecord, match_rfc5424
+
+DEFAULT_PRI_VALUE: int = 13
+
+# how bytes that aren't ASCII are decoded; see decode_non_ascii()
+NON_ASCII_ESCAPE: str = "escape"
+NON_ASCII_REPLACE: str = "replace"
+NON_ASCII_PASSTHROUGH: str = "passthrough"
+NON_ASCII_POLICIES: tuple = (NON_ASCII_ESCAPE, NON_ASCII_REPLACE, NON_ASCII_PASSTHROUGH)
+
+# highest priority value is 191
+_PRI: str = r"<(191|190|1[0-8][0-9]|[1-9][0-9]|[0-9])>"
+# Mmm dd hh:mm:ss
+# if day < 10, first digit must be space
+_TIMESTAMP: str = r"((?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) (?:3[0-1]|[1-2][0-9]| [0-9])) " \
+    + r"((?:2[0-3]|[0-1][0-9]):[0-5][0-9]:[0-5][0-9]) "
+# see parser.py
+_TAG_AND_CONTENT: str = r"([A-Za-z0-9]{0,32}[^A-Za-z0-9]|[A-Za-z0-9]{33})(.*)"
+
+_PRI_REGEX: Pattern = re.compile(_PRI)
+_TIMESTAMP_REGEX: Pattern = re.compile(_TIMESTAMP)
+_TAG_AND_CONTENT_REGEX: Pattern = re.compile(_TAG_AND_CONTENT, re.DOTALL)
+_VALID_MESSAGE_REGEX: Pattern = re.compile(_PRI + _TIMESTAMP + r"([^ ]*) " + _TAG_AND_CONTENT, re.DOTALL)
+
+
+# used by validators that aren't given a clock; formats TIMESTAMPs in local time
+_default_clock: SyslogClock = SyslogClock()
+
+
+def decode_non_ascii(encoded_message: bytes, non_ascii: str = NON_ASCII_ESCAPE) -> str:
+    """
+    Decodes a message that isn't pure ASCII.
+
+    RFC 3164 requires ASCII, but devices send UTF-8 hostnames, Latin-1
+    usernames, etc. anyway. Pure ASCII messages should be decoded with
+    str(encoded_message, "ascii"), which is much faster; this is the
+    fallback for the UnicodeDecodeError it raises.
+
+    Args:
+        encoded_message (bytes): The message. Any object supporting the
+            buffer protocol (e.g. a memoryview) is accepted.
+        non_ascii (str): 'escape' turns every byte that isn't ASCII into
+            an escape like '\\xe9', 'replace' turns it into '?', and
+            'passthrough' decodes the message as UTF-8, so only bytes that
+            aren't valid UTF-8 are replaced (with U+FFFD).
+
+    Returns:
+        str: The decoded message. It is ASCII unless the policy is 'passthrough'.
+
+    Raises:
+        ValueError: If the policy is unknown.
+    """
+    if non_ascii == NON_ASCII_ESCAPE:
+        return str(encoded_message, "ascii", "backslashreplace")
+    if non_ascii == NON_ASCII_REPLACE:
+        # decoding ASCII can't produce a genuine U+FFFD
+        return str(encoded_message, "ascii", "replace").replace("\ufffd", "?")
+    if non_ascii == NON_ASCII_PASSTHROUGH:
+        return str(encoded_message, "utf-8", "replace")
+    raise ValueError(f"Unknown non-ASCII policy '{non_ascii}'. Use one of {NON_ASCII_POLICIES}")
+
+
+class ValidationResult(NamedTuple):
+    """
+    The result of Validator.validate_and_parse().
+
+    Attributes:
+        message (str): The valid (possibly corrected) Syslog message.
+        fields (SyslogRecord): The same record that Parser.parse() returns
+            for the message, or None if the MSG can't be split into TAG and CONTENT.
+        pri_inserted (bool): Indicates whether or not a PRI and a HEADER
+            were prepended because the PRI was invalid.
+        header_inserted (bool): Indicates whether or not a HEADER was
+            inserted because the TIMESTAMP was invalid.
+    """
+    message: str
+    fields: SyslogRecord
+    pri_inserted: bool
+    header_inserted: bool
+
 
 class Validator():
     """
-    Class for validating messages sent to the collector. 
+    Class for validating messages sent to the collector.
 
     Although not strictly necessary according to RFC3164,
     Validation and correction is done for consistency in
@@ -17,20 +98,24 @@ class Validator():
     Attributes:
         message (str): The original message sent to the collector.
         source_addr (str): The IP address of the client that sent the message.
+        clock (SyslogClock): Generates the TIMESTAMP of inserted HEADERs.
         """
 
-    def __init__(self, message: str, source_addr: str):
-        """ 
+    def __init__(self, message: str, source_addr: str, clock: SyslogClock = None):
+        """
         Inits Validator
 
         Args:
             message (str): The original message sent to the collector.
             source_addr (str): The IP address of the client that sent the message.
+            clock (SyslogClock): Generates the TIMESTAMP of inserted HEADERs.
+                If None, a shared clock using the local timezone is used.
         """
         self.message = message
         self.source_addr = source_addr
-        
-    
+        self.clock = clock or _default_clock
+
+
     def validate_message(self) -> str:
         """
         Performs validation and correction of the message.
@@ -43,95 +128,116 @@ class Validator():
         """
         if self._validate_pri():
             self._validate_timestamp()
-        
+
         return self.message
 
-            
+
+    def validate_and_parse(self) -> ValidationResult:
+        """
+        Performs validation and correction of the message, and parses it.
+
+        The result is the same as calling validate_message() and then
+        Parser.parse() on the valid message, but a valid message is only
+        scanned once. Corrected messages are parsed without scanning the
+        inserted PRI and HEADER again.
+
+        Returns:
+            ValidationResult: The valid message, its fields, and which
+                parts of the message were inserted.
+        """
+        match = _VALID_MESSAGE_REGEX.match(self.message)
+        if match:
+            return ValidationResult(self.message, SyslogRecord.from_match(match, RFC3164), False, False)
+        match = match_rfc5424(self.message)
+        if match:
+            return ValidationResult(self.message, SyslogRecord.from_match(match, RFC5424), False, False)
+
+        original: str = self.message
+        pri_valid: bool = self._validate_pri()
+        if pri_valid and not self._validate_timestamp():
+            # valid PRI and TIMESTAMP, but the MSG can't be parsed
+            return ValidationResult(self.message, None, False, False)
+
+        # the inserted HEADER follows the original or inserted PRI
+        pri_end: int = original.index(">") + 1 if pri_valid else 0
+        pri: int = int(original[1:pri_end - 1]) if pri_valid else DEFAULT_PRI_VALUE
+        header_start: int = pri_end if pri_valid else len(f"<{DEFAULT_PRI_VALUE}>")
+
+        fields: SyslogRecord = None
+        tag_and_content = _TAG_AND_CONTENT_REGEX.match(original, pri_end)
+        if tag_and_content:
+            # the rest of the original message was moved by the inserted part
+            shift: int = len(self.message) - len(original)
+            (tag_start, tag_end), (content_start, content_end) = tag_and_content.regs[1:]
+            hostname_start: int = header_start + len("Mmm dd hh:mm:ss ")
+            fields = SyslogRecord(self.message, RFC3164, pri, (
+                (header_start, header_start + len("Mmm dd")),
+                (header_start + len("Mmm dd "), header_start + len("Mmm dd hh:mm:ss")),
+                (hostname_start, hostname_start + len(self.source_addr)),
+                (tag_start + shift, tag_end + shift),
+                (content_start + shift, content_end + shift)
+            ))
+
+        return ValidationResult(self.message, fields, not pri_valid, pri_valid)
+
+
     def _validate_pri(self) -> bool:
         """
-        Validates the PRI as described in section 4.3. 
+        Validates the PRI as described in section 4.3.
 
-        If the PRI is invalid, prepend a valid PRI, a 
-        TIMESTAMP, and a HOSTNAME to the message as described in 
-        section 4.3.3. A default PRI value of 13 (facility == 1, 
+        If the PRI is invalid, prepend a valid PRI, a
+        TIMESTAMP, and a HOSTNAME to the message as described in
+        section 4.3.3. A default PRI value of 13 (facility == 1,
         severity == 5) is added.
 
         Since the server doesn't know the hostname of the client,
-        use the IP address instead as described by section 4.1.2.  
+        use the IP address instead as described by section 4.1.2.
 
-        Returns: 
+        Returns:
             bool: Indicates whether or not the original message had
                 a valid PRI
         """
         def prepend_pri_header():
-            DEFAULT_PRI_VALUE: int = 13
-            timestamp: str = str(datetime.datetime.now()).split(" ")
-            date: str = timestamp[0].split("-")
-            time: str = timestamp[1].split(".")
-            months: list[str] = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            month: str = months[int(date[1]) - 1] # date is 1-based, but list is 0-based
-            day: str = date[2] if int(date[2]) >= 10 else " " + str(int(date[2])) # replace leading 0 with space
+            self.message = f"<{DEFAULT_PRI_VALUE}>{self.clock.timestamp()} {self.source_addr} {self.message}"
 
-            self.message = f"<{DEFAULT_PRI_VALUE}>{month} {day} {time[0]} {self.source_addr} {self.message}"
-
-        pri_regex: Pattern = r"^<(191|190|1[0-8][0-9]|[1-9][0-9]|[0-9])>" # highest priority value is 191
-        match_regex: bool = re.search(pri_regex, self.message)
+        match_regex = _PRI_REGEX.match(self.message)
 
         if not match_regex:
             prepend_pri_header()
             return False
-        
+
         # check to make sure PRI isn't something like <0>> or <0>>>
-        counter: int = 0
-        seen_closing_bracket: bool = False
-        while (not seen_closing_bracket) and counter < len("<191>"):
-            if self.message[counter] == ">":
-                seen_closing_bracket = True
-            counter += 1
-
-        while counter < len("<191>"):
-            if self.message[counter] == ">":
-                prepend_pri_header()
-                return False
-            counter += 1
-        
+        if self.message.find(">", match_regex.end(), len("<191>")) != -1:
+            prepend_pri_header()
+            return False
+
         return True
 
 
-    def _validate_timestamp(self):
+    def _validate_timestamp(self) -> bool:
         """
-        Validates the format of the TIMESTAMP as described in section 4.1.2. 
-        
-        Assumes that the PRI has already been validated. 
+        Validates the format of the TIMESTAMP as described in section 4.1.2.
 
-        If timestamp is invalid, prepend the TIMESTAMP and HOSTNAME 
-        to the HEADER as described in section 4.3.2 (creating a 
+        Assumes that the PRI has already been validated.
+
+        If timestamp is invalid, prepend the TIMESTAMP and HOSTNAME
+        to the HEADER as described in section 4.3.2 (creating a
         new HEADER).
 
-        Since the server doesn't know the client's hostname, use 
+        Since the server doesn't know the client's hostname, use
         the IP address instead as described in section 4.1.2.
+
+        A valid RFC 5424 message, whose TIMESTAMP follows a VERSION,
+        is left as it is.
+
+        Returns:
+            bool: Indicates whether or not a HEADER was inserted.
         """
-        # Mmm dd hh:mm:ss
-        # if day < 10, first digit must be space
-        timestamp_regex: Pattern = r"^.*>((Jan)|(Feb)|(Mar)|(Apr)|(May)|(Jun)|(Jul)|(Aug)|(Sep)|(Oct)|(Nov)|(Dec)) " \
-            + r"(3[0-1]|[1-2][0-9]| [0-9]) (2[0-3]|[0-1][0-9]):[0-5][0-9]:[0-5][0-9] " 
+        counter: int = self.message.index(">") + 1
+        assert 3 <= counter and counter <= 5
 
-        match_regex: bool = re.search(timestamp_regex, self.message)
+        if _TIMESTAMP_REGEX.match(self.message, counter) or match_rfc5424(self.message):
+            return False
 
-        if not match_regex:
-            timestamp: str = str(datetime.datetime.now()).split(" ")
-            date: str = timestamp[0].split("-")
-            time: str = timestamp[1].split(".")
-            months: list[str] = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            month: str = months[int(date[1]) - 1] # date is 1-based, but list is 0-based
-            day: str = date[2] if int(date[2]) >= 10 else " " + str(int(date[2])) # replace leading 0 with space
-
-            counter: int = 0
-            char: str = ""
-            while char != ">":
-                char = self.message[counter]
-                counter += 1
-            
-            assert 3 <= counter and counter <= 5
-
-            self.message = self.message[:counter] + f"{month} {day} {time[0]} {self.source_addr} " + self.message[counter:]
\ No newline at end of file
+        self.message = self.message[:counter] + f"{self.clock.timestamp()} {self.source_addr} " + self.message[counter:]
+        return True
@@ -0,0 +1,306 @@
+"""
+Contains a class for appending Syslog messages to a file from a
+single, dedicated thread.
+"""
+import os
+import queue
+import threading
+import time
+from . import metrics
+from .log import logger
+from .rotation import Rotator
+
+FLUSH_LINE: str = "line"
+FLUSH_SIZE: str = "size"
+FLUSH_INTERVAL: str = "interval"
+FLUSH_POLICIES: tuple = (FLUSH_LINE, FLUSH_SIZE, FLUSH_INTERVAL)
+
+FSYNC_NONE: str = "none"
+FSYNC_PERIODIC: str = "periodic"
+FSYNC_BATCH: str = "batch"
+FSYNC_POLICIES: tuple = (FSYNC_NONE, FSYNC_PERIODIC, FSYNC_BATCH)
+
+_STOP = object()
+
+_FLUSH_DURATION: metrics.Histogram = metrics.histogram(
+    "syslog_file_flush_duration_seconds", "Time spent writing pending lines, including rotation.")
+_FSYNC_DURATION: metrics.Histogram = metrics.histogram("syslog_file_fsync_duration_seconds", "Time spent in os.fsync().")
+_FLUSH_LINES: metrics.Histogram = metrics.histogram(
+    "syslog_file_flush_lines", "Lines written per write() system call.", buckets=metrics.SIZE_BUCKETS)
+_WRITTEN_BYTES: metrics.Counter = metrics.counter("syslog_file_written_bytes_total", "Bytes appended to the file.")
+_FAILURES: metrics.Counter = metrics.counter(
+    "syslog_file_failures_total", "Writes and fsyncs of the file that failed, e.g. because the disk is full.")
+
+
+class FileWriter:
+    """
+    Class for appending lines to a file that is kept open.
+
+    Any thread may call write(). The lines are queued and written by
+    the writer thread, so lines from different threads never interleave.
+    Lines are collected in memory and written with a single write()
+    system call whenever the flush policy says so:
+
+    'line':
+        Every line is written immediately.
+    'size':
+        Lines are written once 'flush_bytes' bytes are pending.
+    'interval':
+        Lines are written once 'flush_interval' seconds have passed
+        since the last write, or earlier if 'flush_bytes' bytes are
+        pending.
+
+    The fsync policy decides how durable written lines are:
+
+    'none':
+        The operating system decides when the data reaches the disk.
+    'periodic':
+        os.fsync() is called at most every 'fsync_interval' seconds.
+    'batch':
+        os.fsync() is called after every write.
+
+    If a Rotator is given, it is asked before every write whether
+    or not the file must be rotated first.
+
+    If writing fails (e.g. because the disk is full), the pending lines
+    are discarded and the error is logged, so the queue keeps draining
+    and write() never blocks for good.
+
+    Attributes:
+        path (str): The path of the file.
+        flush_policy (str): One of 'line', 'size', or 'interval'.
+        flush_bytes (int): The number of pending bytes that triggers a write.
+        flush_interval (float): The maximum number of seconds lines stay pending.
+        fsync_policy (str): One of 'none', 'periodic', or 'batch'.
+        fsync_interval (float): The number of seconds between periodic fsyncs.
+        rotator (Rotator): Rotates the file, or None to never rotate it.
+        lines_written (int): The number of lines written to the file.
+        bytes_written (int): The number of bytes written to the file.
+        flushes (int): The number of write() system calls made.
+        failures (int): The number of writes and fsyncs that failed.
+        lines_lost (int): The number of lines discarded because writing failed.
+    """
+
+    def __init__(self, path: str, flush_policy: str = FLUSH_INTERVAL, flush_bytes: int = 65536,
+                 flush_interval: float = 1.0, fsync_policy: str = FSYNC_NONE, fsync_interval: float = 1.0,
+                 max_queue_size: int = 100000, rotator: Rotator = None):
+        """
+        Inits FileWriter.
+
+        Args:
+            path (str): The path of the file.
+            flush_policy (str): One of 'line', 'size', or 'interval'.
+            flush_bytes (int): The number of pending bytes that triggers a write.
+            flush_interval (float): The maximum number of seconds lines stay pending.
+            fsync_policy (str): One of 'none', 'periodic', or 'batch'.
+            fsync_interval (float): The number of seconds between periodic fsyncs.
+            max_queue_size (int): The maximum number of lines waiting for the
+                writer thread. write() blocks while the queue is full.
+            rotator (Rotator): Rotates the file, or None to never rotate it.
+
+        Raises:
+            ValueError: If the flush or fsync policy is unknown.
+        """
+        if flush_policy not in FLUSH_POLICIES:
+            raise ValueError(f"Unknown flush policy '{flush_policy}'. Use one of {FLUSH_POLICIES}")
+        if fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync_policy}'. Use one of {FSYNC_POLICIES}")
+
+        self.path = path
+        self.flush_policy = flush_policy
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.rotator = rotator
+        self.lines_written = 0
+        self.bytes_written = 0
+        self.flushes = 0
+        self.failures = 0
+        self.lines_lost = 0
+        self._queue: queue.Queue = queue.Queue(max_queue_size)
+        self._thread: threading.Thread = None
+        self._fd: int = -1
+        self._size = 0
+        self._pending: list[bytes] = []
+        self._pending_bytes = 0
+        self._last_flush = 0.0
+        self._last_fsync = 0.0
+        self._unsynced = False
+
+
+    def start(self):
+        """Opens the file and starts the writer thread."""
+        if self.rotator is not None:
+            self.rotator.start()
+        self._open()
+        self._last_flush = self._last_fsync = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="pysyslog-writer", daemon=True)
+        self._thread.start()
+
+
+    def write(self, line: str):
+        """
+        Queues a line to be appended to the file.
+
+        Args:
+            line (str): The line, without the trailing newline.
+        """
+        self._queue.put(line)
+
+
+    def close(self):
+        """Writes every queued line, then stops the writer thread and closes the file."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        if self._fd != -1:
+            os.close(self._fd)
+            self._fd = -1
+        if self.rotator is not None:
+            self.rotator.close()
+
+
+    def _open(self):
+        """Opens (or creates) the file for appending."""
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._size = os.fstat(self._fd).st_size
+        if self.rotator is not None:
+            self.rotator.opened()
+
+
+    def _rotate(self):
+        """Closes the file, hands it to the rotator, and opens a new file."""
+        self._fsync()
+        os.close(self._fd)
+        self._fd = -1 # reopened by the next write if rotating fails
+        self.rotator.rotate(self.path)
+        self._open()
+
+
+    def _run(self):
+        """Writes queued lines until close() is called."""
+        while True:
+            try:
+                line = self._queue.get(timeout=self._next_timeout())
+            except queue.Empty:
+                line = None
+
+            while line is not None:
+                if line is _STOP:
+                    self._flush()
+                    self._fsync()
+                    return
+                self._append(line)
+                # also while lines keep arriving, or the deadlines would never be met under load
+                self._flush_due()
+                try:
+                    line = self._queue.get_nowait()
+                except queue.Empty:
+                    line = None
+
+            self._flush_due()
+
+
+    def _flush_due(self):
+        """Writes the pending lines and syncs the file if their intervals have passed."""
+        now: float = time.monotonic()
+        if self._pending and self.flush_policy == FLUSH_INTERVAL and now - self._last_flush >= self.flush_interval:
+            self._flush()
+        if self.fsync_policy == FSYNC_PERIODIC and self._unsynced and now - self._last_fsync >= self.fsync_interval:
+            self._fsync()
+
+
+    def _append(self, line: str):
+        """
+        Adds a line to the pending lines and writes them if needed.
+
+        Args:
+            line (str): The line, without the trailing newline.
+        """
+        data: bytes = f"{line}\n".encode("utf-8")
+        self._pending.append(data)
+        self._pending_bytes += len(data)
+        if self.flush_policy == FLUSH_LINE or self._pending_bytes >= self.flush_bytes:
+            self._flush()
+
+
+    def _flush(self):
+        """Writes the pending lines with a single system call."""
+        if self._pending:
+            start: float = time.perf_counter()
+            data: bytes = b"".join(self._pending)
+            try:
+                if self._fd == -1:
+                    self._open()
+                if self.rotator is not None and self.rotator.due(self._size, len(data)):
+                    self._rotate()
+                view: memoryview = memoryview(data)
+                while view:
+                    view = view[os.write(self._fd, view):]
+            except OSError as e:
+                self._failed(f"write {len(self._pending)} lines to", e)
+                self.lines_lost += len(self._pending)
+                self._pending.clear()
+                self._pending_bytes = 0
+                self._last_flush = time.monotonic()
+                return
+            self.lines_written += len(self._pending)
+            self.bytes_written += len(data)
+            self._size += len(data)
+            self.flushes += 1
+            _FLUSH_DURATION.observe(time.perf_counter() - start)
+            _FLUSH_LINES.observe(len(self._pending))
+            _WRITTEN_BYTES.inc(len(data))
+            self._pending.clear()
+            self._pending_bytes = 0
+            self._unsynced = True
+        self._last_flush = time.monotonic()
+        if self.fsync_policy == FSYNC_BATCH:
+            self._fsync()
+
+
+    def _fsync(self):
+        """Forces written lines to the disk."""
+        if self._unsynced and self.fsync_policy != FSYNC_NONE:
+            start: float = time.perf_counter()
+            try:
+                os.fsync(self._fd)
+                _FSYNC_DURATION.observe(time.perf_counter() - start)
+            except OSError as e:
+                self._failed("sync", e)
+            self._unsynced = False
+        self._last_fsync = time.monotonic()
+
+
+    def _failed(self, action: str, error: OSError):
+        """
+        Counts and logs a failed write or fsync.
+
+        Args:
+            action (str): What failed, e.g. 'sync'.
+            error (OSError): The error raised.
+        """
+        self.failures += 1
+        _FAILURES.inc()
+        logger.error("[FILE] Failed to %s %s: %s", action, self.path, error)
+
+
+    def _next_timeout(self) -> float:
+        """
+        Returns how long the writer thread may wait for new lines.
+
+        Returns:
+            float: The number of seconds until pending lines must be
+                written or synced. None if nothing is due.
+        """
+        deadlines: list[float] = []
+        if self._pending and self.flush_policy == FLUSH_INTERVAL:
+            deadlines.append(self._last_flush + self.flush_interval)
+        if self._unsynced and self.fsync_policy == FSYNC_PERIODIC:
+            deadlines.append(self._last_fsync + self.fsync_interval)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.monotonic())
@@ -0,0 +1,194 @@
+import asyncio
+import socket
+import unittest
+from pysyslog_server.aio import AsyncEngine, AsyncMongoSink, CallbackSink, MessageQueue, SyslogProtocol
+from pysyslog_server.dedup import DuplicateFilter
+from pysyslog_server.parser import Parser
+from pysyslog_server.ratelimit import SourceRateLimiter
+
+
+class FakeCollection:
+
+    def __init__(self):
+        self.batches: list = []
+
+
+    async def insert_many(self, documents, ordered=True):
+        self.batches.append(list(documents))
+
+
+class TestSyslogProtocol(unittest.TestCase):
+
+    def test_drop_oldest(self):
+        queue: MessageQueue = MessageQueue(2, "drop-oldest")
+        protocol: SyslogProtocol = SyslogProtocol(queue)
+        for i in range(4):
+            protocol.datagram_received(f"message {i}".encode(), ("127.0.0.1", 5000))
+
+        self.assertEqual([queue.get_nowait()[0] for _ in range(2)], [b"message 2", b"message 3"])
+        self.assertEqual((queue.received, queue.dropped), (4, 2))
+
+
+    def test_drop_newest(self):
+        queue: MessageQueue = MessageQueue(2, "block")
+        protocol: SyslogProtocol = SyslogProtocol(queue)
+        for i in range(4):
+            protocol.datagram_received(f"message {i}".encode(), ("127.0.0.1", 5000))
+
+        self.assertEqual([queue.get_nowait()[0] for _ in range(2)], [b"message 0", b"message 1"])
+        self.assertEqual(queue.dropped, 2)
+
+
+    def test_rate_limited(self):
+        queue: MessageQueue = MessageQueue(10)
+        protocol: SyslogProtocol = SyslogProtocol(queue, SourceRateLimiter(rate=1, burst=2, summary_interval=60))
+        for i in range(4):
+            protocol.datagram_received(f"message {i}".encode(), ("10.0.0.1", 5000))
+        protocol.datagram_received(b"other", ("10.0.0.2", 5000))
+
+        self.assertEqual([queue.get_nowait()[0] for _ in range(3)], [b"message 0", b"message 1", b"other"])
+        self.assertEqual((queue.received, queue.dropped), (3, 0))
+
+
+class TestAsyncEngine(unittest.TestCase):
+
+    def test_receive_and_drain(self):
+        server: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", 0))
+        port: int = server.getsockname()[1]
+        written: list = []
+        collection: FakeCollection = FakeCollection()
+        engine: AsyncEngine = AsyncEngine(
+            server,
+            lambda data, addr: (data.decode(), Parser(f"<13>Oct 17 23:00:00 {addr} app: {data.decode()}").parse()),
+            [CallbackSink(lambda message, fields: written.append(message)), AsyncMongoSink(collection, batch_size=3)]
+        )
+
+        async def main():
+            serving = asyncio.get_running_loop().create_task(engine.serve())
+            await asyncio.sleep(0.05)
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+                for i in range(5):
+                    client.sendto(f"message {i}".encode(), ("127.0.0.1", port))
+            await asyncio.sleep(0.2)
+            engine.stop()
+            await serving
+
+        asyncio.run(main())
+
+        self.assertEqual(written, [f"message {i}" for i in range(5)])
+        self.assertEqual([len(batch) for batch in collection.batches], [3, 2])
+        self.assertEqual(collection.batches[0][0], {"facility": 1, "severity": 5, "date": "Oct 17", "time": "23:00:00",
+                                                    "hostname": "127.0.0.1", "tag": "app:", "content": " message 0"})
+        self.assertIs(type(collection.batches[0][0]), dict) # not the record
+        self.assertEqual(engine.stats()["received"], 5)
+        self.assertTrue(server.fileno() == -1) # closed with the transport
+
+
+    def test_tcp_flow_control(self):
+        server: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", 0))
+        tcp_server: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        tcp_server.bind(("127.0.0.1", 0))
+        tcp_server.listen()
+        address: tuple = tcp_server.getsockname()
+        written: list = []
+
+        async def slow_write(message, fields):
+            await asyncio.sleep(0.001)
+            written.append(message)
+
+        sink: CallbackSink = CallbackSink(None)
+        sink.write = slow_write
+        engine: AsyncEngine = AsyncEngine(server, lambda data, addr: (data.decode(), None), [sink],
+                                          max_queue_size=4, tcp_server=tcp_server)
+
+        async def main():
+            serving = asyncio.get_running_loop().create_task(engine.serve())
+            await asyncio.sleep(0.05)
+            _, writer = await asyncio.open_connection(*address)
+            writer.write(b"".join(f"<13>message {i}\n".encode() for i in range(50)))
+            await writer.drain()
+            writer.close()
+            await asyncio.sleep(0.01)
+            engine.stop() # the queued and the paused messages are still handled
+            await serving
+
+        asyncio.run(main())
+
+        self.assertEqual(written, [f"<13>message {i}" for i in range(50)])
+        self.assertEqual(engine.stats()["dropped"], 0)
+
+
+    def test_failed_message(self):
+        def process(data, addr):
+            raise ValueError("bad message")
+
+        engine: AsyncEngine = AsyncEngine(None, process, [])
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def main():
+            engine._queue = queue
+            consumer = asyncio.get_running_loop().create_task(engine._consume())
+            queue.put_nowait((b"message", "127.0.0.1"))
+            await queue.join()
+            consumer.cancel()
+
+        asyncio.run(main())
+        self.assertEqual(engine.failed, 1)
+
+
+    def test_dedup(self):
+        server: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", 0))
+        port: int = server.getsockname()[1]
+        written: list = []
+        engine: AsyncEngine = AsyncEngine(server, lambda data, addr: (data.decode(), None),
+                                          [CallbackSink(lambda message, fields: written.append(message))],
+                                          dedup=DuplicateFilter(window=60))
+
+        async def main():
+            serving = asyncio.get_running_loop().create_task(engine.serve())
+            await asyncio.sleep(0.05)
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+                for _ in range(3):
+                    client.sendto(b"<13>Oct 17 11:59:59 host link down", ("127.0.0.1", port))
+            await asyncio.sleep(0.1)
+            engine.stop() # the repeat record is written before the sinks are closed
+            await serving
+
+        asyncio.run(main())
+
+        self.assertEqual(written[0], "<13>Oct 17 11:59:59 host link down")
+        self.assertEqual(len(written), 2)
+        self.assertTrue(written[1].endswith(" host last message repeated 2 times"))
+
+
+    def test_dedup_quiet_client(self):
+        server: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        server.bind(("127.0.0.1", 0))
+        port: int = server.getsockname()[1]
+        written: list = []
+        engine: AsyncEngine = AsyncEngine(server, lambda data, addr: (data.decode(), None),
+                                          [CallbackSink(lambda message, fields: written.append(message))],
+                                          dedup=DuplicateFilter(window=0.05))
+
+        async def main():
+            serving = asyncio.get_running_loop().create_task(engine.serve())
+            await asyncio.sleep(0.05)
+            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+                for _ in range(3):
+                    client.sendto(b"<13>Oct 17 11:59:59 host link down", ("127.0.0.1", port))
+            await asyncio.sleep(0.3)
+            self.assertEqual(len(written), 2) # written while running, although no more messages arrived
+            engine.stop()
+            await serving
+
+        asyncio.run(main())
+
+        self.assertTrue(written[1].endswith(" host last message repeated 2 times"))
+
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            AsyncEngine(None, None, [], overload_policy="sometimes")
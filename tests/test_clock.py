@@ -0,0 +1,39 @@
+import datetime
+import unittest
+from unittest import mock
+from pysyslog_server.clock import SyslogClock, get_timezone
+
+
+class TestSyslogClock(unittest.TestCase):
+
+    def test_format(self):
+        clock: SyslogClock = SyslogClock(datetime.timezone.utc)
+
+        self.assertEqual(clock.format(0), "Jan  1 00:00:00") # leading 0 replaced with space
+        self.assertEqual(clock.format(1700000000), "Nov 14 22:13:20")
+
+
+    def test_timezone(self):
+        clock: SyslogClock = SyslogClock(datetime.timezone(datetime.timedelta(hours=-5)))
+
+        self.assertEqual(clock.format(0), "Dec 31 19:00:00")
+
+
+    def test_cached_per_second(self):
+        clock: SyslogClock = SyslogClock(datetime.timezone.utc)
+
+        with mock.patch("time.time", return_value=1700000000.1):
+            first: str = clock.timestamp()
+        with mock.patch.object(clock, "format") as format_:
+            with mock.patch("time.time", return_value=1700000000.9):
+                self.assertEqual(clock.timestamp(), first)
+            format_.assert_not_called()
+        with mock.patch("time.time", return_value=1700000001.0):
+            self.assertEqual(clock.timestamp(), "Nov 14 22:13:21")
+
+
+    def test_get_timezone(self):
+        self.assertIsNone(get_timezone("local"))
+        self.assertEqual(get_timezone("utc"), datetime.timezone.utc)
+        with self.assertRaises(ValueError):
+            get_timezone("Not/A_Timezone")
@@ -0,0 +1,98 @@
+import datetime
+import os
+import tempfile
+import unittest
+from pysyslog_server import columnar
+from pysyslog_server.columnar import ParquetSink, message_timestamp, normalize_timestamp
+from pysyslog_server.parser import Parser
+
+UTC: datetime.timezone = datetime.timezone.utc
+# 2026-10-17 23:30:00 UTC
+NOW: float = datetime.datetime(2026, 10, 17, 23, 30, tzinfo=UTC).timestamp()
+
+
+class TestNormalizeTimestamp(unittest.TestCase):
+
+    def test_year(self):
+        self.assertEqual(normalize_timestamp("Oct 17", "23:29:00", NOW, UTC), NOW - 60)
+        self.assertEqual(normalize_timestamp("Oct  7", "23:30:00", NOW, UTC), NOW - 10 * 86400)
+        new_year: float = datetime.datetime(2027, 1, 1, 0, 0, 5, tzinfo=UTC).timestamp()
+        self.assertEqual(normalize_timestamp("Dec 31", "23:59:59", new_year, UTC), new_year - 6) # last year
+        self.assertEqual(normalize_timestamp("Jan  1", "00:00:10", new_year, UTC), new_year + 5) # clock skew
+
+
+    def test_timezone(self):
+        new_york: datetime.tzinfo = datetime.timezone(datetime.timedelta(hours=-4))
+        self.assertEqual(normalize_timestamp("Oct 17", "19:30:00", NOW, new_york), NOW)
+
+
+    def test_invalid(self):
+        self.assertIsNone(normalize_timestamp("Feb 29", "00:00:00", NOW, UTC))
+        self.assertIsNone(normalize_timestamp("Foo 17", "00:00:00", NOW, UTC))
+
+
+    def test_rfc5424(self):
+        self.assertEqual(message_timestamp(Parser("<13>1 2026-10-17T23:29:00Z web1 app - - - hello").parse(), 0, UTC),
+                         NOW - 60)
+        self.assertEqual(message_timestamp(Parser("<13>Oct 17 23:29:00 web1 app: hello").parse(), NOW, UTC), NOW - 60)
+
+
+@unittest.skipIf(columnar.pyarrow is None, "pyarrow isn't installed")
+class TestParquetSink(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.directory.name, "export")
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def export(self, messages: list, **kwargs) -> ParquetSink:
+        sink: ParquetSink = ParquetSink(self.path, timezone=UTC, **kwargs)
+        sink.start()
+        for received, syslog_message in messages:
+            parsed: dict = Parser(syslog_message).parse() if syslog_message.startswith("<") else None
+            sink.write(syslog_message, parsed, received)
+        sink.close()
+        return sink
+
+
+    def test_columns(self):
+        import pyarrow.parquet
+        sink: ParquetSink = self.export([
+            (NOW - 60, "<34>Oct 17 23:29:00 core-sw1 su: 'su root' failed"),
+            (NOW - 30, "<13>Oct 17 23:29:30 web1 app: hello"),
+            (NOW, "not parsed"),
+        ], batch_size=2)
+
+        self.assertEqual(sink.exported, 3)
+        self.assertEqual(os.listdir(self.path), ["2026-10-17T23.parquet"])
+        parquet = pyarrow.parquet.ParquetFile(os.path.join(self.path, "2026-10-17T23.parquet"))
+        self.assertEqual(parquet.metadata.num_row_groups, 2)
+        table = parquet.read()
+        self.assertTrue(pyarrow.types.is_dictionary(table.schema.field("hostname").type))
+        rows: list = table.to_pylist()
+        self.assertEqual(rows[0]["timestamp"], datetime.datetime(2026, 10, 17, 23, 29, tzinfo=UTC))
+        self.assertEqual(rows[0]["received"], datetime.datetime(2026, 10, 17, 23, 29, tzinfo=UTC))
+        self.assertEqual((rows[0]["facility"], rows[0]["severity"]), (4, 2))
+        self.assertEqual((rows[1]["hostname"], rows[1]["tag"], rows[1]["content"]), ("web1", "app:", " hello"))
+        self.assertEqual((rows[2]["hostname"], rows[2]["content"]), (None, "not parsed"))
+
+
+    def test_windows(self):
+        self.export([(NOW - 3600, "<13>Oct 17 22:30:00 web1 app: one"), (NOW, "<13>Oct 17 23:30:00 web1 app: two")])
+        self.export([(NOW, "<13>Oct 17 23:30:00 web1 app: three")], window="day") # after a restart
+
+        self.assertEqual(sorted(os.listdir(self.path)), ["2026-10-17.parquet", "2026-10-17T22.parquet",
+                                                         "2026-10-17T23.parquet"])
+        self.export([(NOW, "<13>Oct 17 23:30:00 web1 app: four")])
+        self.assertIn("2026-10-17T23.1.parquet", os.listdir(self.path))
+
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            ParquetSink(self.path, window="week")
+        with self.assertRaises(ValueError):
+            ParquetSink(self.path, compression="lz77")
@@ -0,0 +1,100 @@
+import asyncio
+import functools
+import time
+import unittest
+from unittest import mock
+from pysyslog_server import collector
+from pysyslog_server.aio import AsyncEngine, CallbackSink
+from pysyslog_server.dedup import DuplicateFilter
+
+
+class FixedClock:
+
+    def timestamp(self) -> str:
+        return "Oct 17 12:00:00"
+
+
+class TestDuplicateFilter(unittest.TestCase):
+
+    def test_copies(self):
+        dedup: DuplicateFilter = DuplicateFilter(window=60, clock=FixedClock())
+        self.assertEqual(dedup.check("<13>Oct 17 11:59:58 host su: failed", "10.0.0.1"), (True, []))
+        # only the TIMESTAMP differs
+        self.assertEqual(dedup.check("<13>Oct 17 11:59:59 host su: failed", "10.0.0.1"), (False, []))
+        self.assertEqual(dedup.check("<13>Oct 17 11:59:59 host su: failed", "10.0.0.1"), (False, []))
+        # another PRI, client, or CONTENT
+        self.assertTrue(dedup.check("<14>Oct 17 11:59:59 host su: failed", "10.0.0.1")[0])
+        self.assertTrue(dedup.check("<13>Oct 17 11:59:59 host su: failed", "10.0.0.2")[0])
+        self.assertTrue(dedup.check("<13>Oct 17 11:59:59 host su: failed again", "10.0.0.1")[0])
+
+        self.assertEqual(dedup.suppressed, 2)
+        self.assertEqual(dedup.flush(), [("<13>Oct 17 12:00:00 host last message repeated 2 times", "10.0.0.1")])
+        self.assertTrue(dedup.check("<13>Oct 17 11:59:59 host su: failed", "10.0.0.1")[0])
+
+
+    def test_rfc5424(self):
+        dedup: DuplicateFilter = DuplicateFilter(window=60, clock=FixedClock())
+        self.assertTrue(dedup.check("<13>1 2026-10-17T11:59:58Z host su - - - failed", "10.0.0.1")[0])
+        self.assertFalse(dedup.check("<13>1 2026-10-17T11:59:59.250Z host su - - - failed", "10.0.0.1")[0])
+
+        self.assertEqual(dedup.flush(), [("<13>Oct 17 12:00:00 host last message repeated 1 times", "10.0.0.1")])
+
+
+    def test_expire(self):
+        dedup: DuplicateFilter = DuplicateFilter(window=0.05, clock=FixedClock())
+        dedup.check("<13>Oct 17 11:59:58 host su: failed", "10.0.0.1")
+        dedup.check("<13>Oct 17 11:59:59 host su: failed", "10.0.0.1")
+        self.assertEqual(dedup.expire(), [])
+        time.sleep(0.1) # the client went quiet
+
+        self.assertEqual(dedup.expire(), [("<13>Oct 17 12:00:00 host last message repeated 1 times", "10.0.0.1")])
+        self.assertEqual(dedup.flush(), [])
+
+
+    def test_window(self):
+        dedup: DuplicateFilter = DuplicateFilter(window=0.05, clock=FixedClock())
+        dedup.check("<13>Oct 17 11:59:58 host su: failed", "10.0.0.1")
+        dedup.check("<13>Oct 17 11:59:58 host su: failed", "10.0.0.1")
+        time.sleep(0.1)
+
+        self.assertEqual(dedup.check("<13>Oct 17 11:59:59 host su: failed", "10.0.0.1"),
+                         (True, [("<13>Oct 17 12:00:00 host last message repeated 1 times", "10.0.0.1")]))
+
+
+    def test_eviction(self):
+        dedup: DuplicateFilter = DuplicateFilter(window=60, max_entries=2, clock=FixedClock())
+        dedup.check("<13>Oct 17 11:59:58 host first", "10.0.0.1")
+        dedup.check("<13>Oct 17 11:59:58 host first", "10.0.0.1")
+        dedup.check("<13>Oct 17 11:59:58 host second", "10.0.0.1")
+
+        is_new, repeated = dedup.check("<13>Oct 17 11:59:58 host third", "10.0.0.1")
+        self.assertTrue(is_new)
+        self.assertEqual(repeated, [("<13>Oct 17 12:00:00 host last message repeated 1 times", "10.0.0.1")])
+        self.assertEqual(dedup.flush(), []) # no copies of 'second' or 'third'
+
+
+    def test_repeat_records_not_received(self):
+        stored: list = []
+        received_bytes: int = collector._RECEIVED_BYTES.value
+        corrected: int = collector._CORRECTED.value
+        with mock.patch.object(collector, "_store", lambda *args: stored.append(args)):
+            collector._store_repeated([("<13>Oct 17 12:00:00 host last message repeated 41 times", "10.0.0.1")])
+
+        self.assertEqual(len(stored), 1)
+        self.assertIn("last message repeated 41 times", stored[0][0])
+        # synthesised, so neither received nor corrected
+        self.assertEqual((collector._RECEIVED_BYTES.value, collector._CORRECTED.value), (received_bytes, corrected))
+
+
+    def test_async_repeat_records_not_received(self):
+        written: list = []
+        engine: AsyncEngine = AsyncEngine(None, functools.partial(collector._validate, parse=True),
+                                          [CallbackSink(lambda message, fields: written.append((message, fields)))],
+                                          dedup=DuplicateFilter(clock=FixedClock()), parse=True)
+        received_bytes: int = collector._RECEIVED_BYTES.value
+        corrected: int = collector._CORRECTED.value
+        asyncio.run(engine._write_repeated([("<13>Oct 17 12:00:00 host last message repeated 41 times", "10.0.0.1")]))
+
+        self.assertEqual(written[0][0], "<13>Oct 17 12:00:00 host last message repeated 41 times")
+        self.assertEqual(written[0][1]["hostname"], "host")
+        self.assertEqual((collector._RECEIVED_BYTES.value, collector._CORRECTED.value), (received_bytes, corrected))
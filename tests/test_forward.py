@@ -0,0 +1,187 @@
+import os
+import resource
+import socket
+import tempfile
+import threading
+import time
+import unittest
+from pysyslog_server.forward import Forwarder, _closed_by_peer, parse_targets
+from pysyslog_server.listener import TCPListener
+from pysyslog_server.spool import Spool
+
+
+class Collector:
+    """A downstream collector on the loopback interface."""
+
+    def __init__(self, port: int = 0):
+        self.listener: TCPListener = TCPListener("127.0.0.1", port)
+        self.address: tuple = self.listener.server.getsockname()
+        self.received: list = []
+        self.thread: threading.Thread = threading.Thread(target=self.listener.serve_forever, args=(self.submit, 0.02))
+        self.thread.start()
+
+
+    def submit(self, buffer, length, source_addr):
+        self.received.append(bytes(buffer[:length]).decode())
+        self.listener.buffers.release(buffer)
+
+
+    def wait(self, count: int, timeout: float = 5.0):
+        deadline: float = time.monotonic() + timeout
+        while len(self.received) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+    def stop(self):
+        self.listener.stop()
+        self.thread.join()
+        self.listener.close()
+
+
+def unused_address() -> tuple:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()
+
+
+class TestParseTargets(unittest.TestCase):
+
+    def test_targets(self):
+        self.assertEqual(parse_targets("central1:6514, 10.0.0.2,[fd00::2]:515,[fd00::3]"),
+                         [("central1", 6514), ("10.0.0.2", 514), ("fd00::2", 515), ("fd00::3", 514)])
+        for text in ("", "host:port", "host:0", ":514"):
+            with self.assertRaises(ValueError):
+                parse_targets(text)
+
+
+class TestForwarder(unittest.TestCase):
+
+    def setUp(self):
+        self.collectors: list = []
+
+
+    def tearDown(self):
+        for collector in self.collectors:
+            collector.stop()
+
+
+    def collector(self, port: int = 0) -> Collector:
+        collector: Collector = Collector(port)
+        self.collectors.append(collector)
+        return collector
+
+
+    def test_batches(self):
+        collector: Collector = self.collector()
+        forwarder: Forwarder = Forwarder([collector.address], batch_size=500, batch_interval=0.05)
+        forwarder.start()
+        messages: list = [f"<13>Oct 17 23:00:00 host app: message {i}\nsecond line" for i in range(2000)]
+        for message in messages:
+            forwarder.forward(message)
+        collector.wait(2000)
+        forwarder.close()
+
+        self.assertEqual(collector.received, messages) # in order, framed by octet counting
+        self.assertEqual(collector.listener.connections, 1) # one persistent connection
+        self.assertLessEqual(forwarder.batches, 10)
+        self.assertEqual((forwarder.forwarded, forwarder.failures, forwarder.dropped), (2000, 0, 0))
+
+
+    def test_failover(self):
+        collector: Collector = self.collector()
+        forwarder: Forwarder = Forwarder([unused_address(), collector.address], batch_interval=0.01)
+        forwarder.start()
+        for i in range(10):
+            forwarder.forward(f"message {i}")
+        collector.wait(10)
+        forwarder.close()
+
+        self.assertEqual(collector.received, [f"message {i}" for i in range(10)])
+        self.assertEqual(forwarder.failures, 1) # the first target is skipped while it backs off
+
+
+    def test_balance(self):
+        collectors: list = [self.collector(), self.collector()]
+        forwarder: Forwarder = Forwarder([collector.address for collector in collectors], mode="balance")
+        for i in range(4):
+            self.assertTrue(forwarder.send([f"batch {i}"]))
+        forwarder.close()
+        for collector in collectors:
+            collector.wait(2)
+
+        self.assertEqual([collector.received for collector in collectors], [["batch 0", "batch 2"], ["batch 1", "batch 3"]])
+
+
+    def test_downstream_restart(self):
+        collector: Collector = self.collector()
+        forwarder: Forwarder = Forwarder([collector.address])
+        self.assertTrue(forwarder.send(["before"]))
+        collector.wait(1)
+        collector.stop() # closes the connection
+        self.collectors.remove(collector)
+        restarted: Collector = self.collector(collector.address[1])
+
+        self.assertTrue(forwarder.send(["after"]))
+        restarted.wait(1)
+        forwarder.close()
+        self.assertEqual(restarted.received, ["after"]) # not lost on the stale connection
+
+
+    @unittest.skipIf(resource.getrlimit(resource.RLIMIT_NOFILE)[0] <= 2000, "needs more than 2000 file descriptors")
+    def test_high_file_descriptor(self):
+        collector: Collector = self.collector()
+        with socket.create_connection(collector.address) as connection:
+            fd: int = os.dup2(connection.fileno(), 2000) # e.g. with thousands of TCP clients
+            with socket.socket(fileno=fd) as sock:
+                self.assertFalse(_closed_by_peer(sock))
+                collector.stop()
+                self.collectors.remove(collector)
+                self.assertTrue(_closed_by_peer(sock))
+
+
+    def test_udp(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as server:
+            server.bind(("127.0.0.1", 0))
+            server.settimeout(5)
+            forwarder: Forwarder = Forwarder([server.getsockname()], protocol="udp")
+            self.assertTrue(forwarder.send(["<13>one", "<13>two"]))
+            forwarder.close()
+
+            self.assertEqual([server.recv(1024), server.recv(1024)], [b"<13>one", b"<13>two"])
+
+
+    def test_buffer_limit(self):
+        forwarder: Forwarder = Forwarder([unused_address()], max_buffer=10)
+        for i in range(15):
+            forwarder.forward(f"message {i}")
+
+        self.assertEqual((forwarder.buffered, forwarder.dropped), (10, 5))
+
+
+    def test_spool(self):
+        with tempfile.TemporaryDirectory() as directory:
+            address: tuple = unused_address()
+            forwarder: Forwarder = Forwarder([address], spool=Spool(directory), retry_backoff=0.01)
+            forwarder.start()
+            for i in range(5):
+                forwarder.forward(f"message {i}")
+            time.sleep(0.1)
+            forwarder.close() # the target is down, so the messages stay in the spool
+            self.assertGreater(forwarder.failures, 0)
+
+            collector: Collector = self.collector(address[1])
+            forwarder = Forwarder([address], spool=Spool(directory))
+            forwarder.start()
+            collector.wait(5)
+            forwarder.close()
+
+            self.assertEqual(collector.received, [f"message {i}" for i in range(5)])
+
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Forwarder([])
+        with self.assertRaises(ValueError):
+            Forwarder([("127.0.0.1", 514)], protocol="relp")
+        with self.assertRaises(ValueError):
+            Forwarder([("127.0.0.1", 514)], mode="random")
@@ -0,0 +1,109 @@
+import datetime
+import os
+import tempfile
+import unittest
+from pysyslog_server import importer
+from pysyslog_server.importer import ImportState, chunks, create_pool, import_file, parse_chunk
+
+
+class TestImporter(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = create_pool(2, "UTC")
+
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.terminate()
+
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.directory.name, "syslog.log")
+        self.lines: list = [f"<13>Oct 17 23:{i // 60 % 60:02d}:{i % 60:02d} host{i % 3} app: message {i}"
+                            for i in range(1000)]
+        with open(self.path, "w") as file:
+            file.write("\n".join(self.lines[:500]) + "\n\nnot a syslog message\n" + "\n".join(self.lines[500:]))
+        modified: float = datetime.datetime(2026, 10, 18, tzinfo=datetime.timezone.utc).timestamp()
+        os.utime(self.path, (modified, modified))
+        self.state: ImportState = ImportState(os.path.join(self.directory.name, "state", "import.json"))
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def test_chunks(self):
+        size: int = os.path.getsize(self.path)
+        with open(self.path, "rb") as file:
+            data: bytes = file.read()
+        ranges: list = list(chunks(self.path, 1000))
+        self.assertGreater(len(ranges), 10)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], size)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[end - 1:end], b"\n") # whole lines
+        self.assertEqual(list(chunks(self.path, 1000, size)), [])
+
+
+    def test_parse_chunk(self):
+        end, results = parse_chunk(self.path, 0, os.path.getsize(self.path), os.path.getmtime(self.path))
+        self.assertEqual(end, os.path.getsize(self.path))
+        self.assertEqual(len(results), 1001) # the empty line is skipped
+        syslog_message, fields, received = results[1]
+        self.assertEqual(syslog_message, self.lines[1])
+        self.assertEqual((fields["hostname"], fields["content"]), ("host1", " message 1"))
+        self.assertEqual(received, datetime.datetime(2026, 10, 17, 23, 0, 1, tzinfo=datetime.timezone.utc).timestamp())
+        self.assertTrue(results[500][0].endswith(" not a syslog message")) # corrected
+
+
+    def test_non_ascii(self):
+        with open(self.path, "ab") as file:
+            file.write("\n<13>Oct 17 23:59:59 host app: caf\u00e9\n".encode("latin-1"))
+        _, results = parse_chunk(self.path, 0, os.path.getsize(self.path), os.path.getmtime(self.path))
+
+        self.assertEqual(results[-1][0], "<13>Oct 17 23:59:59 host app: caf\\xe9") # escaped like received messages
+        self.assertEqual(results[1][0], self.lines[1])
+
+
+    def test_import(self):
+        imported: list = []
+        progress: list = []
+        count: int = import_file(self.path, imported.extend, self.state, self.pool, chunk_size=4096, max_pending=3,
+                                 progress=lambda *values: progress.append(values))
+
+        self.assertEqual(count, 1001)
+        self.assertEqual([syslog_message for syslog_message, _, _ in imported[:500]], self.lines[:500]) # in order
+        self.assertEqual([syslog_message for syslog_message, _, _ in imported[501:]], self.lines[500:])
+        self.assertEqual(progress[-1][1:], (os.path.getsize(self.path), os.path.getsize(self.path), 1001))
+        self.assertEqual(ImportState(self.state.path).offsets, {os.path.abspath(self.path): os.path.getsize(self.path)})
+
+
+    def test_resume(self):
+        calls: list = []
+
+        def interrupt(results: list):
+            calls.append(results)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            import_file(self.path, interrupt, self.state, self.pool, chunk_size=4096)
+        resumed: list = []
+        count: int = import_file(self.path, resumed.extend, ImportState(self.state.path), self.pool, chunk_size=4096)
+
+        self.assertEqual(len(calls[0]) + count, 1001) # the interrupted chunk is imported again
+        self.assertEqual(resumed[0], calls[1][0])
+        self.assertEqual(import_file(self.path, resumed.extend, ImportState(self.state.path), self.pool), 0)
+
+
+    def test_compressed(self):
+        with self.assertRaises(ValueError):
+            import_file(self.path + ".gz", print, self.state, self.pool)
+
+
+    def test_format_progress(self):
+        self.assertRegex(importer.format_progress("syslog.log", 2**20, 4 * 2**20, 10000, 0),
+                         r"^syslog.log: 1.0/4.0 MiB \(25%\), 10,000 messages, [\d,]+ msgs/sec$")
@@ -0,0 +1,118 @@
+import socket
+import threading
+import time
+import unittest
+from pysyslog_server.listener import BatchedUDPListener, BufferPool, StreamFramer, TCPListener
+
+
+class TestBufferPool(unittest.TestCase):
+
+    def test_reuse(self):
+        pool: BufferPool = BufferPool(2, 16)
+        first: bytearray = pool.acquire()
+        pool.release(first)
+
+        self.assertIs(pool.acquire(), first)
+        self.assertEqual(pool.allocated, 0)
+
+
+    def test_exhausted(self):
+        pool: BufferPool = BufferPool(1, 16)
+        pool.acquire()
+        extra: bytearray = pool.acquire()
+
+        self.assertEqual(len(extra), 16)
+        self.assertEqual(pool.allocated, 1)
+
+
+class TestBatchedUDPListener(unittest.TestCase):
+
+    def test_drain(self):
+        listener: BatchedUDPListener = BatchedUDPListener("127.0.0.1", 0, batch_size=3, max_message_length=64)
+        address: tuple = listener.server.getsockname()
+        client: socket.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for i in range(5):
+            client.sendto(f"<13>message {i}".encode("ascii"), address)
+        client.close()
+        time.sleep(0.1)
+
+        received: list = []
+        def submit(buffer, nbytes, source_addr):
+            received.append((bytes(buffer[:nbytes]), source_addr))
+            listener.buffers.release(buffer)
+
+        self.assertEqual(listener.drain(submit), 3) # limited by batch size
+        self.assertEqual(listener.drain(submit), 2)
+        self.assertEqual(listener.drain(submit), 0)
+        listener.close()
+
+        self.assertEqual(received[0], (b"<13>message 0", "127.0.0.1"))
+        self.assertEqual(received[4], (b"<13>message 4", "127.0.0.1"))
+
+
+class TestStreamFramer(unittest.TestCase):
+
+    def feed(self, framer: StreamFramer, data: bytes) -> list:
+        buffer = framer.get_buffer()
+        buffer[:len(data)] = data
+        framer.advance(len(data))
+        return [bytes(frame) for frame in framer.frames()]
+
+
+    def test_non_transparent(self):
+        framer: StreamFramer = StreamFramer()
+        self.assertEqual(self.feed(framer, b"<13>first\n<13>sec"), [b"<13>first"])
+        self.assertEqual(self.feed(framer, b"ond\r\n\n<13>third\n"), [b"<13>second\r", b"<13>third"])
+
+
+    def test_octet_counting(self):
+        framer: StreamFramer = StreamFramer()
+        self.assertEqual(self.feed(framer, b"9 <13>first1"), [b"<13>first"])
+        self.assertEqual(self.feed(framer, b"3 <13>line\nfeed"), [b"<13>line\nfeed"])
+
+
+    def test_truncated(self):
+        framer: StreamFramer = StreamFramer(max_message_length=8, buffer_size=64)
+        self.assertEqual(self.feed(framer, b"<13>too long\n<13>ok\n"), [b"<13>too ", b"<13>ok"])
+        self.assertEqual(self.feed(framer, b"12 <13>too long<13>ok\n"), [b"<13>too ", b"<13>ok"])
+        self.assertEqual(framer.truncated, 2)
+
+
+    def test_compaction(self):
+        framer: StreamFramer = StreamFramer(max_message_length=8, buffer_size=32)
+        messages: list = []
+        for i in range(100):
+            messages += self.feed(framer, f"<13>{i:02}\n<1".encode())
+            messages += self.feed(framer, b"3>x\n")
+
+        self.assertEqual(len(messages), 200)
+        self.assertEqual(messages[-2:], [b"<13>99", b"<13>x"])
+
+
+class TestTCPListener(unittest.TestCase):
+
+    def test_connections(self):
+        listener: TCPListener = TCPListener("127.0.0.1", 0, max_message_length=64)
+        address: tuple = listener.server.getsockname()
+        received: list = []
+        def submit(buffer, length, source_addr):
+            received.append((bytes(buffer[:length]), source_addr))
+            listener.buffers.release(buffer)
+
+        thread: threading.Thread = threading.Thread(target=listener.serve_forever, args=(submit, 0.05))
+        thread.start()
+        clients: list = [socket.create_connection(address) for _ in range(3)]
+        for i, client in enumerate(clients):
+            client.sendall(f"<13>message {i}\n".encode("ascii"))
+        clients[0].sendall(b"11 <13>counted")
+        for client in clients:
+            client.close()
+        time.sleep(0.2)
+        listener.stop()
+        thread.join()
+        listener.close()
+
+        self.assertEqual(sorted(message for message, _ in received),
+                         [b"<13>counted", b"<13>message 0", b"<13>message 1", b"<13>message 2"])
+        self.assertEqual(received[0][1], "127.0.0.1")
+        self.assertEqual(listener.connections, 0)
@@ -0,0 +1,69 @@
+import io
+import logging
+import queue
+import time
+import unittest
+from pysyslog_server.log import ConsoleLogging, NonBlockingQueueHandler, RateLimitFilter, get_level, logger
+
+
+class TestRateLimitFilter(unittest.TestCase):
+
+    def record(self, source: str = None) -> logging.LogRecord:
+        return logging.makeLogRecord({"msg": "message", "source": source} if source else {"msg": "message"})
+
+
+    def test_limit_per_source(self):
+        rate_limit: RateLimitFilter = RateLimitFilter(limit=2, interval=60)
+        allowed: list = [rate_limit.filter(self.record("10.0.0.1")) for _ in range(4)]
+
+        self.assertEqual(allowed, [True, True, False, False])
+        self.assertTrue(rate_limit.filter(self.record("10.0.0.2")))
+        self.assertTrue(rate_limit.filter(self.record())) # not about a message
+        self.assertEqual(rate_limit.suppressed, 2)
+
+
+    def test_summary(self):
+        stream: io.StringIO = io.StringIO()
+        console: ConsoleLogging = ConsoleLogging(logging.DEBUG, rate_limit=1, rate_interval=0.05, stream=stream)
+        console.start()
+        for _ in range(3):
+            logger.debug("[RECEIVED] %s", "10.0.0.1", extra={"source": "10.0.0.1"})
+        time.sleep(0.1)
+        logger.debug("[RECEIVED] %s", "10.0.0.1", extra={"source": "10.0.0.1"})
+        console.stop()
+
+        lines: list = stream.getvalue().splitlines()
+        self.assertEqual(lines[0], "[RECEIVED] 10.0.0.1")
+        self.assertTrue(lines[1].startswith("[SUPPRESSED] 10.0.0.1: 2 of 3 messages not logged"))
+        self.assertEqual(lines[2], "[RECEIVED] 10.0.0.1")
+
+
+class TestNonBlockingQueueHandler(unittest.TestCase):
+
+    def test_full_queue(self):
+        log_queue: queue.Queue = queue.Queue(2)
+        handler: NonBlockingQueueHandler = NonBlockingQueueHandler(log_queue)
+        for i in range(4):
+            handler.handle(logging.makeLogRecord({"msg": f"message {i}"}))
+        self.assertEqual(handler.dropped, 2)
+
+        log_queue.get_nowait()
+        log_queue.get_nowait()
+        handler.handle(logging.makeLogRecord({"msg": "message 4"}))
+        self.assertIn("Dropped 2 log messages", log_queue.get_nowait().getMessage())
+        self.assertEqual(log_queue.get_nowait().getMessage(), "message 4")
+
+
+class TestConsoleLogging(unittest.TestCase):
+
+    def test_level(self):
+        stream: io.StringIO = io.StringIO()
+        console: ConsoleLogging = ConsoleLogging(get_level("info"), stream=stream)
+        console.start()
+        logger.debug("hidden")
+        logger.info("[WORKER %d] Listening", 0)
+        console.stop()
+
+        self.assertEqual(stream.getvalue(), "[WORKER 0] Listening\n")
+        with self.assertRaises(ValueError):
+            get_level("verbose")
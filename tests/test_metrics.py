@@ -0,0 +1,65 @@
+import unittest
+import urllib.error
+import urllib.request
+from pysyslog_server.metrics import Counter, Gauge, Histogram, MetricsServer, Registry
+
+
+class TestRegistry(unittest.TestCase):
+
+    def test_render(self):
+        registry: Registry = Registry()
+        received: Counter = registry.register(Counter("syslog_received_total", "Messages received."))
+        received.inc()
+        received.inc(2)
+        depth: Gauge = registry.register(Gauge("syslog_queue_depth", "Queued messages."))
+        depth.set_function(lambda: 7)
+
+        self.assertEqual(registry.render(),
+                         "# HELP syslog_queue_depth Queued messages.\n"
+                         "# TYPE syslog_queue_depth gauge\n"
+                         "syslog_queue_depth 7\n"
+                         "# HELP syslog_received_total Messages received.\n"
+                         "# TYPE syslog_received_total counter\n"
+                         "syslog_received_total 3\n")
+
+
+    def test_histogram(self):
+        registry: Registry = Registry()
+        parse: Histogram = registry.register(Histogram("duration_seconds", "Duration.", {"stage": "parse"}, (0.001, 0.01)))
+        registry.register(Histogram("duration_seconds", "Duration.", {"stage": "validate"}, (0.001, 0.01)))
+        for value in (0.0005, 0.001, 0.005, 0.5):
+            parse.observe(value)
+
+        lines: list = registry.render().splitlines()
+        self.assertEqual(lines.count("# TYPE duration_seconds histogram"), 1)
+        self.assertIn('duration_seconds_bucket{stage="parse",le="0.001"} 2', lines)
+        self.assertIn('duration_seconds_bucket{stage="parse",le="0.01"} 3', lines)
+        self.assertIn('duration_seconds_bucket{stage="parse",le="+Inf"} 4', lines)
+        self.assertIn('duration_seconds_sum{stage="parse"} 0.5065', lines)
+        self.assertIn('duration_seconds_count{stage="validate"} 0', lines)
+
+
+    def test_register_twice(self):
+        registry: Registry = Registry()
+        first: Counter = registry.register(Counter("total", "Total.", {"stage": "a"}))
+
+        self.assertIs(registry.register(Counter("total", "Total.", {"stage": "a"})), first)
+        with self.assertRaises(ValueError):
+            registry.register(Gauge("total", "Total."))
+
+
+class TestMetricsServer(unittest.TestCase):
+
+    def test_scrape(self):
+        registry: Registry = Registry()
+        registry.register(Counter("syslog_received_total", "Messages received.")).inc()
+        server: MetricsServer = MetricsServer("127.0.0.1", 0, registry)
+        server.start()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+                self.assertIn(b"syslog_received_total 1\n", response.read())
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+            with self.assertRaises(urllib.error.HTTPError):
+                urllib.request.urlopen(f"http://127.0.0.1:{server.port}/")
+        finally:
+            server.close()
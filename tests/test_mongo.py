@@ -0,0 +1,110 @@
+import threading
+import time
+import unittest
+from pymongo.errors import AutoReconnect, BulkWriteError
+from pysyslog_server.mongo import MongoSink
+
+
+class FakeCollection:
+    # stand-in for a pymongo collection
+
+    def __init__(self, failures: int = 0):
+        self.documents: list = []
+        self.calls: list = []
+        self.failures = failures
+        self.lock = threading.Lock()
+
+
+    def insert_many(self, documents: list, ordered: bool = True):
+        with self.lock:
+            self.calls.append((len(documents), ordered))
+            if self.failures > 0:
+                self.failures -= 1
+                raise AutoReconnect("connection refused")
+            self.documents.extend(documents)
+
+
+def document(i: int) -> dict:
+    return {"facility": 1, "severity": 5, "hostname": "localhost", "tag": "app:", "content": f" message {i}"}
+
+
+class TestMongoSink(unittest.TestCase):
+
+    def test_batch_size(self):
+        collection: FakeCollection = FakeCollection()
+        sink: MongoSink = MongoSink(collection, batch_size=10, batch_interval=60)
+        sink.start()
+        for i in range(25):
+            sink.save(document(i))
+        sink.close()
+
+        self.assertEqual([count for count, _ in collection.calls], [10, 10, 5])
+        self.assertTrue(all(not ordered for _, ordered in collection.calls))
+        self.assertEqual([doc["content"] for doc in collection.documents], [f" message {i}" for i in range(25)])
+
+
+    def test_batch_interval(self):
+        collection: FakeCollection = FakeCollection()
+        sink: MongoSink = MongoSink(collection, batch_size=1000, batch_interval=0.05)
+        sink.start()
+        sink.save(document(0))
+        time.sleep(0.3)
+
+        self.assertEqual(len(collection.documents), 1) # inserted before close()
+        sink.close()
+
+
+    def test_retry(self):
+        collection: FakeCollection = FakeCollection(failures=2)
+        sink: MongoSink = MongoSink(collection, batch_size=5, batch_interval=0.01, retry_backoff=0.01)
+        sink.start()
+        for i in range(5):
+            sink.save(document(i))
+        time.sleep(0.3)
+        sink.close()
+
+        self.assertEqual(len(collection.documents), 5)
+        self.assertEqual(sink.retries, 2)
+        self.assertEqual(sink.dropped, 0)
+
+
+    def test_bounded_buffer(self):
+        collection: FakeCollection = FakeCollection()
+        sink: MongoSink = MongoSink(collection, batch_size=100, max_buffer=3) # not started, like an outage
+        for i in range(5):
+            sink.save(document(i))
+
+        self.assertEqual(sink.buffered, 3)
+        self.assertEqual(sink.dropped, 2)
+
+        sink.start()
+        sink.close()
+        self.assertEqual([doc["content"] for doc in collection.documents], [" message 2", " message 3", " message 4"])
+
+
+    def test_duplicates_after_partial_insert(self):
+        class PartialCollection(FakeCollection):
+            def insert_many(self, documents, ordered=True):
+                raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "duplicate key"}]})
+
+        sink: MongoSink = MongoSink(PartialCollection(), batch_size=2)
+        sink.start()
+        sink.save(document(0))
+        sink.save(document(1))
+        sink.close()
+
+        self.assertEqual(sink.inserted, 2)
+        self.assertEqual(sink.dropped, 0)
+
+
+    def test_close_while_unreachable(self):
+        collection: FakeCollection = FakeCollection(failures=1000)
+        sink: MongoSink = MongoSink(collection, batch_size=10, retry_backoff=60) # not started, like an outage
+        for i in range(50):
+            sink.save(document(i))
+        sink.start()
+        sink.close()
+
+        # the batch being retried is attempted once more, then the rest are dropped instead of tried one by one
+        self.assertLessEqual(len(collection.calls), 2)
+        self.assertEqual(sink.dropped, 50)
@@ -103,4 +103,51 @@ class TestCollector(unittest.TestCase):
             "content": "00>Jan 11 01:02:00 localhost hello:world"
         }
 
-        self.assertEqual(parser.parse(), expected_output) 
\ No newline at end of file
+        self.assertEqual(parser.parse(), expected_output) 
+
+    def test_long_tag(self):
+        parser = Parser(f"<{13}>Jan 11 01:02:03 localhost {'a' * 40}: world")
+        expected_output = {
+            "facility": 13//8,
+            "severity": 13%8,
+            "date": "Jan 11",
+            "time": "01:02:03",
+            "hostname": "localhost",
+            "tag": "a" * 33, # tag cannot exceed 32 characters plus the terminating character
+            "content": f"{'a' * 7}: world"
+        }
+
+        self.assertEqual(parser.parse(), expected_output)
+
+
+    def test_missing_tag(self):
+        parser = Parser(f"<{13}>Jan 11 01:02:03 localhost")
+
+        with self.assertRaises(ValueError):
+            parser.parse()
+
+
+    def test_rfc5424(self):
+        parser = Parser('<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 '
+                        '[exampleSDID@32473 iut="3" eventSource="App\\]lication"] An application event')
+        expected_output = {
+            "facility": 20,
+            "severity": 5,
+            "version": "1",
+            "timestamp": "2003-10-11T22:14:15.003Z",
+            "hostname": "mymachine.example.com",
+            "app_name": "evntslog",
+            "procid": None,
+            "msgid": "ID47",
+            "structured_data": '[exampleSDID@32473 iut="3" eventSource="App\\]lication"]',
+            "content": "An application event"
+        }
+
+        self.assertEqual(parser.parse(), expected_output)
+
+
+    def test_rfc5424_without_msg(self):
+        parsed = Parser("<34>1 - host su 42 - -").parse()
+
+        self.assertEqual((parsed["timestamp"], parsed["procid"], parsed["content"]), ("-", "42", ""))
+        self.assertEqual(parsed["tag"], "su") # the APP-NAME
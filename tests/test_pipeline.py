@@ -0,0 +1,90 @@
+import threading
+import unittest
+from pysyslog_server.pipeline import WorkerPool
+
+
+class TestWorkerPool(unittest.TestCase):
+
+    def test_messages_handled(self):
+        handled: list = []
+        pool: WorkerPool = WorkerPool(lambda message, addr: handled.append((message, addr)), workers=2)
+        pool.start()
+
+        for i in range(100):
+            pool.submit(f"message {i}", "127.0.0.1")
+        pool.stop()
+
+        self.assertEqual(len(handled), 100)
+        self.assertEqual(pool.stats()["received"], 100)
+        self.assertEqual(pool.stats()["dropped"], 0)
+
+
+    def test_drop_newest(self):
+        release: threading.Event = threading.Event()
+        handled: list = []
+
+        def handler(message):
+            release.wait()
+            handled.append(message)
+
+        dropped: list = []
+        pool: WorkerPool = WorkerPool(handler, workers=1, max_queue_size=2, overload_policy="drop-newest", on_drop=dropped.append)
+        pool.start()
+        pool.submit("first") # taken by the worker
+        while pool.queue_depth != 0:
+            pass
+        results: list = [pool.submit(message) for message in ("second", "third", "fourth")]
+        release.set()
+        pool.stop()
+
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(handled, ["first", "second", "third"])
+        self.assertEqual(pool.dropped, 1)
+        self.assertEqual(dropped, ["fourth"]) # e.g. to release its buffer
+
+
+    def test_drop_oldest(self):
+        release: threading.Event = threading.Event()
+        handled: list = []
+
+        def handler(message):
+            release.wait()
+            handled.append(message)
+
+        dropped: list = []
+        pool: WorkerPool = WorkerPool(handler, workers=1, max_queue_size=2, overload_policy="drop-oldest", on_drop=dropped.append)
+        pool.start()
+        pool.submit("first")
+        while pool.queue_depth != 0:
+            pass
+        results: list = [pool.submit(message) for message in ("second", "third", "fourth")]
+        release.set()
+        pool.stop()
+
+        self.assertEqual(results, [True, True, True])
+        self.assertEqual(handled, ["first", "third", "fourth"])
+        self.assertEqual(pool.dropped, 1)
+        self.assertEqual(dropped, ["second"])
+
+
+    def test_handler_errors_do_not_kill_workers(self):
+        handled: list = []
+
+        def handler(message):
+            if message == "bad":
+                raise ValueError("bad message")
+            handled.append(message)
+
+        pool: WorkerPool = WorkerPool(handler, workers=1)
+        pool.start()
+        pool.submit("bad")
+        pool.submit("good")
+        pool.stop()
+
+        self.assertEqual(handled, ["good"])
+        self.assertEqual(pool.failed, 1)
+
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            WorkerPool(print, overload_policy="drop-everything")
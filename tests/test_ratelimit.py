@@ -0,0 +1,54 @@
+import time
+import unittest
+from pysyslog_server.log import logger
+from pysyslog_server.ratelimit import SourceRateLimiter
+
+
+class TestSourceRateLimiter(unittest.TestCase):
+
+    def test_burst_per_source(self):
+        limiter: SourceRateLimiter = SourceRateLimiter(rate=1, burst=3, summary_interval=60)
+        allowed: list = [limiter.allow("10.0.0.1") for _ in range(5)]
+
+        self.assertEqual(allowed, [True, True, True, False, False])
+        self.assertTrue(limiter.allow("10.0.0.2")) # not starved by 10.0.0.1
+        self.assertEqual(limiter.suppressed, 2)
+
+
+    def test_refill(self):
+        limiter: SourceRateLimiter = SourceRateLimiter(rate=100, burst=1, summary_interval=60)
+        self.assertTrue(limiter.allow("10.0.0.1"))
+        self.assertFalse(limiter.allow("10.0.0.1"))
+        time.sleep(0.02)
+        self.assertTrue(limiter.allow("10.0.0.1"))
+
+
+    def test_bounded_sources(self):
+        limiter: SourceRateLimiter = SourceRateLimiter(rate=1, max_sources=2, summary_interval=60)
+        limiter.allow("10.0.0.1")
+        limiter.allow("10.0.0.2")
+        limiter.allow("10.0.0.1") # 10.0.0.2 is now the least recently seen
+        limiter.allow("10.0.0.3")
+
+        self.assertEqual(limiter.sources, 2)
+        self.assertTrue(limiter.allow("10.0.0.2")) # forgotten, so it has a full bucket again
+        self.assertFalse(limiter.allow("10.0.0.3"))
+
+
+    def test_summary(self):
+        limiter: SourceRateLimiter = SourceRateLimiter(rate=1, summary_interval=60)
+        for _ in range(4):
+            limiter.allow("10.0.0.1")
+        limiter.allow("10.0.0.2")
+        limiter.allow("10.0.0.2")
+
+        with self.assertLogs(logger, "WARNING") as logs:
+            limiter.flush()
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn("Suppressed 3 messages from 10.0.0.1", logs.output[0])
+        self.assertIn("Suppressed 1 messages from 10.0.0.2", logs.output[1])
+
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            SourceRateLimiter(rate=0)
@@ -0,0 +1,47 @@
+import datetime
+import pickle
+import unittest
+from pysyslog_server.parser import Parser
+from pysyslog_server.record import RFC3164, RFC5424, SyslogRecord, rfc5424_seconds
+
+
+class TestSyslogRecord(unittest.TestCase):
+
+    def test_fields(self):
+        record: SyslogRecord = Parser("<34>Oct 11 22:14:15 mymachine su: 'su root' failed").parse()
+
+        self.assertEqual(record.format, RFC3164)
+        self.assertEqual((record.facility, record.severity), (4, 2))
+        self.assertEqual((record["hostname"], record["tag"], record["content"]), ("mymachine", "su:", " 'su root' failed"))
+        self.assertEqual(record.get("app_name", "none"), "none")
+        with self.assertRaises(KeyError):
+            record["app_name"]
+        self.assertFalse(hasattr(record, "__dict__"))
+
+
+    def test_to_dict(self):
+        record: SyslogRecord = Parser("<14>1 2026-10-17T23:30:00Z - app - - - hello").parse()
+        document: dict = record.to_dict()
+
+        self.assertEqual(record.format, RFC5424)
+        self.assertEqual(list(document), list(record.keys()))
+        self.assertEqual((document["hostname"], document["procid"], document["content"]), (None, None, "hello"))
+        self.assertEqual(record["hostname"], "-")
+        self.assertIsNot(record.to_dict(), document) # every collection gets its own
+        self.assertEqual(record, document)
+
+
+    def test_pickle(self):
+        # records are returned by the processes of the importer
+        record: SyslogRecord = Parser("<14>Oct 17 23:30:00 host app: hello").parse()
+
+        self.assertEqual(pickle.loads(pickle.dumps(record)), record)
+
+
+    def test_rfc5424_seconds(self):
+        moment: float = datetime.datetime(2003, 10, 11, 22, 14, 15, 3000, tzinfo=datetime.timezone.utc).timestamp()
+
+        self.assertEqual(rfc5424_seconds("2003-10-11T22:14:15.003Z"), moment)
+        self.assertEqual(rfc5424_seconds("2003-10-11T15:14:15.003-07:00"), moment)
+        self.assertIsNone(rfc5424_seconds("2003-13-11T22:14:15Z"))
+        self.assertIsNone(rfc5424_seconds("-"))
@@ -0,0 +1,78 @@
+import gzip
+import os
+import tempfile
+import unittest
+from pysyslog_server.rotation import Rotator
+from pysyslog_server.writer import FileWriter
+
+
+class TestRotator(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.directory.name, "syslog.log")
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def rotated_files(self) -> list:
+        return sorted(entry for entry in os.listdir(self.directory.name) if entry != "syslog.log")
+
+
+    def test_due(self):
+        rotator: Rotator = Rotator(max_bytes=100)
+        rotator.opened()
+
+        self.assertFalse(rotator.due(0, 1000)) # never rotate an empty file
+        self.assertFalse(rotator.due(50, 50))
+        self.assertTrue(rotator.due(50, 51))
+
+
+    def test_due_interval(self):
+        rotator: Rotator = Rotator(interval="hour")
+        rotator.opened()
+        self.assertFalse(rotator.due(10, 10))
+
+        rotator._period = "1970010100" # opened during an earlier hour
+        self.assertTrue(rotator.due(10, 10))
+
+
+    def test_rotate_by_size_and_compress(self):
+        rotator: Rotator = Rotator(max_bytes=64, backups=100, compression="gzip")
+        writer: FileWriter = FileWriter(self.path, flush_policy="line", rotator=rotator)
+        writer.start()
+        for i in range(10):
+            writer.write(f"<13>Jan 10 01:02:03 localhost app: message {i}") # 44 bytes with newline
+        writer.close()
+
+        rotated: list = self.rotated_files()
+        self.assertEqual(len(rotated), 9)
+        self.assertTrue(all(entry.endswith(".gz") for entry in rotated))
+
+        with gzip.open(os.path.join(self.directory.name, rotated[0]), "rt") as f:
+            self.assertEqual(f.read(), "<13>Jan 10 01:02:03 localhost app: message 0\n")
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "<13>Jan 10 01:02:03 localhost app: message 9\n")
+
+
+    def test_retained_generations(self):
+        rotator: Rotator = Rotator(max_bytes=1, backups=3, compression="none")
+        writer: FileWriter = FileWriter(self.path, flush_policy="line", rotator=rotator)
+        writer.start()
+        for i in range(10):
+            writer.write(f"message {i}")
+        writer.close()
+
+        rotated: list = self.rotated_files()
+        self.assertEqual(len(rotated), 3)
+        with open(os.path.join(self.directory.name, rotated[-1])) as f:
+            self.assertEqual(f.read(), "message 8\n") # newest generations are kept
+
+
+    def test_unknown_settings(self):
+        with self.assertRaises(ValueError):
+            Rotator(interval="week")
+        with self.assertRaises(ValueError):
+            Rotator(compression="bzip2")
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import unittest
+from pysyslog_server.parser import Parser
+from pysyslog_server.rules import Rule, RuleSet, load, parse_selector
+
+
+def pris(selector: str) -> list:
+    bitmap: int = parse_selector(selector)
+    return [pri for pri in range(192) if bitmap >> pri & 1]
+
+
+class TestSelector(unittest.TestCase):
+
+    def test_severity(self):
+        self.assertEqual(pris("mail.err"), [16, 17, 18, 19]) # err and more severe
+        self.assertEqual(pris("mail.=err"), [19])
+        self.assertEqual(pris("kern,2.=debug"), [7, 23])
+        self.assertEqual(len(pris("*.*")), 192)
+
+
+    def test_exclusion(self):
+        self.assertEqual(pris("mail.*;mail.!=info"), [16, 17, 18, 19, 20, 21, 23])
+        self.assertEqual(pris("mail.!info"), [23]) # nothing matched before, so all severities but info and above
+        self.assertNotIn(16, pris("*.info;mail.none"))
+        self.assertIn(8, pris("*.info;mail.none"))
+
+
+    def test_malformed(self):
+        for selector in ("mail", "mail.", "nope.info", "mail.loud"):
+            with self.assertRaises(ValueError):
+                parse_selector(selector)
+
+
+class TestRuleSet(unittest.TestCase):
+
+    def route(self, rule_set: RuleSet, message: str):
+        route = rule_set.route(Parser(message).parse())
+        return None if route is None else (route.files, route.collections)
+
+
+    def test_first_match(self):
+        rule_set: RuleSet = RuleSet([
+            Rule({"selector": "*.debug;*.!info", "drop": True}),
+            Rule({"selector": "auth.*", "tag": "^sshd", "file": "auth.log"}),
+            Rule({"hostname": "^fw", "file": "firewall.log", "collection": "firewall"}),
+        ])
+
+        self.assertEqual(self.route(rule_set, "<15>Oct 17 12:00:00 host su: debug"), ([], [])) # dropped
+        self.assertEqual(self.route(rule_set, "<38>Oct 17 12:00:00 fw1 sshd[1]: login"), (["auth.log"], []))
+        self.assertEqual(self.route(rule_set, "<38>Oct 17 12:00:00 fw1 su: login"), (["firewall.log"], ["firewall"]))
+        self.assertIsNone(self.route(rule_set, "<38>Oct 17 12:00:00 host su: login"))
+        self.assertEqual(rule_set.files, {"auth.log", "firewall.log"})
+
+
+    def test_continue(self):
+        rule_set: RuleSet = RuleSet([
+            Rule({"selector": "*.err", "content": "panic|segfault", "file": "crashes.log", "continue": True}),
+            Rule({"content": "segfault", "file": "segfaults.log", "continue": True}),
+            Rule({"selector": "kern.*", "file": "kern.log"}),
+        ])
+
+        self.assertEqual(self.route(rule_set, "<3>Oct 17 12:00:00 host kernel: segfault at 0"),
+                         (["crashes.log", "segfaults.log", "kern.log"], []))
+        self.assertEqual(self.route(rule_set, "<3>Oct 17 12:00:00 host kernel: panic"), (["crashes.log", "kern.log"], []))
+        self.assertEqual(self.route(rule_set, "<14>Oct 17 12:00:00 host app: segfault"), (["segfaults.log"], []))
+        self.assertIsNone(self.route(rule_set, "<14>Oct 17 12:00:00 host app: fine"))
+
+
+    def test_unparsed(self):
+        self.assertIsNone(RuleSet([Rule({"drop": True})]).route(None))
+
+
+    def test_malformed(self):
+        for config in ({"file": "a.log", "drop": True}, {"selector": "*.*"}, {"file": "a.log", "tags": "x"},
+                       {"content": "(", "file": "a.log"}, ["file"]):
+            with self.assertRaises(ValueError):
+                Rule(config)
+
+
+class TestLoad(unittest.TestCase):
+
+    def test_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path: str = os.path.join(directory, "rules.json")
+            with open(path, "w") as file:
+                json.dump([{"selector": "*.debug", "drop": True}, {"selector": "mail.*", "collection": "mail"}], file)
+            self.assertEqual(load(path).collections, {"mail"})
+
+            with open(path, "w") as file:
+                json.dump([{"selector": "*.debug", "drop": True}, {"selector": "mail.bogus", "file": "a.log"}], file)
+            with self.assertRaisesRegex(ValueError, "Rule 2: Unknown severity"):
+                load(path)
@@ -0,0 +1,184 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pysyslog_server.spool import Spool, SpoolDrainer
+
+
+class TestSpool(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.directory.name, "spool")
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def test_read_and_commit(self):
+        spool: Spool = Spool(self.path)
+        spool.open()
+        for i in range(5):
+            spool.append(f"<13>Jan 10 01:02:03 localhost app: message {i}")
+
+        records, offset = spool.read(3)
+        self.assertEqual(records, [f"<13>Jan 10 01:02:03 localhost app: message {i}" for i in range(3)])
+        records, _ = spool.read(3) # not committed, so read again
+        self.assertEqual(len(records), 3)
+
+        spool.commit(offset)
+        records, offset = spool.read(10)
+        self.assertEqual(records, [f"<13>Jan 10 01:02:03 localhost app: message {i}" for i in range(3, 5)])
+        spool.commit(offset)
+        self.assertFalse(spool.pending())
+        spool.close()
+
+
+    def test_resume_after_restart(self):
+        spool: Spool = Spool(self.path)
+        spool.open()
+        for i in range(4):
+            spool.append(f"message {i}")
+        _, offset = spool.read(2)
+        spool.commit(offset)
+        spool.close()
+
+        spool = Spool(self.path)
+        spool.open()
+        spool.append("message 4")
+        records, _ = spool.read(10)
+        spool.close()
+
+        self.assertEqual(records, ["message 2", "message 3", "message 4"])
+
+
+    def test_segments(self):
+        spool: Spool = Spool(self.path, segment_bytes=32)
+        spool.open()
+        for i in range(10):
+            spool.append(f"message number {i}") # 20 bytes with header, so 2 per segment
+        self.assertEqual(len(os.listdir(self.path)), 5)
+
+        records, offset = spool.read(100)
+        spool.commit(offset)
+        spool.close()
+
+        self.assertEqual(records, [f"message number {i}" for i in range(10)])
+        self.assertEqual(len([entry for entry in os.listdir(self.path) if entry.endswith(".spool")]), 1)
+
+
+    def test_max_bytes(self):
+        spool: Spool = Spool(self.path, segment_bytes=32, max_bytes=60)
+        spool.open()
+        appended: list = [spool.append(f"message number {i}") for i in range(4)] # 20 bytes each
+
+        self.assertEqual((appended, spool.dropped), ([True, True, True, False], 1))
+        records, offset = spool.read(100)
+        spool.commit(offset) # frees the full segment
+        self.assertTrue(spool.append("message number 4"))
+        spool.close()
+
+
+    def test_max_bytes_within_segment(self):
+        spool: Spool = Spool(self.path, max_bytes=60) # smaller than a segment, which never rotates
+        spool.open()
+        for i in range(10):
+            self.assertTrue(spool.append(f"message number {i}"))
+            self.assertTrue(spool.append(f"message number {i}"))
+            records, offset = spool.read(100)
+            spool.commit(offset) # committed records don't count
+
+        self.assertEqual(spool.dropped, 0)
+        self.assertEqual([spool.append(f"message number {i}") for i in range(4)], [True, True, True, False])
+        spool.close()
+        spool = Spool(self.path, max_bytes=60)
+        spool.open() # only the records after the committed offset count
+        self.assertFalse(spool.append("message number 4"))
+        records, offset = spool.read(1)
+        spool.commit(offset)
+        self.assertTrue(spool.append("message number 4"))
+        spool.close()
+
+
+    def test_incomplete_record(self):
+        spool: Spool = Spool(self.path)
+        spool.open()
+        spool.append("complete")
+        spool.close()
+        with open(os.path.join(self.path, "0000000001.spool"), "ab") as f:
+            f.write(b"\x00\x00\x00\x10trunc") # crashed while appending
+
+        spool = Spool(self.path)
+        spool.open()
+        spool.append("after restart")
+        records, _ = spool.read(100)
+        spool.close()
+
+        self.assertEqual(records, ["complete", "after restart"])
+
+
+class TestSpoolDrainer(unittest.TestCase):
+
+    def test_outage(self):
+        with tempfile.TemporaryDirectory() as directory:
+            spool: Spool = Spool(directory)
+            spool.open()
+            saved: list = []
+            available: list = [False]
+
+            def handler(records):
+                if not available[0]:
+                    return False
+                saved.extend(records)
+                return True
+
+            drainer: SpoolDrainer = SpoolDrainer(spool, handler, batch_size=2, poll_interval=0.01)
+            drainer.start()
+            for i in range(5):
+                spool.append(f"message {i}")
+            time.sleep(0.1)
+            drainer.close() # the handler gave up, nothing was committed
+            self.assertEqual(saved, [])
+
+            available[0] = True
+            drainer.start()
+            time.sleep(0.2)
+            drainer.close()
+            spool.close()
+
+            self.assertEqual(saved, [f"message {i}" for i in range(5)])
+            self.assertEqual(drainer.drained, 5)
+
+
+    def test_close_leaves_backlog(self):
+        with tempfile.TemporaryDirectory() as directory:
+            spool: Spool = Spool(directory)
+            spool.open()
+            for i in range(100):
+                spool.append(f"message {i}")
+            saved: list = []
+            inserting: threading.Event = threading.Event()
+            release: threading.Event = threading.Event()
+
+            def handler(records):
+                inserting.set()
+                release.wait()
+                saved.extend(records)
+                return True
+
+            drainer: SpoolDrainer = SpoolDrainer(spool, handler, batch_size=10)
+            drainer.start()
+            inserting.wait()
+            drainer.stop() # shutting down long before the drainer caught up
+            release.set()
+            drainer.close()
+            spool.close()
+
+            spool = Spool(directory)
+            spool.open()
+            records, _ = spool.read(1000)
+            spool.close()
+            self.assertEqual(saved, [f"message {i}" for i in range(10)]) # only the batch being inserted
+            self.assertEqual(records, [f"message {i}" for i in range(10, 100)]) # replayed after a restart
@@ -0,0 +1,151 @@
+import datetime
+import os
+import sqlite3
+import tempfile
+import unittest
+from pysyslog_server import __main__ as cli
+from pysyslog_server.parser import Parser
+from pysyslog_server.store import (SegmentStore, parse_facility, parse_severity, parse_time, query, segment_name,
+                                   segment_range, segments)
+
+# 2026-10-17 23:30:00 UTC
+NOW: float = datetime.datetime(2026, 10, 17, 23, 30, tzinfo=datetime.timezone.utc).timestamp()
+
+
+class TestSegments(unittest.TestCase):
+
+    def test_names(self):
+        self.assertEqual(segment_name(NOW), "2026-10-17T23")
+        self.assertEqual(segment_name(NOW, "day"), "2026-10-17")
+        self.assertEqual(segment_range("2026-10-17T23.log"), (NOW - 1800, NOW + 1800))
+        self.assertEqual(segment_range("2026-10-17.log"), (NOW - 23.5 * 3600, NOW + 1800))
+        self.assertIsNone(segment_range("2026-10-17T23.idx"))
+        self.assertIsNone(segment_range("syslog.log"))
+
+
+    def test_unknown_partition(self):
+        with self.assertRaises(ValueError):
+            SegmentStore("store", partition="week")
+
+
+class TestParse(unittest.TestCase):
+
+    def test_severity(self):
+        self.assertEqual(parse_severity("<=3"), ("<=", 3))
+        self.assertEqual(parse_severity("<= err"), ("<=", 3))
+        self.assertEqual(parse_severity(">warning"), (">", 4))
+        self.assertEqual(parse_severity("debug"), ("=", 7))
+        self.assertEqual(parse_severity("=0"), ("=", 0))
+        for severity in ("8", "<=loud", "<<3"):
+            with self.assertRaises(ValueError):
+                parse_severity(severity)
+
+
+    def test_facility(self):
+        self.assertEqual(parse_facility("auth"), 4)
+        self.assertEqual(parse_facility("23"), 23)
+        with self.assertRaises(ValueError):
+            parse_facility("24")
+
+
+    def test_time(self):
+        self.assertEqual(parse_time("2h", NOW), NOW - 7200)
+        self.assertEqual(parse_time("30m", NOW), NOW - 1800)
+        self.assertEqual(parse_time("7d", NOW), NOW - 7 * 86400)
+        self.assertEqual(parse_time("2026-10-17T23:30+00:00"), NOW)
+        self.assertEqual(parse_time("2026-10-17"), datetime.datetime(2026, 10, 17).timestamp()) # local time
+        with self.assertRaises(ValueError):
+            parse_time("yesterday")
+
+
+class TestSegmentStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.directory.name, "store")
+        self.messages: list = [
+            (NOW - 7200, "<34>Oct 17 21:30:00 core-sw1 su: 'su root' failed"),
+            (NOW - 3600, "<13>Oct 17 22:30:00 core-sw1 app: hello"),
+            (NOW - 60, "<11>Oct 17 23:29:00 web1 nginx[12]: upstream timed out"),
+            (NOW - 30, "<38>Oct 17 23:29:30 core-sw1 sshd[99]: Accepted publickey"),
+            (NOW, "<13>Oct 17 23:30:00 web1 app: hello again"),
+        ]
+        store: SegmentStore = SegmentStore(self.path, batch_size=2)
+        store.start()
+        for received, syslog_message in self.messages:
+            store.write(syslog_message, Parser(syslog_message).parse(), received)
+        store.write("<13>Oct 17 23:30:00 unparsed", None, NOW)
+        store.close()
+        self.store: SegmentStore = store
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def find(self, **filters) -> list:
+        return list(query(self.path, **filters))
+
+
+    def test_partitioned(self):
+        self.assertEqual(self.store.stored, 6)
+        self.assertEqual(sorted(os.listdir(self.path)), ["2026-10-17T21.idx", "2026-10-17T21.log",
+                                                         "2026-10-17T22.idx", "2026-10-17T22.log",
+                                                         "2026-10-17T23.idx", "2026-10-17T23.log"])
+        with open(os.path.join(self.path, "2026-10-17T23.log")) as log:
+            self.assertEqual(len(log.read().splitlines()), 4)
+        self.assertEqual(len(segments(self.path, since=NOW - 60)), 1)
+        self.assertEqual(len(segments(self.path, until=NOW - 5400)), 1) # before 22:00
+
+
+    def test_query(self):
+        self.assertEqual(len(self.find()), 6)
+        self.assertEqual(self.find(hostnames=["core-sw1"]), [self.messages[0][1], self.messages[1][1], self.messages[3][1]])
+        self.assertEqual(self.find(hostnames=["core-sw1"], since=NOW - 3600), [self.messages[1][1], self.messages[3][1]])
+        self.assertEqual(self.find(severity=("<=", 3)), [self.messages[0][1], self.messages[2][1]])
+        self.assertEqual(self.find(tags=["sshd", "nginx"]), [self.messages[2][1], self.messages[3][1]])
+        self.assertEqual(self.find(facilities=[4], until=NOW - 3600), [self.messages[0][1]])
+        self.assertEqual(self.find(hostnames=["web1"], limit=1), [self.messages[2][1]])
+        self.assertEqual(self.find(hostnames=["db1"]), [])
+
+
+    def test_appends(self):
+        store: SegmentStore = SegmentStore(self.path)
+        store.start()
+        store.write(self.messages[4][1], Parser(self.messages[4][1]).parse(), NOW + 1)
+        store.close()
+
+        self.assertEqual(self.find(hostnames=["web1"], tags=["app"]), [self.messages[4][1]] * 2)
+
+
+    def test_flush(self):
+        store: SegmentStore = SegmentStore(self.path, batch_interval=60)
+        store.start()
+        store.write(self.messages[4][1], Parser(self.messages[4][1]).parse(), NOW + 1)
+        store.flush() # doesn't wait for the batch interval
+
+        self.assertEqual(len(self.find(hostnames=["web1"], tags=["app"])), 2)
+        store.close()
+
+
+    def test_shards(self):
+        store: SegmentStore = SegmentStore(self.path + ".2")
+        store.start()
+        store.write(self.messages[2][1], Parser(self.messages[2][1]).parse(), NOW)
+        store.close()
+
+        self.assertEqual(len(self.find(tags=["nginx"])), 2)
+
+
+    def test_index(self):
+        index: sqlite3.Connection = sqlite3.connect(os.path.join(self.path, "2026-10-17T23.idx"))
+        rows: list = index.execute("SELECT hostname, tag, facility, severity FROM messages ORDER BY offset").fetchall()
+        index.close()
+        self.assertEqual(rows, [("web1", "nginx", 1, 3), ("core-sw1", "sshd", 4, 6), ("web1", "app", 1, 5),
+                                (None, None, None, None)])
+
+
+    def test_cli(self):
+        self.assertEqual(cli.main(["query", "--dir", self.path, "--severity", "bogus"]), 2)
+        with self.assertRaises(SystemExit):
+            cli.main(["query", "--limit", "many"])
@@ -0,0 +1,53 @@
+import os
+import signal
+import time
+import unittest
+from pysyslog_server.supervisor import Supervisor, STATS_FIELDS
+
+
+def _publish_and_exit(worker_index: int, stats):
+    stats[worker_index * len(STATS_FIELDS)] = worker_index + 100
+
+
+def _publish_and_wait(worker_index: int, stats):
+    stats[worker_index * len(STATS_FIELDS)] = worker_index + 100
+    time.sleep(60)
+
+
+def _publish_signals(worker_index: int, stats):
+    os.kill(os.getpid(), signal.SIGINT)
+    os.kill(os.getpid(), signal.SIGHUP)
+    stats[worker_index * len(STATS_FIELDS)] = worker_index + 100
+
+
+class TestSupervisor(unittest.TestCase):
+
+    def test_stats(self):
+        supervisor: Supervisor = Supervisor(_publish_and_wait, 2)
+        supervisor.start()
+        time.sleep(0.5)
+        supervisor.stop()
+        supervisor.join()
+
+        self.assertEqual([worker_stats["received"] for worker_stats in supervisor.stats()], [100, 101])
+
+
+    def test_restart(self):
+        supervisor: Supervisor = Supervisor(_publish_and_exit, 1, restart_delay=0)
+        supervisor.start()
+        supervisor.join()
+        supervisor.check()
+        supervisor.stop()
+        supervisor.join()
+
+        self.assertEqual(supervisor.restarts, 1)
+
+
+    def test_ignored_signals(self):
+        supervisor: Supervisor = Supervisor(_publish_signals, 1)
+        supervisor.start()
+        supervisor.join()
+        supervisor.stop()
+
+        self.assertEqual(supervisor.stats()[0]["received"], 100) # not killed by Ctrl+C or an early SIGHUP
+        self.assertEqual(supervisor._processes[0].exitcode, 0)
@@ -1,5 +1,6 @@
 import unittest
-from pysyslog_server.validator import Validator
+from pysyslog_server.parser import Parser
+from pysyslog_server.validator import Validator, decode_non_ascii
 
 
 class TestValidator(unittest.TestCase):
@@ -50,4 +51,82 @@ class TestValidator(unittest.TestCase):
         self.assertNotEqual(leading_zero_validator.validate_message(), leading_zero)
         self.assertNotEqual(too_many_angle_brackets_validator1.validate_message(), too_many_angle_brackets1)
         self.assertNotEqual(too_many_angle_brackets_validator2.validate_message(), too_many_angle_brackets2)
-        self.assertNotEqual(contains_special_chars_validator.validate_message(), contains_special_chars)
\ No newline at end of file
+        self.assertNotEqual(contains_special_chars_validator.validate_message(), contains_special_chars)
+
+    def test_short_message(self):
+        short: str = "<5>"
+        short_validator: Validator = Validator(short, "127.0.0.1")
+
+        self.assertTrue(short_validator.validate_message().startswith("<5>"))
+        self.assertNotEqual(short_validator.message, short)
+
+
+    def test_validate_and_parse_valid_message(self):
+        message: str = "<100>Dec  1 16:21:59 myapphost MyApp: User 'myuser' locked out!"
+        result = Validator(message, "192.168.0.10").validate_and_parse()
+
+        self.assertEqual(result.message, message)
+        self.assertEqual(result.fields, Parser(message).parse())
+        self.assertFalse(result.pri_inserted)
+        self.assertFalse(result.header_inserted)
+
+
+    def test_validate_and_parse_corrected_message(self):
+        invalid_timestamp: str = "<100>July 10 01:02:03 localhost hello:world"
+        invalid_priority: str = "<192>Jan 10 01:02:03 localhost hello:world"
+
+        timestamp_result = Validator(invalid_timestamp, "192.168.0.10").validate_and_parse()
+        priority_result = Validator(invalid_priority, "192.168.0.10").validate_and_parse()
+
+        self.assertTrue(timestamp_result.header_inserted)
+        self.assertFalse(timestamp_result.pri_inserted)
+        self.assertEqual(timestamp_result.fields, Parser(timestamp_result.message).parse())
+        self.assertEqual(timestamp_result.fields["hostname"], "192.168.0.10")
+        self.assertEqual(timestamp_result.fields["tag"], "July ")
+
+        self.assertTrue(priority_result.pri_inserted)
+        self.assertFalse(priority_result.header_inserted)
+        self.assertEqual(priority_result.fields, Parser(priority_result.message).parse())
+        self.assertEqual(priority_result.fields["severity"], 5)
+        self.assertEqual(priority_result.fields["tag"], "<")
+
+
+    def test_timestamp_after_pri(self):
+        # a valid timestamp later in the message doesn't make the HEADER valid
+        relayed: str = "<13>relayed: <14>Jan 10 01:02:03 localhost hello:world"
+
+        self.assertNotEqual(Validator(relayed, "127.0.0.1").validate_message(), relayed)
+
+
+    def test_rfc5424(self):
+        message: str = '<165>1 2003-10-11T22:14:15.003Z mymachine.example.com evntslog - ID47 [exampleSDID@32473 iut="3"] hello'
+        result = Validator(message, "192.168.0.10").validate_and_parse()
+
+        self.assertEqual(Validator(message, "192.168.0.10").validate_message(), message)
+        self.assertEqual(result.message, message)
+        self.assertEqual(result.fields, Parser(message).parse())
+        self.assertEqual(result.fields["app_name"], "evntslog")
+        self.assertFalse(result.header_inserted)
+        # a VERSION without the rest of the HEADER is corrected as before
+        self.assertNotEqual(Validator("<165>1 hello", "192.168.0.10").validate_message(), "<165>1 hello")
+
+
+class TestDecodeNonAscii(unittest.TestCase):
+
+    def test_policies(self):
+        utf8: bytes = "<13>Jan 10 01:02:03 café app: é".encode("utf-8")
+        latin1: bytes = "<13>Jan 10 01:02:03 host app: user é".encode("latin-1")
+
+        self.assertEqual(decode_non_ascii(utf8), "<13>Jan 10 01:02:03 caf\\xc3\\xa9 app: \\xc3\\xa9")
+        self.assertEqual(decode_non_ascii(latin1, "replace"), "<13>Jan 10 01:02:03 host app: user ?")
+        self.assertEqual(decode_non_ascii(memoryview(utf8), "passthrough"), "<13>Jan 10 01:02:03 café app: é")
+        self.assertEqual(decode_non_ascii(latin1, "passthrough"), "<13>Jan 10 01:02:03 host app: user \ufffd")
+        with self.assertRaises(ValueError):
+            decode_non_ascii(utf8, "drop")
+
+
+    def test_validate_decoded(self):
+        fields: dict = Validator(decode_non_ascii("<13>Jan 10 01:02:03 café app: é".encode("utf-8"), "passthrough"),
+                                 "127.0.0.1").validate_and_parse().fields
+
+        self.assertEqual((fields["hostname"], fields["content"]), ("café", " é"))
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pysyslog_server.writer import FileWriter
+
+
+class TestFileWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path: str = os.path.join(self.directory.name, "syslog.log")
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def read_lines(self) -> list:
+        with open(self.path) as f:
+            return f.read().splitlines()
+
+
+    def test_lines_from_many_threads(self):
+        writer: FileWriter = FileWriter(self.path, flush_policy="size", flush_bytes=4096)
+        writer.start()
+
+        def write_many(thread_id):
+            for i in range(500):
+                writer.write(f"<13>Jan 10 01:02:03 host{thread_id} app: message {i}")
+
+        threads: list = [threading.Thread(target=write_many, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+
+        lines: list = self.read_lines()
+        self.assertEqual(len(lines), 2000)
+        self.assertTrue(all(line.startswith("<13>Jan 10 01:02:03 host") for line in lines))
+        self.assertLess(writer.flushes, 2000) # lines were batched
+
+
+    def test_flush_every_line(self):
+        writer: FileWriter = FileWriter(self.path, flush_policy="line")
+        writer.start()
+        writer.write("first")
+        writer.write("second")
+        writer.close()
+
+        self.assertEqual(self.read_lines(), ["first", "second"])
+        self.assertEqual(writer.flushes, 2)
+
+
+    def test_flush_interval(self):
+        writer: FileWriter = FileWriter(self.path, flush_policy="interval", flush_interval=0.05, fsync_policy="periodic")
+        writer.start()
+        writer.write("first")
+        time.sleep(0.3)
+
+        self.assertEqual(self.read_lines(), ["first"]) # written before close()
+        writer.close()
+
+
+    def test_flush_interval_under_load(self):
+        writer: FileWriter = FileWriter(self.path, flush_policy="interval", flush_bytes=2**30, flush_interval=0.001)
+        for i in range(20000):
+            writer.write(f"message {i}") # queued before the writer thread starts, so the queue never runs empty
+        writer.start()
+        writer.close()
+
+        self.assertEqual(len(self.read_lines()), 20000)
+        self.assertGreater(writer.flushes, 1)
+
+
+    @unittest.skipUnless(os.path.exists("/dev/full"), "needs /dev/full")
+    def test_write_errors(self):
+        writer: FileWriter = FileWriter("/dev/full", flush_policy="line", max_queue_size=10)
+        writer.start()
+        for i in range(100):
+            writer.write(f"message {i}") # would block for good if the writer thread died
+        writer.close()
+
+        self.assertEqual((writer.lines_written, writer.lines_lost), (0, 100))
+        self.assertGreaterEqual(writer.failures, 100)
+
+
+    def test_appends_to_existing_file(self):
+        with open(self.path, "w") as f:
+            f.write("existing\n")
+
+        writer: FileWriter = FileWriter(self.path, fsync_policy="batch")
+        writer.start()
+        writer.write("new")
+        writer.close()
+
+        self.assertEqual(self.read_lines(), ["existing", "new"])
+
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            FileWriter(self.path, flush_policy="never")
+        with self.assertRaises(ValueError):
+            FileWriter(self.path, fsync_policy="always")